@@ -0,0 +1,302 @@
+"""
+Response cache for deterministic AI endpoints.
+
+Entries are keyed on the endpoint name plus the normalized request payload
+and stored as encoded JSON, so a hit is served without re-serializing.
+The local cache is an LRU bounded by total body size with per-endpoint
+TTLs. Setting CACHE_REDIS_URL adds a shared Redis (or any server speaking
+the Redis protocol) behind it so several uvicorn workers share warm entries.
+Invalidation then bumps a per-endpoint generation counter in Redis; shared
+entries are stored under their generation and local entries remember it,
+so once one worker invalidates an endpoint, every worker stops serving the
+entries from before it, including any a compute already running writes.
+Concurrent misses on one key are coalesced: the first computes, the rest
+await its result (SingleFlight), so a burst of identical requests arriving
+as an entry expires costs one computation.
+
+    CACHE_MAX_BYTES   local cache budget (default: 64 MB)
+    CACHE_REDIS_URL   e.g. redis://localhost:6379/0 (optional, needs the `redis` package)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from fastapi.responses import Response
+
+# Seconds an entry stays fresh, per endpoint
+ENDPOINT_TTLS = {
+    "trends": 30,
+    "audience-segments": 3600,
+    "competitors": 900,
+    "score-content": 120,
+}
+DEFAULT_TTL = 60
+
+
+class RedisBackend:
+    """Shared cache tier on a Redis-protocol server"""
+    
+    def __init__(self, url: Optional[str] = None, client: Any = None, prefix: str = "smm:cache:"):
+        if client is None:
+            import redis  # optional dependency, only needed when CACHE_REDIS_URL is set
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+    
+    def generation(self, endpoint: str) -> int:
+        return int(self.client.get(self.prefix + "generation:" + endpoint) or 0)
+    
+    def bump_generation(self, endpoint: str) -> int:
+        return self.client.incr(self.prefix + "generation:" + endpoint)
+    
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+    
+    def delete_matching(self, pattern: str):
+        for key in self.client.scan_iter(match=self.prefix + pattern):
+            self.client.delete(key)
+    
+    def clear(self):
+        self.delete_matching("*")
+
+
+def shared_key(key: str, generation: int) -> str:
+    """Where an entry of a given generation of its endpoint is kept in the shared tier"""
+    return f"{key}@{generation}"
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution of the first caller's compute"""
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+    
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            # A task of its own, so a caller that disconnects does not cancel it for the others
+            task = asyncio.ensure_future(compute())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+    
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception even if every caller has gone away
+        if not task.cancelled():
+            task.exception()
+    
+    def forget(self, key: Hashable):
+        """Let later calls start a new execution instead of joining the running one"""
+        self._calls.pop(key, None)
+    
+    def keys(self) -> List[Hashable]:
+        return list(self._calls)
+    
+    def is_current(self, key: Hashable) -> bool:
+        """Called from within a compute: whether it has not been forgotten meanwhile"""
+        return self._calls.get(key) is asyncio.current_task()
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+    
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class ResponseCache:
+    """Size-bounded LRU with per-endpoint TTLs and an optional shared backend"""
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttls: Optional[Dict[str, float]] = None,
+                 backend: Optional[RedisBackend] = None):
+        self.max_bytes = max_bytes
+        self.ttls = dict(ENDPOINT_TTLS if ttls is None else ttls)
+        self.backend = backend
+        # key -> (expires at, body, generation of its endpoint when computed)
+        self._entries: "OrderedDict[str, Tuple[float, bytes, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        self.flights = SingleFlight()
+    
+    @staticmethod
+    def make_key(endpoint: str, payload: Any) -> str:
+        normalized = json.dumps(normalize_payload(payload), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return endpoint + ":" + hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _count(self, endpoint: str, counter: str):
+        counters = self._counters.setdefault(
+            endpoint, {"hits": 0, "shared_hits": 0, "misses": 0, "coalesced": 0, "stale": 0}
+        )
+        counters[counter] += 1
+    
+    def _generation(self, endpoint: str) -> int:
+        """The endpoint's current generation; always 0 without a shared backend"""
+        return self.backend.generation(endpoint) if self.backend is not None else 0
+    
+    def get(self, endpoint: str, payload: Any = None) -> Optional[bytes]:
+        return self._get(endpoint, self.make_key(endpoint, payload), self._generation(endpoint))
+    
+    def _get(self, endpoint: str, key: str, generation: int) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now and entry[2] == generation:
+                    self._entries.move_to_end(key)
+                    self._count(endpoint, "hits")
+                    return entry[1]
+                if entry[2] != generation:
+                    # Invalidated by another worker since it was cached here
+                    self._count(endpoint, "stale")
+                self._remove(key)
+        
+        if self.backend is not None:
+            body = self.backend.get(shared_key(key, generation))
+            if body is not None:
+                with self._lock:
+                    self._count(endpoint, "shared_hits")
+                    self._store(key, body, now + self.ttls.get(endpoint, DEFAULT_TTL), generation)
+                return body
+        
+        with self._lock:
+            self._count(endpoint, "misses")
+        return None
+    
+    def set(self, endpoint: str, payload: Any, value: Any) -> bytes:
+        """Cache a response value and return its encoded body"""
+        return self._set(endpoint, self.make_key(endpoint, payload), value, self._generation(endpoint))
+    
+    def _set(self, endpoint: str, key: str, value: Any, generation: int) -> bytes:
+        """Cache a value computed while the endpoint was at `generation`"""
+        body = encode_json(value)
+        ttl = self.ttls.get(endpoint, DEFAULT_TTL)
+        with self._lock:
+            self._store(key, body, time.monotonic() + ttl, generation)
+        if self.backend is not None:
+            self.backend.set(shared_key(key, generation), body, ttl)
+        return body
+    
+    def get_or_compute(self, endpoint: str, payload: Any, compute: Callable[[], Any]) -> Response:
+        key = self.make_key(endpoint, payload)
+        # Read before computing, so a value computed across an invalidation is filed under the old generation
+        generation = self._generation(endpoint)
+        body = self._get(endpoint, key, generation)
+        if body is None:
+            body = self._set(endpoint, key, compute(), generation)
+        return Response(content=body, media_type="application/json")
+    
+    async def aget_or_compute(self, endpoint: str, payload: Any, compute: Callable[[], Awaitable[Any]]) -> Response:
+        """get_or_compute for an async compute; concurrent misses on the same key await one compute"""
+        key = self.make_key(endpoint, payload)
+        generation = self._generation(endpoint)
+        body = self._get(endpoint, key, generation)
+        if body is None:
+            if key in self.flights:
+                with self._lock:
+                    self._count(endpoint, "coalesced")
+            
+            async def compute_and_set() -> bytes:
+                value = await compute()
+                # Invalidated while computing: the value may predate the change, so serve it but do not keep it
+                if not self.flights.is_current(key):
+                    return encode_json(value)
+                return self._set(endpoint, key, value, generation)
+            
+            body = await self.flights.do(key, compute_and_set)
+        return Response(content=body, media_type="application/json")
+    
+    def invalidate(self, endpoint: str, payload: Any = None):
+        """
+        Drop a cached response after the data behind it changed. With a shared
+        backend this starts a new generation of the whole endpoint, so the
+        other workers drop their copies too
+        """
+        key = self.make_key(endpoint, payload)
+        self.flights.forget(key)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.backend is not None:
+            self.backend.bump_generation(endpoint)
+    
+    def invalidate_endpoint(self, endpoint: str):
+        """Drop every cached response of an endpoint, whatever its payload"""
+        prefix = endpoint + ":"
+        for key in self.flights.keys():
+            if key.startswith(prefix):
+                self.flights.forget(key)
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._remove(key)
+        if self.backend is not None:
+            # Entries of older generations are unreachable now and expire with their TTL
+            self.backend.bump_generation(endpoint)
+    
+    def _store(self, key: str, body: bytes, expires_at: float, generation: int):
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, body, generation)
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, key: str):
+        _, body, _ = self._entries.pop(key)
+        self._bytes -= len(body)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.backend is not None:
+            self.backend.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "shared_backend": self.backend is not None,
+                "in_flight": len(self.flights),
+                "endpoints": {endpoint: dict(counters) for endpoint, counters in self._counters.items()},
+            }
+
+
+def normalize_payload(payload: Any) -> Any:
+    """Drop unset fields so requests that only differ in defaults share a key"""
+    if isinstance(payload, dict):
+        return {key: normalize_payload(value) for key, value in payload.items() if value is not None}
+    if isinstance(payload, (list, tuple)):
+        return [normalize_payload(value) for value in payload]
+    return payload
+
+
+def encode_json(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    # Same encoding as Starlette's JSONResponse
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+response_cache = ResponseCache(
+    max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    backend=RedisBackend(os.environ["CACHE_REDIS_URL"]) if os.getenv("CACHE_REDIS_URL") else None,
+)
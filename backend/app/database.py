@@ -0,0 +1,58 @@
+"""
+Database configuration.
+
+DATABASE_URL selects the database (SQLite by default). Connections are
+pooled by the engine; sessions come from get_db() in route dependencies.
+"""
+
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./social_ai.db")
+
+
+def make_engine(url: str):
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=10, max_overflow=20, pool_pre_ping=True)
+    
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # One shared connection, otherwise every pooled connection gets its own empty database
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=10, max_overflow=20)
+    
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run while the scheduler writes
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    
+    return engine
+
+
+engine = make_engine(DATABASE_URL)
+SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+Base = declarative_base()
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def init_db():
+    # Import models so they are registered on Base before creating tables
+    from app import models  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist; add indexes declared since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,341 @@
+"""
+Executor for CPU-bound service calls.
+
+Heavy AI routes hand their service function to a shared pool instead of
+running it on FastAPI's threadpool, so they cannot starve light endpoints.
+Lighter ai_services calls that are cheaper than the hop to the pool run on
+the threadpool (run_local) but queue the same way.
+
+Calls are queued per tenant (app/tenancy.py) and granted one of the
+executor's slots (one per worker) by fair share: the next call is always
+the oldest waiting one of the tenant that has had the least executor time,
+divided by its weight, among those under their concurrency limit and CPU
+quota whose route has a free slot. A tenant that was idle starts level with
+the others rather than with the credit of its idle time. Calls are not
+preempted, so big batches are split (map_json) and take turns with other
+tenants' calls chunk by chunk; another tenant's call then waits for at most
+one chunk per slot, however large the batch.
+Configured through environment variables:
+    
+    AI_EXECUTOR            "process" (default) or "thread"
+    AI_EXECUTOR_WORKERS    pool size (default: number of CPUs)
+    AI_EXECUTOR_MAX_QUEUE  requests allowed in flight before new ones get a 503 (default: 64)
+
+and the TENANT_* quotas described in app/tenancy.py (a tenant over its
+queue limit gets a 429).
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from app.cache import encode_json
+from app.instrumentation import INSTRUMENTATION_ENABLED, metrics
+from app.services.rate_limit import TokenBucket
+from app.tenancy import CPU_QUOTA_BURST_SECONDS, TenantQuota, default_quota, get_tenant, load_quotas
+
+# Max concurrent calls per route; routes not listed use DEFAULT_ROUTE_LIMIT, 0 is no limit of its own
+ROUTE_LIMITS = {
+    "predict-engagement-batch": 2,
+    "analyze-sentiment": 2,
+    "score-content": 4,
+    "rewrite-caption-batch": 2,
+    # Short threadpool calls, bounded by the slots only
+    "predict-engagement": 0,
+    "rewrite-caption": 0,
+    "translate": 0,
+}
+DEFAULT_ROUTE_LIMIT = 2
+
+
+class TenantQueue:
+    """One tenant's waiting calls and its use of the executor"""
+    
+    def __init__(self, quota: TenantQuota):
+        self.quota = quota
+        self.waiting: Deque[Tuple[str, asyncio.Future]] = deque()
+        self.running = 0
+        # Admitted requests in flight, counted against quota.max_queue
+        self.requests = 0
+        # Executor seconds used, divided by the weight: the fair-share order
+        self.virtual = 0.0
+        self.seconds = 0.0
+        self.calls = 0
+        self.rejected = 0
+        self.bucket = (TokenBucket(quota.cpu_quota, quota.cpu_quota * CPU_QUOTA_BURST_SECONDS)
+                       if quota.cpu_quota > 0 else None)
+    
+    @property
+    def active(self) -> bool:
+        return bool(self.waiting or self.running)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "waiting": len(self.waiting),
+            "running": self.running,
+            "calls": self.calls,
+            "executor_seconds": round(self.seconds, 3),
+            "rejected": self.rejected,
+            "quota": self.quota._asdict(),
+        }
+
+
+class Admission:
+    """A request's place within the queue limits, given back by release() (once, however often called)"""
+    
+    def __init__(self, executor: "CPUExecutor", tenant: str):
+        self.executor = executor
+        self.tenant = tenant
+        self.released = False
+    
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.executor._leave(self.tenant)
+    
+    def __enter__(self) -> "Admission":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class CPUExecutor:
+    """Pool dispatcher with queue-depth limits, per-route caps and fair share between tenants"""
+    
+    def __init__(self, kind: str = "process", workers: Optional[int] = None, max_queue: int = 64,
+                 route_limits: Optional[Dict[str, int]] = None, tenant_quota: Optional[TenantQuota] = None,
+                 tenant_quotas: Optional[Dict[str, TenantQuota]] = None):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.route_limits = dict(ROUTE_LIMITS if route_limits is None else route_limits)
+        self.tenant_quota = tenant_quota or default_quota(self.workers)
+        self.tenant_quotas = dict(tenant_quotas or {})
+        self.in_flight = 0
+        self.rejected = 0
+        self.running = 0
+        self._pool: Optional[Executor] = None
+        self._route_running: Dict[str, int] = {}
+        self._tenants: Dict[str, TenantQueue] = {}
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+    
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                # spawn: forking a process that already runs an event loop and threads is unsafe
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="ai-executor")
+        return self._pool
+    
+    def _tenant(self, tenant: str) -> TenantQueue:
+        if tenant not in self._tenants:
+            self._tenants[tenant] = TenantQueue(self.tenant_quotas.get(tenant, self.tenant_quota))
+        return self._tenants[tenant]
+    
+    def admit(self) -> Admission:
+        """Count a request of the current tenant against the queue limits; 503 when full, 429 over its quota"""
+        tenant = get_tenant()
+        queue = self._tenant(tenant)
+        if self.in_flight >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server busy, retry later", headers={"Retry-After": "1"})
+        if queue.requests >= queue.quota.max_queue:
+            queue.rejected += 1
+            raise HTTPException(status_code=429, detail="Too many requests in flight for this tenant",
+                                headers={"Retry-After": "1"})
+        self.in_flight += 1
+        queue.requests += 1
+        return Admission(self, tenant)
+    
+    def _leave(self, tenant: str):
+        self.in_flight -= 1
+        self._tenants[tenant].requests -= 1
+    
+    def _route_has_room(self, route: str) -> bool:
+        limit = self.route_limits.get(route, DEFAULT_ROUTE_LIMIT)
+        return not limit or self._route_running.get(route, 0) < limit
+    
+    def _dispatch(self):
+        """Grant free slots to waiting calls in fair-share order"""
+        retry_in = None
+        while self.running < self.workers:
+            best, best_index = None, None
+            for queue in self._tenants.values():
+                if not queue.waiting or queue.running >= queue.quota.max_concurrency:
+                    continue
+                if queue.bucket is not None:
+                    wait = queue.bucket.wait_time(0)
+                    if wait > 0:
+                        retry_in = wait if retry_in is None else min(retry_in, wait)
+                        continue
+                if best is not None and queue.virtual >= best.virtual:
+                    continue
+                index = next((i for i, (route, _) in enumerate(queue.waiting) if self._route_has_room(route)), None)
+                if index is not None:
+                    best, best_index = queue, index
+            if best is None:
+                break
+            route, future = best.waiting[best_index]
+            del best.waiting[best_index]
+            if future.done():
+                # Cancelled while waiting; its caller has not run yet to remove it
+                continue
+            best.running += 1
+            self._route_running[route] = self._route_running.get(route, 0) + 1
+            self.running += 1
+            future.set_result(None)
+        # Tenants over their CPU quota get another look once it has refilled
+        if retry_in is not None and self.running < self.workers and self._retry_handle is None:
+            self._retry_handle = asyncio.get_running_loop().call_later(retry_in, self._retry_dispatch)
+    
+    def _retry_dispatch(self):
+        self._retry_handle = None
+        self._dispatch()
+    
+    async def _acquire(self, queue: TenantQueue, route: str):
+        if not queue.active:
+            # Back from idle: level with the least served busy tenant, not ahead by the time it was idle
+            busy = [other.virtual for other in self._tenants.values() if other.active]
+            if busy:
+                queue.virtual = max(queue.virtual, min(busy))
+        future = asyncio.get_running_loop().create_future()
+        queue.waiting.append((route, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller went away
+                self._release(queue, route, 0.0)
+            elif (route, future) in queue.waiting:
+                queue.waiting.remove((route, future))
+            raise
+    
+    def _release(self, queue: TenantQueue, route: str, seconds: float):
+        queue.running -= 1
+        self._route_running[route] -= 1
+        self.running -= 1
+        queue.virtual += seconds / queue.quota.weight
+        queue.seconds += seconds
+        queue.calls += 1
+        if queue.bucket is not None:
+            queue.bucket.charge(seconds)
+        self._dispatch()
+    
+    async def call(self, route: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn in the pool when granted a slot, for a request already admitted (admit())"""
+        return await self._call(route, fn, args, kwargs, local=False)
+    
+    async def call_local(self, route: str, fn: Callable, *args, **kwargs) -> Any:
+        """Like call, but fn runs on this process's threadpool"""
+        return await self._call(route, fn, args, kwargs, local=True)
+    
+    async def _call(self, route: str, fn: Callable, args: Sequence[Any], kwargs: Dict[str, Any], local: bool) -> Any:
+        queue = self._tenant(get_tenant())
+        queued = time.perf_counter()
+        await self._acquire(queue, route)
+        started = time.perf_counter()
+        try:
+            if local:
+                return await run_in_threadpool(fn, *args, **kwargs)
+            loop = asyncio.get_running_loop()
+            call = partial(fn, *args, **kwargs)
+            if self.kind == "thread":
+                # run_in_executor does not carry context variables over (the request's profile)
+                call = partial(contextvars.copy_context().run, call)
+            return await loop.run_in_executor(self.pool, call)
+        finally:
+            finished = time.perf_counter()
+            self._release(queue, route, finished - started)
+            if INSTRUMENTATION_ENABLED:
+                metrics.observe_executor(route, started - queued, finished - started)
+    
+    async def run(self, route: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn in the pool, waiting for the tenant's turn; 503 when the queue is full, 429 over the tenant's"""
+        with self.admit():
+            return await self.call(route, fn, *args, **kwargs)
+    
+    async def run_local(self, route: str, fn: Callable, *args, **kwargs) -> Any:
+        """Like run, for calls cheaper than the hop to the pool"""
+        with self.admit():
+            return await self.call_local(route, fn, *args, **kwargs)
+    
+    async def run_json(self, route: str, fn: Callable, *args, **kwargs) -> Response:
+        """Like run, but the result is JSON-encoded in the worker to keep large bodies off the event loop"""
+        body = await self.run(route, partial(call_as_json, fn), *args, **kwargs)
+        return Response(content=body, media_type="application/json")
+    
+    async def map(self, route: str, fn: Callable, chunks: Sequence[Any], *args, **kwargs) -> List[Any]:
+        """fn(chunk, *args, **kwargs) per chunk, each a call of its own, as one request; results in order"""
+        with self.admit():
+            tasks = [asyncio.ensure_future(self.call(route, fn, chunk, *args, **kwargs)) for chunk in chunks]
+            try:
+                return await asyncio.gather(*tasks)
+            except BaseException:
+                # gather leaves the other chunks running when one fails
+                for task in tasks:
+                    task.cancel()
+                raise
+    
+    async def map_json(self, route: str, fn: Callable, items: Sequence[Any], chunk_size: int,
+                       *args, **kwargs) -> Response:
+        """A list-returning fn over items chunk_size at a time, the JSON-encoded parts joined into one list"""
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)] or [items[:0]]
+        parts = await self.map(route, partial(call_as_json, fn), chunks, *args, **kwargs)
+        return Response(content=join_json_lists(parts), media_type="application/json")
+    
+    def stats(self, tenant: Optional[str] = None) -> Dict[str, Any]:
+        """Executor state, with the usage of one tenant (others' are not shown to it)"""
+        stats = {
+            "kind": self.kind,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "running": self.running,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "route_limits": self.route_limits,
+            "tenants": len(self._tenants),
+        }
+        if tenant is not None:
+            stats["tenant"] = {"name": tenant, **self._tenant(tenant).stats()}
+        return stats
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def call_as_json(fn: Callable, *args, **kwargs) -> bytes:
+    return encode_json(fn(*args, **kwargs))
+
+
+def join_json_lists(parts: Sequence[bytes]) -> bytes:
+    """Concatenate JSON-encoded lists without decoding them"""
+    return b"[" + b",".join(part[1:-1] for part in parts if part != b"[]") + b"]"
+
+
+_workers = int(os.getenv("AI_EXECUTOR_WORKERS", "0")) or None
+_tenant_quota = default_quota(_workers)
+cpu_executor = CPUExecutor(
+    kind=os.getenv("AI_EXECUTOR", "process"),
+    workers=_workers,
+    max_queue=int(os.getenv("AI_EXECUTOR_MAX_QUEUE", "64")),
+    tenant_quota=_tenant_quota,
+    tenant_quotas=load_quotas(os.getenv("TENANT_QUOTAS", ""), _tenant_quota),
+)
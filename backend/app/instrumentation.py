@@ -0,0 +1,389 @@
+"""
+Opt-in request and service instrumentation.
+
+With INSTRUMENTATION=1 the app records
+
+    request latency     per (method, route template), in fixed-size HDR-style histograms
+    service timings     per function decorated with @timed, and per executor route
+    slowest requests    folded stacks from a sampling profiler, while it is running
+
+and serves them at GET /metrics (Prometheus text format) and
+GET /debug/profiles (folded stacks for flamegraph.pl or speedscope).
+Without it no middleware is installed and @timed returns the function
+unchanged, so the disabled cost is zero.
+
+    INSTRUMENTATION        "1" to enable (default: off)
+    PROFILER               "1" to start the profiler with the app; POST /debug/profiler toggles it
+    PROFILER_INTERVAL_MS   sampling interval (default: 5)
+    PROFILER_SLOWEST       slowest requests whose stacks are kept (default: 10)
+
+Functions run on the process executor record their @timed timings in the
+worker; the parent sees them as executor wait/run time for the route.
+"""
+
+import contextvars
+import functools
+import heapq
+import itertools
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION", "0") == "1"
+PROFILER_ON_STARTUP = os.getenv("PROFILER", "0") == "1"
+
+# Values below 2**SUB_BUCKET_BITS microseconds are exact; above that every power of
+# two is split into 2**(SUB_BUCKET_BITS - 1) buckets, so quantiles are within 1/64
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_BUCKETS = SUB_BUCKETS >> 1
+# Largest power-of-two step; covers values up to 2**40 us (~12 days)
+MAX_SHIFT = 40 - SUB_BUCKET_BITS
+BUCKETS = SUB_BUCKETS + MAX_SHIFT * HALF_BUCKETS
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def bucket_index(micros: int) -> int:
+    if micros < SUB_BUCKETS:
+        return max(micros, 0)
+    shift = min(micros.bit_length() - SUB_BUCKET_BITS, MAX_SHIFT)
+    return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + min((micros >> shift) - HALF_BUCKETS, HALF_BUCKETS - 1)
+
+
+def bucket_upper(index: int) -> int:
+    """Highest microsecond value counted in a bucket"""
+    if index < SUB_BUCKETS:
+        return index
+    shift, offset = divmod(index - SUB_BUCKETS, HALF_BUCKETS)
+    return ((HALF_BUCKETS + offset + 1) << (shift + 1)) - 1
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in fixed memory (BUCKETS counters)"""
+    
+    __slots__ = ("counts", "count", "total", "max")
+    
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float):
+        micros = int(seconds * 1e6)
+        # bucket_index, inlined: this runs on every request
+        if micros < SUB_BUCKETS:
+            self.counts[max(micros, 0)] += 1
+        else:
+            shift = min(micros.bit_length() - SUB_BUCKET_BITS, MAX_SHIFT)
+            self.counts[SUB_BUCKETS + (shift - 1) * HALF_BUCKETS
+                        + min((micros >> shift) - HALF_BUCKETS, HALF_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def copy(self) -> "LatencyHistogram":
+        histogram = LatencyHistogram()
+        histogram.counts = self.counts[:]
+        histogram.count, histogram.total, histogram.max = self.count, self.total, self.max
+        return histogram
+    
+    def quantiles(self, quantiles=QUANTILES) -> Dict[float, float]:
+        """Seconds at each quantile, in one pass over the buckets"""
+        result = dict.fromkeys(quantiles, 0.0)
+        if not self.count:
+            return result
+        targets = sorted((max(1, math.ceil(q * self.count)), q) for q in quantiles)
+        seen, position = 0, 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while position < len(targets) and seen >= targets[position][0]:
+                result[targets[position][1]] = min(bucket_upper(index) / 1e6, self.max)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+
+class Metrics:
+    """Request, service and executor histograms behind one lock"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str], LatencyHistogram] = {}
+        # (method, route) -> status -> count
+        self.statuses: Dict[Tuple[str, str], Dict[int, int]] = {}
+        self.services: Dict[str, LatencyHistogram] = {}
+        self.service_errors: Counter = Counter()
+        self.executor: Dict[Tuple[str, str], LatencyHistogram] = {}
+    
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route)
+        with self._lock:
+            histogram = self.requests.get(key)
+            if histogram is None:
+                histogram = self.requests[key] = LatencyHistogram()
+                self.statuses[key] = {}
+            histogram.record(seconds)
+            statuses = self.statuses[key]
+            statuses[status] = statuses.get(status, 0) + 1
+    
+    def observe_service(self, name: str, seconds: float, failed: bool = False):
+        with self._lock:
+            histogram = self.services.get(name)
+            if histogram is None:
+                histogram = self.services[name] = LatencyHistogram()
+            histogram.record(seconds)
+            if failed:
+                self.service_errors[name] += 1
+    
+    def observe_executor(self, route: str, waited: float, ran: float):
+        with self._lock:
+            for phase, seconds in (("wait", waited), ("run", ran)):
+                histogram = self.executor.get((route, phase))
+                if histogram is None:
+                    histogram = self.executor[(route, phase)] = LatencyHistogram()
+                histogram.record(seconds)
+    
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.statuses.clear()
+            self.services.clear()
+            self.service_errors.clear()
+            self.executor.clear()
+    
+    def render(self, extra: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """Everything in Prometheus text exposition format; extra maps metric name -> (type, value)"""
+        # Copy under the lock, compute quantiles outside it
+        with self._lock:
+            requests = {key: histogram.copy() for key, histogram in self.requests.items()}
+            statuses = {(method, route, status): count for (method, route), counts in self.statuses.items()
+                        for status, count in counts.items()}
+            services = {name: histogram.copy() for name, histogram in self.services.items()}
+            service_errors = dict(self.service_errors)
+            executor = {key: histogram.copy() for key, histogram in self.executor.items()}
+        
+        lines: List[str] = []
+        _summary(lines, "http_request_duration_seconds", "Request latency by route",
+                 {(("method", method), ("route", route)): values for (method, route), values in requests.items()})
+        lines += ["# HELP http_requests_total Requests by route and status", "# TYPE http_requests_total counter"]
+        lines += [f"http_requests_total{_labels(method=method, route=route, status=status)} {count}"
+                  for (method, route, status), count in sorted(statuses.items())]
+        _summary(lines, "service_call_duration_seconds", "Service function latency",
+                 {(("function", name),): values for name, values in services.items()})
+        lines += ["# HELP service_call_errors_total Service calls that raised", "# TYPE service_call_errors_total counter"]
+        lines += [f"service_call_errors_total{_labels(function=name)} {count}"
+                  for name, count in sorted(service_errors.items())]
+        _summary(lines, "executor_call_duration_seconds", "CPU executor queue wait and run time by route",
+                 {(("route", route), ("phase", phase)): values for (route, phase), values in executor.items()})
+        for name, (kind, value) in (extra or {}).items():
+            lines += [f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels: Any) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _summary(lines: List[str], name: str, help_text: str,
+             series: Dict[Tuple[Tuple[str, str], ...], LatencyHistogram]):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+    for labels, histogram in sorted(series.items(), key=lambda item: item[0]):
+        for quantile, value in histogram.quantiles().items():
+            lines.append(f"{name}{_labels(**dict(labels), quantile=quantile)} {value:.6f}")
+        lines.append(f"{name}_sum{_labels(**dict(labels))} {histogram.total:.6f}")
+        lines.append(f"{name}_count{_labels(**dict(labels))} {histogram.count}")
+
+
+class RequestProfile:
+    """Stack samples collected for one request"""
+    
+    __slots__ = ("stacks",)
+    
+    def __init__(self):
+        self.stacks: Counter = Counter()
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack at a fixed interval. A sample belongs to a
+    request when its stack passes through a frame attached to that request:
+    the middleware's frame on the event loop, or a @timed call in a worker
+    thread. Stacks are kept from that frame down, and only for the slowest
+    `keep` requests.
+    """
+    
+    def __init__(self, interval: float = 0.005, keep: int = 10):
+        self.interval = interval
+        self.keep = keep
+        self._owners: Dict[int, Tuple[Any, RequestProfile]] = {}
+        self._lock = threading.Lock()
+        # (seconds, sequence, label, stacks); the root is the fastest kept request
+        self._slowest: List[Tuple[float, int, str, Counter]] = []
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.samples = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+    
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+    
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+    
+    def attach(self, frame: Any, profile: RequestProfile):
+        with self._lock:
+            self._owners[id(frame)] = (frame, profile)
+    
+    def detach(self, frame: Any):
+        with self._lock:
+            self._owners.pop(id(frame), None)
+    
+    def finish(self, profile: RequestProfile, label: str, seconds: float):
+        """Keep the request's stacks if it is among the slowest"""
+        entry = (seconds, next(self._sequence), label, profile.stacks)
+        with self._lock:
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+    
+    def slowest(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            kept = sorted(self._slowest, reverse=True)
+        return [
+            {"request": label, "duration_ms": round(seconds * 1000, 3), "samples": sum(stacks.values()),
+             "folded": fold_stacks(stacks)}
+            for seconds, _, label, stacks in kept
+        ]
+    
+    def reset(self):
+        with self._lock:
+            self._slowest.clear()
+    
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                owners = dict(self._owners)
+            if not owners:
+                continue
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    owner = owners.get(id(frame))
+                    if owner is not None and owner[0] is frame:
+                        owner[1].stacks[tuple(reversed(codes))] += 1
+                        self.samples += 1
+                        break
+                    frame = frame.f_back
+
+
+def fold_stacks(stacks: Counter) -> List[str]:
+    """Stacks in the folded format read by flamegraph.pl: "root;...;leaf count" """
+    folded = Counter()
+    for codes, count in stacks.items():
+        folded[";".join(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                        for code in codes)] += count
+    return [f"{stack} {count}" for stack, count in folded.most_common()]
+
+
+metrics = Metrics()
+profiler = SamplingProfiler(
+    interval=int(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000,
+    keep=int(os.getenv("PROFILER_SLOWEST", "10")),
+)
+
+# The profile of the request being served; copied into threadpool threads with the context
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+def timed(fn: Callable) -> Callable:
+    """Record fn's latency under its qualified name (no-op unless INSTRUMENTATION=1)"""
+    if not INSTRUMENTATION_ENABLED:
+        return fn
+    name = fn.__qualname__
+    
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is not None:
+            frame = sys._getframe()
+            profiler.attach(frame, profile)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = fn(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            metrics.observe_service(name, time.perf_counter() - started, failed)
+            if profile is not None:
+                profiler.detach(frame)
+    return call
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware timing each HTTP request by its route template"""
+    
+    def __init__(self, app: Callable):
+        self.app = app
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_with_status(message: Dict[str, Any]):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        profile = None
+        if profiler.running:
+            profile = RequestProfile()
+            frame = sys._getframe()
+            profiler.attach(frame, profile)
+            token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            # The router stores the matched route in the scope; unmatched paths share one series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.observe_request(scope["method"], route, status, elapsed)
+            if profile is not None:
+                _current_profile.reset(token)
+                profiler.detach(frame)
+                profiler.finish(profile, f"{scope['method']} {route}", elapsed)
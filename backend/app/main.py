@@ -1,8 +1,39 @@
+import sys
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import posts, insights, scheduler, ai
+from fastapi.responses import JSONResponse
+from app.database import init_db
+from app.executor import cpu_executor
+from app.instrumentation import INSTRUMENTATION_ENABLED, PROFILER_ON_STARTUP, InstrumentationMiddleware, profiler
+from app.routes import posts, insights, scheduler, ai, metrics
+from app.services.dedup import fingerprint_index
+from app.services.ingestion import engagement_pipeline
+from app.warmup import WARMUP_ON_STARTUP, warmup
 
-app = FastAPI(title="Autonomous Social Media Manager")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    await run_in_threadpool(fingerprint_index.load)
+    await run_in_threadpool(engagement_pipeline.load_insights)
+    engagement_pipeline.start()
+    if WARMUP_ON_STARTUP:
+        app.state.warmup = await run_in_threadpool(warmup)
+    if INSTRUMENTATION_ENABLED and PROFILER_ON_STARTUP:
+        profiler.start()
+    app.state.ready = True
+    yield
+    profiler.stop()
+    await run_in_threadpool(engagement_pipeline.stop)
+    cpu_executor.shutdown()
+    # Only when competitor samples were used; importing the module here would pull in NumPy
+    if "app.services.timeseries" in sys.modules:
+        sys.modules["app.services.timeseries"].save_competitor_series()
+
+
+app = FastAPI(title="Autonomous Social Media Manager", lifespan=lifespan)
 
 # Enable CORS for frontend connection
 app.add_middleware(
@@ -11,13 +42,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Outermost, so timings include the other middleware
+if INSTRUMENTATION_ENABLED:
+    app.add_middleware(InstrumentationMiddleware)
+
 app.include_router(posts.router)
 app.include_router(insights.router)
 app.include_router(scheduler.router)
 app.include_router(ai.router)
+if INSTRUMENTATION_ENABLED:
+    app.include_router(metrics.router)
 
 @app.get("/")
 def root():
-    return {"status": "Backend running"}
\ No newline at end of file
+    return {"status": "Backend running"}
+
+@app.get("/ready")
+def ready():
+    # Readiness probe: true once startup (including warmup) has completed
+    if not getattr(app.state, "ready", False):
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True, "warmup": getattr(app.state, "warmup", None)}
\ No newline at end of file
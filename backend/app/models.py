@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+
+from app.database import Base
+
+
+class Post(Base):
+    __tablename__ = "posts"
+    
+    id = Column(Integer, primary_key=True)
+    account = Column(String(100), nullable=False, default="default")
+    content = Column(Text, nullable=False)
+    platform = Column(String(20), nullable=False, default="twitter")
+    content_type = Column(String(20), nullable=False, default="text")
+    status = Column(String(20), nullable=False, default="draft")
+    scheduled_time = Column(DateTime)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    shares = Column(Integer, nullable=False, default=0)
+    impressions = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        # Per-account post listing, newest first
+        Index("ix_posts_account_id", "account", "id"),
+        # Status listings (e.g. everything scheduled, in publish order)
+        Index("ix_posts_status_scheduled_time", "status", "scheduled_time", "id"),
+        # Calendar listings and [from, to) range queries for one account or one platform
+        Index("ix_posts_status_account_scheduled_time", "status", "account", "scheduled_time", "id"),
+        Index("ix_posts_status_platform_scheduled_time", "status", "platform", "scheduled_time", "id"),
+    )
+
+
+class TranslationSegment(Base):
+    """Translation memory entry, keyed by a hash of (language, source segment)"""
+    __tablename__ = "translation_segments"
+    
+    key = Column(String(32), primary_key=True)
+    language = Column(String(20), nullable=False)
+    source = Column(Text, nullable=False)
+    translation = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class PostFingerprint(Base):
+    """Hash of a post's normalized content, unique per account, platform, status and scheduled time"""
+    __tablename__ = "post_fingerprints"
+    
+    key = Column(String(32), primary_key=True)
+    post_id = Column(Integer, nullable=False)
+
+
+class IdempotencyRecord(Base):
+    """Response of a create request sent with an Idempotency-Key header"""
+    __tablename__ = "idempotency_keys"
+    
+    # "<route> <account> <client key>"
+    key = Column(String(400), primary_key=True)
+    request_hash = Column(String(32), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,18 +1,46 @@
-from fastapi import APIRouter
-from typing import List, Optional
-from pydantic import BaseModel
+import json
+import time
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import IO, AsyncIterator, Dict, List, Literal, Optional, Tuple
+from pydantic import BaseModel, Field, field_validator
+from app.cache import encode_json, response_cache
+from app.executor import Admission, cpu_executor, join_json_lists
+from app.routes.auth import current_tenant
+from app.services.score_memo import draft_stats, memo_key, score_memo
+from app.services.trends import trend_tracker
+from app.services.translation import translation_memory
+from app.tenancy import get_tenant
+from app.uploads import spool_request_body
 from app.services.ai_services import (
     predict_engagement,
+    predict_engagement_batch,
     score_content_performance,
+    score_content_unmemoized,
     detect_trends,
     segment_audience,
     analyze_sentiment,
+    SentimentAggregate,
+    generate_sentiment_actions,
+    extract_themes,
     analyze_competitors,
     rewrite_caption,
+    rewrite_caption_batch,
     generate_multilingual
 )
 
-router = APIRouter(prefix="/ai", tags=["AI Features"])
+router = APIRouter(prefix="/ai", tags=["AI Features"], dependencies=[Depends(current_tenant)])
+
+# Comments analyzed per chunk in the streaming sentiment endpoint
+SENTIMENT_STREAM_CHUNK_SIZE = 1000
+# Items per executor call in batch endpoints, so a big batch takes turns with other tenants' calls
+SENTIMENT_CHUNK_SIZE = 1000
+PREDICT_BATCH_CHUNK_SIZE = 500
+REWRITE_BATCH_CHUNK_SIZE = 10
+# Minimum seconds between competitor store snapshots; the lifespan also saves on shutdown
+COMPETITOR_SAVE_INTERVAL = 60
 
 
 class EngagementRequest(BaseModel):
@@ -22,9 +50,38 @@ class EngagementRequest(BaseModel):
     scheduled_time: Optional[str] = None
 
 
+class TrendPost(BaseModel):
+    text: str
+    # Seconds since the epoch; at most one trend slice ahead of the server clock
+    timestamp: Optional[float] = Field(None, ge=0)
+    
+    @field_validator("timestamp")
+    @classmethod
+    def not_in_future(cls, value: Optional[float]) -> Optional[float]:
+        if not trend_tracker.accepts(value):
+            raise ValueError("timestamp is in the future; expected seconds since the epoch")
+        return value
+
+
+class TrendEventsRequest(BaseModel):
+    posts: List[TrendPost]
+
+
+class FollowerRecord(BaseModel):
+    engagement_rate: float
+    active_hour: int = Field(ge=0, le=23)
+    content_affinity: Dict[str, float] = {}
+
+
+class FollowersRequest(BaseModel):
+    followers: List[FollowerRecord]
+
+
 class ContentScoreRequest(BaseModel):
     content: str
     platform: str = "twitter"
+    # Sent by an editor rescoring a draft as it is typed; only the edited part is recounted
+    draft_id: Optional[str] = Field(None, max_length=100)
 
 
 class SentimentRequest(BaseModel):
@@ -33,12 +90,58 @@ class SentimentRequest(BaseModel):
 
 class CompetitorRequest(BaseModel):
     handles: Optional[List[str]] = None
+    window_days: int = Field(30, ge=1, le=3660)
+    own_handle: Optional[str] = None
+
+
+class CompetitorSample(BaseModel):
+    handle: str
+    # Seconds since the epoch, within the store's retention and at most an hour ahead
+    timestamp: Optional[float] = None
+    followers: Optional[int] = None
+    likes: int = 0
+    comments: int = 0
+    posts: int = 0
+    
+    @field_validator("timestamp")
+    @classmethod
+    def within_retention(cls, value: Optional[float]) -> Optional[float]:
+        if value is not None:
+            # Deferred: the time-series store pulls in NumPy
+            from app.services.timeseries import HOUR, ORIGIN, hour_range
+            
+            oldest, newest = hour_range(time.time())
+            if not oldest <= (value - ORIGIN) // HOUR <= newest:
+                raise ValueError("timestamp must be seconds since the epoch, within the retention window "
+                                 "and at most an hour ahead")
+        return value
+
+
+class CompetitorSamplesRequest(BaseModel):
+    samples: List[CompetitorSample]
+
+
+# The keys of caption_variants.CAPTION_STYLES
+CaptionStyle = Literal["engaging", "professional", "casual", "viral"]
+# caption_variants.MAX_VARIANTS, the templates in each style; repeated so the schema doesn't import NumPy
+MAX_CAPTION_VARIANTS = 1134
 
 
 class RewriteRequest(BaseModel):
     content: str
-    style: str = "engaging"
+    style: CaptionStyle = "engaging"
+    platform: str = "twitter"
+    # Template variants scored
+    variants: int = Field(100, ge=1, le=MAX_CAPTION_VARIANTS)
+    top_k: int = Field(3, ge=1, le=100)
+
+
+class RewriteBatchRequest(BaseModel):
+    captions: List[str]
+    style: CaptionStyle = "engaging"
     platform: str = "twitter"
+    variants: int = Field(100, ge=1, le=MAX_CAPTION_VARIANTS)
+    top_k: int = Field(3, ge=1, le=100)
 
 
 class MultilingualRequest(BaseModel):
@@ -47,9 +150,11 @@ class MultilingualRequest(BaseModel):
 
 
 @router.post("/predict-engagement")
-def api_predict_engagement(request: EngagementRequest):
+async def api_predict_engagement(request: EngagementRequest):
     """Predict engagement metrics before publishing"""
-    return predict_engagement(
+    return await cpu_executor.run_local(
+        "predict-engagement",
+        predict_engagement,
         content=request.content,
         platform=request.platform,
         content_type=request.content_type,
@@ -57,65 +162,294 @@ def api_predict_engagement(request: EngagementRequest):
     )
 
 
+@router.post("/predict-engagement/batch")
+async def api_predict_engagement_batch(requests: List[EngagementRequest]):
+    """Predict engagement for a batch of posts, results in input order"""
+    return await cpu_executor.map_json(
+        "predict-engagement-batch",
+        predict_engagement_batch,
+        [request.model_dump() for request in requests],
+        PREDICT_BATCH_CHUNK_SIZE
+    )
+
+
 @router.post("/score-content")
-def api_score_content(request: ContentScoreRequest):
+async def api_score_content(request: ContentScoreRequest):
     """Score content performance potential"""
-    return score_content_performance(
-        content=request.content,
-        platform=request.platform
-    )
+    if request.draft_id is not None:
+        # Microseconds against this process's copy of the draft, less than the hop to the pool would cost
+        return score_content_performance(request.content, request.platform, request.draft_id)
+    
+    async def score() -> Dict:
+        # Memoized here rather than in the pool's processes, so the hits show in /ai/score-stats
+        key = memo_key(request.content, request.platform)
+        result = score_memo.get(key)
+        if result is None:
+            result = score_memo.put(key, await cpu_executor.run(
+                "score-content",
+                score_content_unmemoized,
+                content=request.content,
+                platform=request.platform
+            ))
+        return result
+    
+    return await response_cache.aget_or_compute("score-content", request.model_dump(), score)
 
 
 @router.get("/trends")
-def api_get_trends():
+async def api_get_trends():
     """Get trending hashtags, topics, and news"""
-    return detect_trends()
+    return await response_cache.aget_or_compute("trends", None, lambda: run_in_threadpool(detect_trends))
+
+
+@router.post("/trends/events")
+async def api_record_trend_events(request: TrendEventsRequest):
+    """Feed ingested posts/mentions (text with hashtags) into trend detection"""
+    def record():
+        for post in request.posts:
+            trend_tracker.record_post(post.text, post.timestamp)
+        # Rebuilt now, so the next read after the invalidation below sees these events
+        trend_tracker.refresh()
+    
+    await run_in_threadpool(record)
+    response_cache.invalidate("trends")
+    return {"recorded": len(request.posts)}
 
 
 @router.get("/audience-segments")
-def api_get_audience_segments():
+async def api_get_audience_segments():
     """Get audience segmentation analysis"""
-    return segment_audience()
+    return await response_cache.aget_or_compute(
+        "audience-segments", None, lambda: run_in_threadpool(segment_audience)
+    )
+
+
+@router.post("/audience-segments/followers")
+async def api_add_followers(request: FollowersRequest):
+    """Fold new followers into the persisted audience segments"""
+    from app.services.segmentation import get_audience_segmenter
+    
+    def update():
+        segmenter = get_audience_segmenter()
+        added = segmenter.update([follower.model_dump() for follower in request.followers])
+        segmenter.save()
+        return added, segmenter.total, len(segmenter.pending)
+    
+    added, total, pending = await run_in_threadpool(update)
+    response_cache.invalidate("audience-segments")
+    # pending: followers held back until there are enough to seed the segments
+    return {"recorded": added, "total_audience": total, "pending": pending}
 
 
 @router.post("/analyze-sentiment")
-def api_analyze_sentiment(request: SentimentRequest):
+async def api_analyze_sentiment(request: SentimentRequest):
     """Analyze sentiment of comments"""
-    return analyze_sentiment(comments=request.comments)
+    if len(request.comments) <= SENTIMENT_CHUNK_SIZE:
+        return await cpu_executor.run_json("analyze-sentiment", analyze_sentiment, comments=request.comments)
+    comments = request.comments
+    parts = await cpu_executor.map("analyze-sentiment", analyze_sentiment_chunk, [
+        comments[start:start + SENTIMENT_CHUNK_SIZE] for start in range(0, len(comments), SENTIMENT_CHUNK_SIZE)
+    ])
+    return Response(content=combine_sentiment_chunks(comments, parts), media_type="application/json")
+
+
+@router.post("/analyze-sentiment/stream")
+async def api_analyze_sentiment_stream(request: Request):
+    """Analyze an NDJSON stream of comments, one result per line plus a final summary"""
+    body = await spool_request_body(request)
+    # One admission for the whole stream; given back when it ends, or after the response if it never started
+    admission = cpu_executor.admit()
+    return StreamingResponse(stream_sentiment(body, admission), media_type="application/x-ndjson",
+                             background=BackgroundTask(admission.release))
 
 
 @router.get("/sentiment-demo")
-def api_sentiment_demo():
+async def api_sentiment_demo():
     """Get sentiment analysis with demo data"""
-    return analyze_sentiment()
+    return await run_in_threadpool(analyze_sentiment)
+
+
+@router.get("/executor-stats")
+async def api_executor_stats():
+    """Queue depth and limits of the CPU executor, and the calling tenant's use of it"""
+    return cpu_executor.stats(get_tenant())
+
+
+@router.get("/translation-stats")
+async def api_translation_stats():
+    """Translation memory hit rate, backend calls and latency"""
+    return translation_memory.stats()
+
+
+@router.get("/score-stats")
+async def api_score_stats():
+    """Hit rate of the content score memo and how much of each draft edit was recounted"""
+    return {"memo": score_memo.stats(), "drafts": draft_stats.stats()}
+
+
+@router.get("/cache-stats")
+async def api_cache_stats():
+    """Hit, miss and eviction counters of the response cache"""
+    return response_cache.stats()
 
 
 @router.post("/competitors")
-def api_analyze_competitors(request: CompetitorRequest):
+async def api_analyze_competitors(request: CompetitorRequest):
     """Analyze competitor performance"""
-    return analyze_competitors(competitor_handles=request.handles)
+    return await response_cache.aget_or_compute(
+        "competitors",
+        request.model_dump(),
+        lambda: run_in_threadpool(
+            analyze_competitors,
+            competitor_handles=request.handles,
+            window_days=request.window_days,
+            own_handle=request.own_handle
+        )
+    )
+
+
+@router.post("/competitors/samples")
+async def api_record_competitor_samples(request: CompetitorSamplesRequest):
+    """Record hourly follower/likes/comments/posts samples for competitor handles"""
+    from app.services.timeseries import get_competitor_series, save_competitor_series
+    
+    now = time.time()
+    by_handle: Dict[str, List[CompetitorSample]] = {}
+    for sample in request.samples:
+        by_handle.setdefault(sample.handle, []).append(sample)
+    
+    def record():
+        series = get_competitor_series()
+        for handle, samples in by_handle.items():
+            samples.sort(key=lambda sample: sample.timestamp or now)
+            series.record_many(
+                handle,
+                [sample.timestamp or now for sample in samples],
+                followers=[float("nan") if sample.followers is None else sample.followers for sample in samples],
+                likes=[sample.likes for sample in samples],
+                comments=[sample.comments for sample in samples],
+                posts=[sample.posts for sample in samples],
+            )
+        save_competitor_series(min_interval=COMPETITOR_SAVE_INTERVAL)
+    
+    # Loading and saving the series touch the disk
+    await run_in_threadpool(record)
+    # Every handle list and window may include the new samples
+    response_cache.invalidate_endpoint("competitors")
+    return {"recorded": len(request.samples), "handles": len(by_handle)}
 
 
 @router.get("/competitors-demo")
-def api_competitors_demo():
+async def api_competitors_demo():
     """Get competitor analysis with demo data"""
-    return analyze_competitors()
+    return await response_cache.aget_or_compute("competitors", {}, lambda: run_in_threadpool(analyze_competitors))
 
 
 @router.post("/rewrite-caption")
-def api_rewrite_caption(request: RewriteRequest):
+async def api_rewrite_caption(request: RewriteRequest):
     """Rewrite caption for higher engagement"""
-    return rewrite_caption(
+    return await cpu_executor.run_local(
+        "rewrite-caption",
+        rewrite_caption,
         original=request.content,
         style=request.style,
-        platform=request.platform
+        platform=request.platform,
+        variants=request.variants,
+        top_k=request.top_k
+    )
+
+
+@router.post("/rewrite-caption/batch")
+async def api_rewrite_caption_batch(request: RewriteBatchRequest):
+    """Rewrite many captions, results in input order"""
+    return await cpu_executor.map_json(
+        "rewrite-caption-batch",
+        rewrite_caption_batch,
+        request.captions,
+        REWRITE_BATCH_CHUNK_SIZE,
+        style=request.style,
+        platform=request.platform,
+        variants=request.variants,
+        top_k=request.top_k
     )
 
 
 @router.post("/translate")
-def api_translate(request: MultilingualRequest):
+async def api_translate(request: MultilingualRequest):
     """Generate multilingual content"""
-    return generate_multilingual(
+    return await cpu_executor.run_local(
+        "translate",
+        generate_multilingual,
         content=request.content,
         target_languages=request.languages
     )
+
+
+async def stream_sentiment(body: IO[bytes], admission: Admission) -> AsyncIterator[str]:
+    """Analyze comments chunk by chunk, keeping only running totals in memory"""
+    aggregate = SentimentAggregate()
+    try:
+        with body:
+            while True:
+                # Each chunk queues for the executor like any call, so a long stream takes turns with other tenants
+                lines = await cpu_executor.call_local("analyze-sentiment", analyze_next_chunk, body, aggregate)
+                if lines is None:
+                    break
+                yield lines
+        
+        summary = aggregate.summary()
+        summary["total_comments"] = aggregate.total
+        summary["action_items"] = generate_sentiment_actions(aggregate.sentiment_counts)
+        yield encode_ndjson([{"summary": summary}])
+    finally:
+        admission.release()
+
+
+def analyze_next_chunk(body: IO[bytes], aggregate: SentimentAggregate) -> Optional[str]:
+    """NDJSON results of the next SENTIMENT_STREAM_CHUNK_SIZE comments; None at the end of the body"""
+    chunk = []
+    for line in body:
+        comment = parse_comment_line(line)
+        if comment is not None:
+            chunk.append(comment)
+            if len(chunk) >= SENTIMENT_STREAM_CHUNK_SIZE:
+                break
+    return encode_ndjson(aggregate.analyze(chunk)) if chunk else None
+
+
+def analyze_sentiment_chunk(comments: List[str]) -> Tuple[SentimentAggregate, bytes]:
+    """Totals and JSON-encoded results of one chunk; runs in the executor"""
+    aggregate = SentimentAggregate()
+    return aggregate, encode_json(aggregate.analyze(comments))
+
+
+def combine_sentiment_chunks(comments: List[str], parts: List[Tuple[SentimentAggregate, bytes]]) -> bytes:
+    """The analyze_sentiment response from its chunks, without decoding their results"""
+    aggregate = SentimentAggregate()
+    for chunk_aggregate, _ in parts:
+        aggregate.merge(chunk_aggregate)
+    head = encode_json(aggregate.summary())
+    tail = encode_json({
+        "key_themes": extract_themes(comments),
+        "action_items": generate_sentiment_actions(aggregate.sentiment_counts),
+    })
+    analyzed = join_json_lists([encoded for _, encoded in parts])
+    return head[:-1] + b',"analyzed_comments":' + analyzed + b"," + tail[1:]
+
+
+def parse_comment_line(line: bytes) -> Optional[str]:
+    """A line is a JSON string, a {"text": ...} object, or plain text"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        value = json.loads(line)
+    except ValueError:
+        return line.decode("utf-8", errors="replace")
+    if isinstance(value, dict):
+        return str(value.get("text") or value.get("comment") or "")
+    return str(value)
+
+
+def encode_ndjson(records: List[dict]) -> str:
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
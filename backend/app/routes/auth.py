@@ -0,0 +1,21 @@
+from typing import Optional
+
+from fastapi import Header, HTTPException
+from app.tenancy import DEFAULT_TENANT, TENANT_API_KEYS, TENANT_PATTERN, set_tenant
+
+
+async def current_tenant(x_tenant: Optional[str] = Header(None),
+                         authorization: Optional[str] = Header(None)) -> str:
+    # Async so the context variable is set in the request's own task, where the handler runs
+    if TENANT_API_KEYS:
+        scheme, _, key = (authorization or "").partition(" ")
+        tenant = TENANT_API_KEYS.get(key) if scheme.lower() == "bearer" else None
+        if tenant is None:
+            raise HTTPException(status_code=401, detail="Invalid or missing API key",
+                                headers={"WWW-Authenticate": "Bearer"})
+    else:
+        tenant = x_tenant or DEFAULT_TENANT
+        if not TENANT_PATTERN.match(tenant):
+            raise HTTPException(status_code=400, detail="Invalid X-Tenant")
+    set_tenant(tenant)
+    return tenant
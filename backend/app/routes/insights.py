@@ -1,7 +1,15 @@
-from fastapi import APIRouter
-from app.services.analytics import extract_insights
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
 
-router = APIRouter(prefix="/insights")
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from app.routes.auth import current_tenant
+from app.schemas import to_naive_utc
+from app.services.analytics import ALL, insights_aggregator
+from app.services.ingestion import IngestQueueFull, engagement_pipeline
+
+router = APIRouter(prefix="/insights", dependencies=[Depends(current_tenant)])
 
 sample_posts = [
     {"hour": 9, "engagement": 120, "content_type": "image"},
@@ -9,6 +17,73 @@ sample_posts = [
     {"hour": 18, "engagement": 250, "content_type": "text"},
 ]
 
+# Until the database has posts with engagement (see ingestion.load_insights)
+insights_aggregator.rebuild(sample_posts)
+
+
+class EngagementRecord(BaseModel):
+    hour: int = Field(ge=0, le=23)
+    content_type: str = Field(max_length=50)
+    platform: str = Field("twitter", max_length=50)
+    engagement: float
+    # Unix seconds; defaults to now
+    timestamp: Optional[float] = None
+
+
+class EngagementEvent(BaseModel):
+    post_id: int
+    # "delta" (webhooks) adds to the counts, "total" (polls) replaces them
+    kind: Literal["delta", "total"] = "delta"
+    likes: Optional[int] = None
+    comments: Optional[int] = None
+    shares: Optional[int] = None
+
+
+def unix_seconds(value: Optional[datetime]) -> Optional[float]:
+    # Naive datetimes are UTC, as for the schedule
+    return to_naive_utc(value).replace(tzinfo=timezone.utc).timestamp() if value else None
+
+
 @router.get("/")
-def get_insights():
-    return extract_insights(sample_posts)
+async def get_insights(platform: str = ALL, tenant: str = Depends(current_tenant)):
+    # Microseconds from the tenant's running aggregates (memoized until they change), so no threadpool hop
+    return insights_aggregator.insights(tenant, platform)
+
+@router.get("/history")
+async def get_history_insights(platform: Optional[str] = None, start: Optional[datetime] = Query(None, alias="from"),
+                               end: Optional[datetime] = Query(None, alias="to"), tenant: str = Depends(current_tenant)):
+    # Scans the tenant's memory-mapped engagement history, optionally published within [from, to)
+    from app.services.engagement_store import get_engagement_history
+    
+    return await run_in_threadpool(get_engagement_history(tenant).insights, platform, unix_seconds(start),
+                                   unix_seconds(end))
+
+@router.post("/history")
+async def record_history(records: List[EngagementRecord], tenant: str = Depends(current_tenant)):
+    # Appends published posts' engagement to the tenant's history
+    from app.services.engagement_store import get_engagement_history
+    
+    try:
+        added = await run_in_threadpool(get_engagement_history(tenant).append_posts,
+                                        [record.model_dump() for record in records])
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"recorded": added}
+
+@router.post("/events", status_code=202)
+async def ingest_events(events: List[EngagementEvent], tenant: str = Depends(current_tenant)):
+    # Buffered inline (a list append); written to the tenant's posts by the ingestion pipeline's flusher
+    if len(events) > engagement_pipeline.max_queue:
+        raise HTTPException(status_code=413, detail=f"At most {engagement_pipeline.max_queue} events per request")
+    try:
+        accepted = engagement_pipeline.submit([
+            (tenant, event.post_id, event.kind == "total", event.likes, event.comments, event.shares)
+            for event in events
+        ])
+    except IngestQueueFull:
+        raise HTTPException(status_code=503, detail="Ingestion queue full, retry later", headers={"Retry-After": "1"})
+    return {"accepted": accepted}
+
+@router.get("/events/stats")
+async def get_ingest_stats():
+    return engagement_pipeline.stats()
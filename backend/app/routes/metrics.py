@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.cache import response_cache
+from app.executor import cpu_executor
+from app.instrumentation import metrics, profiler
+
+# Mounted only with INSTRUMENTATION=1, see app/instrumentation.py
+router = APIRouter(tags=["Instrumentation"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    executor = cpu_executor.stats()
+    cache = response_cache.stats()
+    extra = {
+        "ai_executor_in_flight": ("gauge", executor["in_flight"]),
+        "ai_executor_rejected_total": ("counter", executor["rejected"]),
+        "response_cache_bytes": ("gauge", cache["bytes"]),
+        "response_cache_evictions_total": ("counter", cache["evictions"]),
+        "profiler_samples_total": ("counter", profiler.samples),
+    }
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/debug/profiles")
+def get_profiles(format: str = "json"):
+    """
+    Sampled stacks of the slowest requests since the profiler started;
+    format=folded returns one flamegraph.pl input with a root frame per request
+    """
+    slowest = profiler.slowest()
+    if format != "folded":
+        return {"running": profiler.running, "interval_ms": profiler.interval * 1000, "requests": slowest}
+    lines = [
+        f"{request['request']} ({request['duration_ms']} ms);{line}"
+        for request in slowest for line in request["folded"]
+    ]
+    return PlainTextResponse("\n".join(lines) + "\n")
+
+
+@router.post("/debug/profiler")
+def toggle_profiler(enabled: bool = True, reset: bool = False):
+    """Start or stop the sampling profiler; reset drops the kept stacks"""
+    if reset:
+        profiler.reset()
+    if enabled:
+        profiler.start()
+    else:
+        profiler.stop()
+    return {"running": profiler.running}
@@ -1,11 +1,43 @@
-from fastapi import APIRouter
+from typing import Optional
 
-router = APIRouter(prefix="/posts")
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.routes.auth import current_tenant
+from app.schemas import PostCreate
+from app.services.dedup import IdempotencyKeyReused, fingerprint_index, submit_post
+from app.services.post_store import DEFAULT_PAGE_SIZE, list_posts, post_to_dict
+
+router = APIRouter(prefix="/posts", dependencies=[Depends(current_tenant)])
 
 @router.get("/")
-def get_posts():
-    return []
+async def get_posts(response: Response, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                    tenant: str = Depends(current_tenant), db: Session = Depends(get_db)):
+    # The tenant's posts only: its account
+    def load_page():
+        posts, next_cursor = list_posts(db, account=tenant, cursor=cursor, limit=limit)
+        return [post_to_dict(post) for post in posts], next_cursor
+    
+    try:
+        page, next_cursor = await run_in_threadpool(load_page)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 @router.post("/")
-def create_post(post: dict):
-    return {"message": "Post created", "data": post}
+async def create_post(post: PostCreate, idempotency_key: Optional[str] = Header(None, max_length=255),
+                      tenant: str = Depends(current_tenant), db: Session = Depends(get_db)):
+    # Retries (same Idempotency-Key) and duplicate content return the stored posts instead of new ones
+    post.account = tenant
+    try:
+        return await run_in_threadpool(submit_post, db, "posts", post, "Post created", idempotency_key)
+    except IdempotencyKeyReused as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+@router.get("/dedup-stats")
+async def get_dedup_stats():
+    return fingerprint_index.stats()
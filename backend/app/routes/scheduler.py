@@ -1,14 +1,65 @@
-from fastapi import APIRouter
+from datetime import datetime
+from typing import Optional
 
-router = APIRouter(prefix="/schedule")
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
 
-scheduled_posts = []
+from app.database import get_db
+from app.routes.auth import current_tenant
+from app.schemas import PostCreate, to_naive_utc
+from app.services.dedup import IdempotencyKeyReused, submit_post
+from app.services.post_store import DEFAULT_PAGE_SIZE, list_scheduled, post_to_dict
+from app.services.schedule_import import IMPORT_FORMATS, import_scheduled_posts
+from app.uploads import spool_request_body
+
+router = APIRouter(prefix="/schedule", dependencies=[Depends(current_tenant)])
 
 @router.post("/")
-def schedule_post(post: dict):
-    scheduled_posts.append(post)
-    return {"message": "Post scheduled", "data": post}
+async def schedule_post(post: PostCreate, idempotency_key: Optional[str] = Header(None, max_length=255),
+                        tenant: str = Depends(current_tenant), db: Session = Depends(get_db)):
+    if post.scheduled_time is None:
+        raise HTTPException(status_code=422, detail="scheduled_time is required")
+    post.status = "scheduled"
+    post.account = tenant
+    try:
+        return await run_in_threadpool(submit_post, db, "schedule", post, "Post scheduled", idempotency_key)
+    except IdempotencyKeyReused as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+@router.post("/import")
+async def import_schedule(request: Request, format: Optional[str] = None, tenant: str = Depends(current_tenant),
+                          db: Session = Depends(get_db)):
+    # CSV or NDJSON body (format from ?format= or the content type), imported all or nothing
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(IMPORT_FORMATS)}")
+    body = await spool_request_body(request)
+    try:
+        with body:
+            result = await run_in_threadpool(import_scheduled_posts, db, body, format, account=tenant)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if result["error_count"]:
+        raise HTTPException(status_code=422, detail=result)
+    return {"message": "Posts scheduled", **result}
 
 @router.get("/")
-def get_schedule():
-    return scheduled_posts
+async def get_schedule(response: Response, platform: Optional[str] = None,
+                       start: Optional[datetime] = Query(None, alias="from"), end: Optional[datetime] = Query(None, alias="to"),
+                       cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                       tenant: str = Depends(current_tenant), db: Session = Depends(get_db)):
+    # The tenant's schedule; from/to bound scheduled_time to [from, to), e.g. one calendar month
+    def load_page():
+        posts, next_cursor = list_scheduled(db, account=tenant, cursor=cursor, limit=limit, platform=platform,
+                                            start=to_naive_utc(start), end=to_naive_utc(end))
+        return [post_to_dict(post) for post in posts], next_cursor
+    
+    try:
+        page, next_cursor = await run_in_threadpool(load_page)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
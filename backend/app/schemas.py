@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Times are stored as naive UTC"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class PostCreate(BaseModel):
+    """Incoming post; accepts the frontend's camelCase field names too"""
+    
+    model_config = ConfigDict(populate_by_name=True)
+    
+    content: str
+    account: str = "default"
+    platform: str = "twitter"
+    platforms: Optional[List[str]] = None
+    content_type: str = Field("text", alias="contentType")
+    # Posts scheduled from a client need a time, or they would sit in the schedule without one
+    status: Literal["draft", "scheduled", "published"] = "draft"
+    scheduled_time: Optional[datetime] = Field(None, alias="scheduledTime")
+    
+    @field_validator("scheduled_time", mode="before")
+    @classmethod
+    def empty_time_is_none(cls, value):
+        return value or None
+    
+    @field_validator("scheduled_time")
+    @classmethod
+    def scheduled_time_to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return to_naive_utc(value)
+    
+    @model_validator(mode="after")
+    def scheduled_needs_time(self) -> "PostCreate":
+        if self.status == "scheduled" and self.scheduled_time is None:
+            raise ValueError("scheduled_time is required for a scheduled post")
+        return self
+    
+    def rows(self) -> List[dict]:
+        """One insertable row per target platform"""
+        base = self.model_dump(exclude={"platform", "platforms"})
+        return [{**base, "platform": platform} for platform in (self.platforms or [self.platform])]
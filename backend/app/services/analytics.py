@@ -1,6 +1,20 @@
-import pandas as pd
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from app.instrumentation import timed
+
+@timed
 def extract_insights(posts):
+    """Best posting hour and content type by mean engagement, from post dicts or an EngagementStore"""
+    from app.services.engagement_store import EngagementStore
+
+    if isinstance(posts, EngagementStore):
+        # Aggregated column-wise from the mapped files, no row is materialized
+        return posts.insights()
+
+    import pandas as pd  # deferred: pandas dominates API cold start
+
     df = pd.DataFrame(posts)
 
     best_time = df.groupby("hour")["engagement"].mean().idxmax()
@@ -10,3 +24,129 @@ def extract_insights(posts):
         "best_posting_hour": int(best_time),
         "best_content_type": best_type
     }
+
+
+# Scope key meaning "every account" / "every platform"
+ALL = "*"
+
+
+class InsightsAggregator:
+    """Running engagement sums and counts per hour and per content type.
+
+    Kept per (account, platform) plus the account-wide, platform-wide and
+    global roll-ups, so every update is O(1) and a query is O(buckets).
+    Sums use the same compensated (Kahan) summation as pandas' groupby
+    mean, so rebuild() gives bit-identical results to extract_insights().
+    insights() results are reused until the next change, so any number of
+    dashboards polling at once cost one computation per update.
+    """
+
+    def __init__(self):
+        # scope -> dimension -> bucket key -> [sum, compensation, count]
+        self._scopes: Dict[Tuple[str, str], Dict[str, Dict[Any, List[float]]]] = {}
+        self._lock = threading.Lock()
+        # Bumped by every change; scope -> (version, insights) computed at that version
+        self._version = 0
+        self._results: Dict[Tuple[str, str], Tuple[int, Dict[str, Any]]] = {}
+
+    def _buckets(self, account: str, platform: str) -> List[Dict[str, Dict[Any, List[float]]]]:
+        buckets = []
+        for scope in {(account, platform), (account, ALL), (ALL, platform), (ALL, ALL)}:
+            if scope not in self._scopes:
+                self._scopes[scope] = {"hour": {}, "content_type": {}}
+            buckets.append(self._scopes[scope])
+        return buckets
+
+    @staticmethod
+    def _add(bucket: Dict[Any, List[float]], key: Any, value: float, count: int):
+        entry = bucket.get(key)
+        if entry is None:
+            entry = bucket[key] = [0.0, 0.0, 0]
+        y = value - entry[1]
+        t = entry[0] + y
+        entry[1] = t - entry[0] - y
+        entry[0] = t
+        entry[2] += count
+
+    def record(self, hour: int, content_type: str, engagement: float,
+               account: str = "default", platform: str = "twitter"):
+        """Add a post's engagement as a new sample"""
+        if engagement is None or math.isnan(engagement):
+            return
+        with self._lock:
+            self._version += 1
+            for scope in self._buckets(account, platform):
+                self._add(scope["hour"], hour, engagement, 1)
+                self._add(scope["content_type"], content_type, engagement, 1)
+
+    def adjust(self, hour: int, content_type: str, delta: float,
+               account: str = "default", platform: str = "twitter"):
+        """Apply an engagement change to an already recorded post"""
+        with self._lock:
+            self._version += 1
+            for scope in self._buckets(account, platform):
+                self._add(scope["hour"], hour, delta, 0)
+                self._add(scope["content_type"], content_type, delta, 0)
+
+    def remove(self, hour: int, content_type: str, engagement: float,
+               account: str = "default", platform: str = "twitter"):
+        """Withdraw a recorded post's sample (its current engagement)"""
+        with self._lock:
+            self._version += 1
+            for scope in self._buckets(account, platform):
+                self._add(scope["hour"], hour, -engagement, -1)
+                self._add(scope["content_type"], content_type, -engagement, -1)
+
+    def record_post(self, post: Dict[str, Any]):
+        self.record(post["hour"], post["content_type"], post["engagement"],
+                    post.get("account", "default"), post.get("platform", "twitter"))
+
+    def rebuild(self, posts: Iterable[Dict[str, Any]]):
+        """Discard running state and recompute from the full post history"""
+        with self._lock:
+            self._version += 1
+            self._scopes.clear()
+            self._results.clear()
+        for post in posts:
+            self.record_post(post)
+
+    def _best(self, dimension: str, account: str, platform: str) -> Optional[Any]:
+        with self._lock:
+            scope = self._scopes.get((account, platform))
+            if scope is None:
+                return None
+            # Sorted keys and strict > give idxmax's first-key tie-break
+            best_key, best_mean = None, None
+            for key in sorted(scope[dimension]):
+                total, _, count = scope[dimension][key]
+                if count and (best_mean is None or total / count > best_mean):
+                    best_key, best_mean = key, total / count
+            return best_key
+
+    def best_posting_hour(self, account: str = ALL, platform: str = ALL) -> Optional[int]:
+        return self._best("hour", account, platform)
+
+    def best_content_type(self, account: str = ALL, platform: str = ALL) -> Optional[str]:
+        return self._best("content_type", account, platform)
+
+    @timed
+    def insights(self, account: str = ALL, platform: str = ALL) -> Dict[str, Any]:
+        scope = (account, platform)
+        with self._lock:
+            version = self._version
+            cached = self._results.get(scope)
+        if cached is not None and cached[0] == version:
+            return dict(cached[1])
+        best_hour = self.best_posting_hour(account, platform)
+        result = {
+            "best_posting_hour": int(best_hour) if best_hour is not None else None,
+            "best_content_type": self.best_content_type(account, platform)
+        }
+        with self._lock:
+            # Only scopes with data, so queries for unknown accounts cannot grow this
+            if scope in self._scopes:
+                self._results[scope] = (version, result)
+        return dict(result)
+
+
+insights_aggregator = InsightsAggregator()
@@ -0,0 +1,222 @@
+"""
+Variant generation and scoring for rewrite_caption.
+
+A variant is opener + caption + closer. Openers are the requested style's
+hooks plus a few unstyled framings; closers combine a question, a
+call-to-action, a hashtag line and, after the style's own hooks only, its
+sign-off, so styles never mix; every style has at least MAX_VARIANTS
+templates. Every opener ends and every closer starts with whitespace
+(or is empty), so a variant's TextStats are exactly the caption's combined
+with the template's. Template stats are summarized once per process as
+NumPy columns, and variants are scored by the content and engagement
+scorers without their text ever being built.
+
+Scores stream out of a generator a chunk at a time into a heap bounded at
+top_k entries; a chunk only touches the heap for variants that beat its
+root, and only the survivors are rendered into variation dicts, so memory
+stays flat in the number of variants.
+"""
+
+import heapq
+import itertools
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from app.services.ai_services import (
+    TextStats,
+    adjusted_engagement_score,
+    calculate_engagement_base_score,
+    calculate_engagement_base_scores,
+    combine_text_stats,
+    content_score_breakdown,
+    content_score_breakdowns,
+    engagement_features,
+    platform_multiplier,
+    text_stats,
+)
+from app.services.keyword_index import mask_columns
+
+CAPTION_STYLES = {
+    "engaging": {
+        "prefix": "✨ ",
+        "suffix": "\n\n👇 What do you think?",
+        "hooks": ["Here's why this matters:", "Most people don't know this:", "The secret is:"]
+    },
+    "professional": {
+        "prefix": "",
+        "suffix": "\n\n#professional #insights",
+        "hooks": ["Key insight:", "Important update:", "Industry perspective:"]
+    },
+    "casual": {
+        "prefix": "Hey everyone! ",
+        "suffix": " 🙌",
+        "hooks": ["So basically,", "Real talk:", "Here's the thing:"]
+    },
+    "viral": {
+        "prefix": "🔥 ",
+        "suffix": "\n\nRT if you agree! 🔄",
+        "hooks": ["THREAD:", "This will blow your mind:", "Stop scrolling!"]
+    }
+}
+
+# Openers outside the styles: (style, opener)
+FRAMINGS = [
+    ("question", "Did you know? "),
+    ("story", "Here's something interesting:\n\n"),
+    ("original", ""),
+]
+
+QUESTIONS = ["", "\n\nWhat do you think?", "\n\nHave you tried this?"]
+CALLS_TO_ACTION = [
+    "",
+    "\n\nDrop a 🔥 if this resonates!",
+    "\n\nSave this for later! 📌",
+    "\n\nShare this with someone who needs it.",
+    "\n\nComment your take below.",
+    "\n\nFollow for more like this.",
+    "\n\nClick the link in bio to learn more.",
+]
+HASHTAG_LINES = [
+    "",
+    "\n\n#tips",
+    "\n\n#growth #tips",
+    "\n\n#community",
+    "\n\n#smallbusiness #marketing",
+    "\n\n#socialmedia #contentcreator #marketing",
+]
+
+# Templates in the smallest style: each hook takes every closer with and without the sign-off, each framing every plain one
+MAX_VARIANTS = min(
+    (2 * len(config["hooks"]) + len(FRAMINGS)) * len(QUESTIONS) * len(CALLS_TO_ACTION) * len(HASHTAG_LINES)
+    for config in CAPTION_STYLES.values()
+)
+
+# Variants scored per caption unless the caller asks for another number
+DEFAULT_VARIANTS = 100
+
+# Templates scored per NumPy pass; the heap threshold is re-read between chunks
+CHUNK_SIZE = 256
+
+# Per requested style: ([(style, hook, opener, closer)], TextStats of opener + closer as columns)
+_templates: Dict[str, Tuple[List[Tuple[str, str, str, str]], TextStats]] = {}
+
+
+def caption_templates(style: str = "engaging") -> Tuple[List[Tuple[str, str, str, str]], TextStats]:
+    """
+    Every (opener, closer) template of a style, ordered in rounds so any
+    prefix of the list covers all openers: round r pairs each opener with
+    its r-th closer. The style's hooks lead each round.
+    """
+    if style not in CAPTION_STYLES:
+        raise ValueError(f"Unknown caption style: {style}")
+    if style not in _templates:
+        config = CAPTION_STYLES[style]
+        # The call-to-action varies fastest and the hashtag line slowest, so early rounds differ in the CTA first
+        plain_closers = [question + cta + hashtags
+                         for hashtags, question, cta in itertools.product(HASHTAG_LINES, QUESTIONS, CALLS_TO_ACTION)]
+        styled_closers = [closer + config["suffix"] for closer in plain_closers]
+        # Styled closers first, interleaved with plain ones so both show up in any prefix
+        hook_closers = [closer for pair in zip(styled_closers, plain_closers) for closer in pair]
+        openers = [
+            (style, hook, f"{config['prefix']}{hook} ", hook_closers) for hook in config["hooks"]
+        ] + [(name, "", opener, plain_closers) for name, opener in FRAMINGS]
+        
+        templates, stats = [], []
+        for round_index in range(max(len(closers) for *_, closers in openers)):
+            for name, hook, opener, closers in openers:
+                if round_index < len(closers):
+                    closer = closers[round_index]
+                    templates.append((name, hook, opener, closer))
+                    stats.append(combine_text_stats(text_stats(opener), text_stats(closer)))
+        columns = [np.array(column) for column in zip(*stats)]
+        columns[TextStats._fields.index("keywords")] = mask_columns([stat.keywords for stat in stats])
+        _templates[style] = (templates, TextStats(*columns))
+    return _templates[style]
+
+
+def score_stats(stats: TextStats, platform: str) -> Tuple[float, int, float]:
+    """(rank score, predicted engagement, content score) of a text from its stats"""
+    breakdown = content_score_breakdown(stats, platform)
+    content_score = sum(breakdown.values()) / len(breakdown)
+    engagement = adjusted_engagement_score(calculate_engagement_base_score(engagement_features(stats)), platform, "text")
+    return (engagement + content_score) / 2, engagement, content_score
+
+
+def iter_variant_scores(original: str, platform: str, columns: TextStats,
+                        count: int) -> Iterator[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Lazily score the first `count` templates applied to original, CHUNK_SIZE
+    at a time: (first template index, rank scores, engagement, content scores)
+    """
+    base = text_stats(original)
+    # As a one-row mask column, so it broadcasts against the templates'
+    base = base._replace(keywords=mask_columns([base.keywords]))
+    multiplier = platform_multiplier(platform, "text")
+    for start in range(0, count, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, count)
+        stats = combine_text_stats(base, TextStats(*(column[start:end] for column in columns)))
+        breakdown = content_score_breakdowns(stats, platform)
+        content_scores = sum(breakdown.values()) / len(breakdown)
+        base_scores = calculate_engagement_base_scores(engagement_features(stats))
+        engagement = np.minimum(100, (base_scores * multiplier).astype(int))
+        yield start, (engagement + content_scores) / 2, engagement, content_scores
+
+
+def top_scored(chunks: Iterator[Tuple[int, np.ndarray, np.ndarray, np.ndarray]],
+               k: int) -> List[Tuple[float, int, float, int]]:
+    """
+    Best k (rank score, engagement, content score, template index) of a chunk
+    stream, highest first; ties go to the earlier template
+    """
+    # Keyed by (score, -index): the root is the weakest survivor
+    heap: List[Tuple[float, int, Tuple[float, int, float, int]]] = []
+    for start, scores, engagement, content_scores in chunks:
+        # Only variants that beat the current root can enter the heap
+        candidates = np.flatnonzero(scores > heap[0][0]) if len(heap) == k else range(len(scores))
+        for i in candidates:
+            item = (float(scores[i]), int(engagement[i]), float(content_scores[i]), start + int(i))
+            entry = (item[0], -item[3], item)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+    return [entry[2] for entry in sorted(heap, reverse=True)]
+
+
+def best_caption_variants(original: str, style: str = "engaging", platform: str = "twitter",
+                          variants: int = DEFAULT_VARIANTS, top_k: int = 3) -> List[Dict[str, Any]]:
+    """The top_k of the first `variants` templates applied to original, best first"""
+    if not 1 <= variants <= MAX_VARIANTS:
+        raise ValueError(f"variants must be between 1 and {MAX_VARIANTS}")
+    templates, columns = caption_templates(style)
+    best = top_scored(iter_variant_scores(original, platform, columns, variants), max(1, top_k))
+    results = []
+    for score, engagement, content_score, index in best:
+        name, hook, opener, closer = templates[index]
+        results.append({
+            "text": f"{opener}{original}{closer}",
+            "predicted_engagement": engagement,
+            "content_score": round(content_score, 1),
+            "score": round(score, 1),
+            "style": name,
+            "hook": hook or None,
+        })
+    return results
+
+
+def variant_improvements(original: str, variant: Dict[str, Any], platform: str) -> List[str]:
+    """What the recommended variant adds over the original caption"""
+    before = text_stats(original)
+    after = text_stats(variant["text"])
+    improvements = []
+    if variant["hook"]:
+        improvements.append("Added engagement hook")
+    if engagement_features(after)["has_call_to_action"] and not engagement_features(before)["has_call_to_action"]:
+        improvements.append("Included call-to-action")
+    if after.has_question and not before.has_question:
+        improvements.append("Added a question to invite comments")
+    if variant["score"] > score_stats(before, platform)[0]:
+        improvements.append("Optimized for algorithm visibility")
+    return improvements or ["The original already scores well; variations are for A/B testing"]
+
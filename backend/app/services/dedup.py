@@ -0,0 +1,280 @@
+"""
+Duplicate-safe post creation.
+
+Two guards, both answering a repeat with the original result and no new work:
+    
+    Idempotency-Key   the first response to (route, account, key) is stored in the
+                      same transaction as the posts it created and replayed
+                      for retries; reusing a key for a different request is
+                      an error
+    content hash      a post whose normalized content (case, whitespace and
+                      zero-width characters folded) matches an existing post
+                      of the same account, platform, status and scheduled
+                      time returns that post; a draft never stands in for
+                      a scheduled post or the other way round
+
+Content hashes live in the post_fingerprints table, whose primary key is
+what actually rejects a duplicate, including one from a concurrent request.
+A Bloom filter in front of it answers "definitely new" for most posts, so
+only possible duplicates cost an indexed lookup. The filter is loaded from
+the table at startup for at most DEDUP_LOAD_BUDGET seconds, and finished in
+a background thread if that was not enough; until it is complete every
+check goes to the table.
+
+    DEDUP_BLOOM_CAPACITY   fingerprints the filter is sized for at a 1% false
+                           positive rate (default: 1,000,000, ~1.2 MB); past
+                           that it only gets less selective
+    DEDUP_LOAD_BUDGET      seconds of startup spent loading it (default: 2)
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import IdempotencyRecord, Post, PostFingerprint
+from app.schemas import PostCreate
+from app.services.post_store import post_to_dict
+
+DEDUP_BLOOM_CAPACITY = int(os.getenv("DEDUP_BLOOM_CAPACITY", "1000000"))
+DEDUP_LOAD_BUDGET = float(os.getenv("DEDUP_LOAD_BUDGET", "2"))
+
+# Fingerprints read per query while loading the filter
+LOAD_BATCH_SIZE = 20000
+# Keys per IN (...) lookup, well under SQLite's bound-parameter limit
+LOOKUP_BATCH_SIZE = 500
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+ZERO_WIDTH_PATTERN = re.compile("[\u200b-\u200d\u2060\ufeff]")
+
+
+class IdempotencyKeyReused(ValueError):
+    """The Idempotency-Key was first used for a different request"""
+
+
+def normalize_content(content: str) -> str:
+    """Content as compared for duplicates: NFKC, case-folded, zero-width characters dropped, whitespace collapsed"""
+    content = ZERO_WIDTH_PATTERN.sub("", unicodedata.normalize("NFKC", content)).casefold()
+    return WHITESPACE_PATTERN.sub(" ", content).strip()
+
+
+def content_fingerprint(account: str, platform: str, content: str, status: str = "draft",
+                        scheduled_time: Optional[datetime] = None) -> str:
+    when = scheduled_time.isoformat() if scheduled_time else ""
+    text = f"{account}\x00{platform}\x00{status}\x00{when}\x00{normalize_content(content)}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def row_fingerprint(row: Dict[str, Any]) -> str:
+    """Fingerprint of an insertable post row, with the column defaults"""
+    return content_fingerprint(row.get("account", "default"), row.get("platform", "twitter"), row["content"],
+                               row.get("status", "draft"), row.get("scheduled_time"))
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives, over hex digest keys"""
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _indexes(self, key: str):
+        # Double hashing over the two halves of the (already uniform) digest
+        h1 = int(key[:16], 16)
+        h2 = int(key[16:], 16) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+    
+    def add(self, key: str):
+        self.update([key])
+    
+    def update(self, keys: List[str]):
+        bits, size, hashes = self.bits, self.size, range(self.hashes)
+        for key in keys:
+            h1 = int(key[:16], 16)
+            h2 = int(key[16:], 16) | 1
+            for i in hashes:
+                index = (h1 + i * h2) % size
+                bits[index >> 3] |= 1 << (index & 7)
+        self.count += len(keys)
+    
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(key))
+
+
+class FingerprintIndex:
+    """Bloom filter over post_fingerprints, loaded from storage in bounded time"""
+    
+    def __init__(self, capacity: int = DEDUP_BLOOM_CAPACITY, session_factory: Callable = SessionLocal):
+        self.session_factory = session_factory
+        self.bloom = BloomFilter(capacity)
+        self.complete = False
+        self._lock = threading.Lock()
+        self._loader: Optional[threading.Thread] = None
+        self._counters = {"checks": 0, "skipped_lookups": 0, "lookups": 0, "duplicates": 0}
+    
+    def load(self, budget: float = DEDUP_LOAD_BUDGET) -> bool:
+        """
+        Add stored fingerprints for up to budget seconds; if they are not all
+        in by then, the rest load in a background thread. True when complete.
+        """
+        deadline = time.monotonic() + budget
+        after = self._load_from(None, deadline)
+        if after is not None:
+            self._loader = threading.Thread(target=self._load_from, args=(after, None), daemon=True,
+                                            name="fingerprint-loader")
+            self._loader.start()
+        return self.complete
+    
+    def _load_from(self, after: Optional[str], deadline: Optional[float]) -> Optional[str]:
+        """Load keys past `after` in key order; returns where it stopped, None once done"""
+        with self.session_factory() as db:
+            while True:
+                query = select(PostFingerprint.key).order_by(PostFingerprint.key).limit(LOAD_BATCH_SIZE)
+                if after is not None:
+                    query = query.where(PostFingerprint.key > after)
+                keys = db.scalars(query).all()
+                with self._lock:
+                    self.bloom.update(keys)
+                if len(keys) < LOAD_BATCH_SIZE:
+                    self.complete = True
+                    return None
+                after = keys[-1]
+                if deadline is not None and time.monotonic() >= deadline:
+                    return after
+    
+    def add(self, keys: List[str]):
+        with self._lock:
+            self.bloom.update(keys)
+    
+    def find(self, db: Session, keys: List[str]) -> Dict[str, int]:
+        """Fingerprint -> post id of the keys already stored"""
+        with self._lock:
+            maybe = [key for key in keys if not self.complete or key in self.bloom]
+            self._counters["checks"] += len(keys)
+            self._counters["skipped_lookups"] += len(keys) - len(maybe)
+            self._counters["lookups"] += len(maybe)
+        found = {}
+        for start in range(0, len(maybe), LOOKUP_BATCH_SIZE):
+            query = select(PostFingerprint.key, PostFingerprint.post_id).where(
+                PostFingerprint.key.in_(maybe[start:start + LOOKUP_BATCH_SIZE])
+            )
+            found.update(db.execute(query).all())
+        with self._lock:
+            self._counters["duplicates"] += len(found)
+        return found
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "complete": self.complete,
+                "fingerprints": self.bloom.count,
+                "bloom_bytes": len(self.bloom.bits),
+            }
+
+
+fingerprint_index = FingerprintIndex()
+
+
+def create_posts_once(db: Session, rows: List[Dict[str, Any]]) -> Tuple[List[Post], List[int]]:
+    """
+    Insert the rows whose fingerprint is new and return the post for every
+    row (the existing one for duplicates) plus the ids of the duplicates.
+    Flushes but leaves the commit to the caller.
+    """
+    keys = [row_fingerprint(row) for row in rows]
+    existing = fingerprint_index.find(db, list(dict.fromkeys(keys)))
+    new = {}
+    for key, row in zip(keys, rows):
+        if key not in existing and key not in new:
+            new[key] = Post(**row)
+    db.add_all(new.values())
+    db.flush()
+    db.add_all(PostFingerprint(key=key, post_id=post.id) for key, post in new.items())
+    db.flush()
+    
+    stored = {post.id: post for post in new.values()}
+    if existing:
+        stored.update((post.id, post) for post in db.scalars(select(Post).where(Post.id.in_(set(existing.values())))))
+    ids = [new[key].id if key in new else existing[key] for key in keys]
+    return [stored[post_id] for post_id in ids], sorted(set(existing.values()))
+
+
+def insert_posts_once(db: Session, rows: List[Dict[str, Any]]) -> Tuple[List[str], int]:
+    """
+    Bulk counterpart of create_posts_once: insert the rows whose fingerprint
+    is new with one executemany each for posts and fingerprints. Returns the
+    new fingerprints, for the filter once the caller commits, and the number
+    of duplicates skipped.
+    """
+    keys = [row_fingerprint(row) for row in rows]
+    existing = fingerprint_index.find(db, list(dict.fromkeys(keys)))
+    new = {}
+    for key, row in zip(keys, rows):
+        if key not in existing and key not in new:
+            new[key] = row
+    if new:
+        now = datetime.utcnow()
+        # RETURNING order is unspecified for a multi-row insert; rows are matched back by their columns
+        # (distinct fingerprints mean distinct columns), which keeps the insert one statement per batch
+        table = Post.__table__
+        by_columns = {(row.get("account", "default"), row.get("platform", "twitter"), row.get("status", "draft"),
+                       row.get("scheduled_time"), row["content"]): key for key, row in new.items()}
+        inserted = db.execute(
+            insert(table).returning(table.c.id, table.c.account, table.c.platform, table.c.status,
+                                    table.c.scheduled_time, table.c.content),
+            [{"created_at": now, "updated_at": now, **row} for row in new.values()],
+        ).all()
+        db.execute(insert(PostFingerprint.__table__),
+                   [{"key": by_columns[tuple(values)], "post_id": post_id} for post_id, *values in inserted])
+    return list(new), len(rows) - len(new)
+
+
+def submit_post(db: Session, route: str, post: PostCreate, message: str,
+                idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Create a post (one per target platform) unless it is a retry or a
+    duplicate; either way the response describes the stored posts
+    """
+    request_hash = hashlib.blake2b(post.model_dump_json().encode("utf-8"), digest_size=16).hexdigest()
+    # Per account, so one tenant's keys never return another's posts
+    record_key = f"{route} {post.account} {idempotency_key}" if idempotency_key else None
+    # A concurrent duplicate loses on a primary key; the retry then finds what it inserted
+    for attempt in range(2):
+        if record_key:
+            record = db.get(IdempotencyRecord, record_key)
+            if record is not None:
+                if record.request_hash != request_hash:
+                    raise IdempotencyKeyReused("Idempotency-Key was already used for a different request")
+                return json.loads(record.response)
+        try:
+            posts, duplicates = create_posts_once(db, post.rows())
+            response = {"message": message, "data": [post_to_dict(p) for p in posts], "duplicates": duplicates}
+            if record_key:
+                db.add(IdempotencyRecord(key=record_key, request_hash=request_hash, response=json.dumps(response)))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            if attempt:
+                raise
+            continue
+        fingerprint_index.add([
+            content_fingerprint(p.account, p.platform, p.content, p.status, p.scheduled_time)
+            for p in posts if p.id not in duplicates
+        ])
+        return response
@@ -0,0 +1,369 @@
+"""
+Trained engagement models.
+
+A model maps the content features from ai_services' extractors (plus
+platform and content type) to log1p(likes, comments, shares, impressions).
+Two kinds are supported: ridge regression ("linear") and gradient-boosted
+depth-limited trees ("gbm"). Both predict on a NumPy feature matrix for a
+whole batch at once.
+
+A saved model is a directory holding model.json and one .npy file per
+weight array. ENGAGEMENT_MODEL_PATH is a symlink to the current version's
+directory; saving writes a new version and swaps the link, so a reader
+that resolves the link once sees one whole model. Arrays are opened
+memory-mapped, so the API process and the CPU executor's workers share
+one copy of the weights in the page cache.
+app.services.model_registry loads a model once per process; restart (or
+call reload_engagement_model) after retraining.
+
+Train from the published posts in the database:
+    
+    python -m app.services.engagement_model --kind gbm --output ./engagement_model
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.model_registry import ENGAGEMENT_MODEL_PATH
+
+PLATFORMS = ["twitter", "instagram", "facebook", "linkedin"]
+CONTENT_TYPES = ["text", "image", "video", "carousel"]
+CONTENT_FEATURES = ["has_hashtags", "has_emojis", "has_question", "has_call_to_action", "has_recommended_cta"]
+FEATURE_NAMES = (
+    ["length_ideal", "length_short", "log_length"]
+    + CONTENT_FEATURES
+    + [f"platform_{platform}" for platform in PLATFORMS]
+    + [f"content_type_{content_type}" for content_type in CONTENT_TYPES]
+)
+TARGETS = ["likes", "comments", "shares", "impressions"]
+
+# Score 50 stands for the typical engagement rate; used when the history has none (middle of the rules' 2-8%)
+DEFAULT_ENGAGEMENT_RATE = 0.05
+# Rows per vectorized tree walk; bounds the (rows x trees) index arrays to a few MB
+PREDICT_CHUNK_SIZE = 4096
+
+
+def engagement_feature_matrix(features: Dict[str, Any], platforms: Sequence[str],
+                              content_types: Sequence[str]) -> np.ndarray:
+    """
+    Model input for posts described by extract_engagement_features() (or the
+    same keys as lists), one row per post
+    """
+    length = np.asarray(features["length"], dtype=np.float64)
+    matrix = np.zeros((len(length), len(FEATURE_NAMES)), dtype=np.float64)
+    matrix[:, 0] = (length >= 100) & (length <= 280)
+    matrix[:, 1] = length < 50
+    matrix[:, 2] = np.log1p(length)
+    for column, name in enumerate(CONTENT_FEATURES, start=3):
+        matrix[:, column] = features[name]
+    matrix[:, 3 + len(CONTENT_FEATURES):3 + len(CONTENT_FEATURES) + len(PLATFORMS)] = _one_hot(platforms, PLATFORMS)
+    matrix[:, -len(CONTENT_TYPES):] = _one_hot(content_types, CONTENT_TYPES)
+    return matrix
+
+
+def _one_hot(values: Sequence[str], categories: List[str]) -> np.ndarray:
+    index = {category: position for position, category in enumerate(categories)}
+    encoded = np.zeros((len(values), len(categories)), dtype=np.float64)
+    positions = np.fromiter((index.get(value, -1) for value in values), dtype=np.intp, count=len(values))
+    known = positions >= 0
+    encoded[np.flatnonzero(known), positions[known]] = 1
+    return encoded
+
+
+class LinearEngagementModel:
+    """Ridge regression per target; coef has a bias row first"""
+    
+    kind = "linear"
+    
+    def __init__(self, coef: np.ndarray, meta: Dict[str, Any]):
+        self.coef = coef
+        self.meta = meta
+    
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """log1p(target) estimates, one row per post and one column per target"""
+        return matrix @ self.coef[1:] + self.coef[0]
+    
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"coef": self.coef}
+    
+    @classmethod
+    def fit(cls, matrix: np.ndarray, targets: np.ndarray, alpha: float = 1.0, **_) -> "LinearEngagementModel":
+        design = np.hstack([np.ones((len(matrix), 1)), matrix])
+        penalty = alpha * np.eye(design.shape[1])
+        penalty[0, 0] = 0  # the bias isn't regularized
+        coef = np.linalg.solve(design.T @ design + penalty, design.T @ targets)
+        return cls(coef, {"alpha": alpha})
+
+
+class GradientBoostedEngagementModel:
+    """
+    Gradient-boosted regression trees with squared loss. Each tree predicts
+    all targets at once (a leaf holds one value per target), so one
+    ensemble serves the four targets.
+    
+    Trees are complete binary trees of a fixed depth stored as flat arrays
+    (node i has children 2i+1 and 2i+2), so every row of a batch walks every
+    tree in lockstep: `depth` vectorized steps in total. A node that doesn't
+    split has threshold +inf and sends every row left.
+    """
+    
+    kind = "gbm"
+    
+    def __init__(self, base: np.ndarray, feature: np.ndarray, threshold: np.ndarray, leaf: np.ndarray,
+                 meta: Dict[str, Any]):
+        self.base = base            # (targets,)
+        self.feature = feature      # (trees, internal nodes)
+        self.threshold = threshold  # (trees, internal nodes)
+        self.leaf = leaf            # (trees, leaves, targets), already scaled by the learning rate
+        self.meta = meta
+        trees, self.internal = feature.shape
+        self.depth = int(math.log2(leaf.shape[1]))
+        # Flat views plus per-tree offsets: 1-D take() is much cheaper than 2-D fancy indexing.
+        # Leaves are laid out target-major so the sum over trees runs along contiguous memory.
+        self._feature = np.ravel(feature).astype(np.intp)
+        self._threshold = np.asarray(threshold).ravel()
+        self._leaf = np.ascontiguousarray(np.reshape(leaf, (-1, leaf.shape[2])).T)
+        self._node_offset = np.arange(trees) * self.internal
+        self._leaf_offset = np.arange(trees) * leaf.shape[1] - self.internal
+    
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """log1p(target) estimates, one row per post and one column per target"""
+        if len(matrix) > PREDICT_CHUNK_SIZE:
+            return np.vstack([self.predict(matrix[start:start + PREDICT_CHUNK_SIZE])
+                              for start in range(0, len(matrix), PREDICT_CHUNK_SIZE)])
+        values = np.ascontiguousarray(matrix).ravel()
+        row_offset = (np.arange(len(matrix)) * matrix.shape[1])[:, None]
+        node = np.zeros((len(matrix), len(self._node_offset)), dtype=np.intp)
+        for _ in range(self.depth):
+            index = node + self._node_offset
+            go_right = values.take(row_offset + self._feature.take(index)) > self._threshold.take(index)
+            node = 2 * node + 1 + go_right
+        return self.base + self._leaf.take(node + self._leaf_offset, axis=1).sum(axis=2).T
+    
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"base": self.base, "feature": self.feature, "threshold": self.threshold, "leaf": self.leaf}
+    
+    @classmethod
+    def fit(cls, matrix: np.ndarray, targets: np.ndarray, trees: int = 50, depth: int = 3,
+            learning_rate: float = 0.1, bins: int = 32, min_rows: int = 20, **_) -> "GradientBoostedEngagementModel":
+        edges = [np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1])) for column in matrix.T]
+        binned = np.column_stack([np.searchsorted(edge, column, side="left") for edge, column in zip(edges, matrix.T)])
+        
+        internal, leaves = 2 ** depth - 1, 2 ** depth
+        feature = np.zeros((trees, internal), dtype=np.int32)
+        threshold = np.full((trees, internal), np.inf)
+        leaf = np.zeros((trees, leaves, targets.shape[1]))
+        base = targets.mean(axis=0)
+        
+        prediction = np.tile(base, (len(matrix), 1))
+        for tree in range(trees):
+            residual = targets - prediction
+            node = _grow_tree(binned, edges, residual, depth, min_rows, feature[tree], threshold[tree])
+            counts = np.bincount(node, minlength=leaves)
+            for target in range(targets.shape[1]):
+                sums = np.bincount(node, weights=residual[:, target], minlength=leaves)
+                leaf[tree, :, target] = learning_rate * np.divide(sums, counts, out=np.zeros(leaves), where=counts > 0)
+            prediction += leaf[tree][node]
+        
+        meta = {"trees": trees, "depth": depth, "learning_rate": learning_rate}
+        return cls(base, feature, threshold, leaf, meta)
+
+
+def _grow_tree(binned: np.ndarray, edges: List[np.ndarray], residual: np.ndarray, depth: int, min_rows: int,
+               feature: np.ndarray, threshold: np.ndarray) -> np.ndarray:
+    """
+    Fill one tree's split arrays level by level, picking the split with the
+    largest squared-error reduction summed over targets; returns each row's
+    leaf index
+    """
+    slots = np.array([len(edge) + 1 for edge in edges])
+    offsets = np.concatenate([[0], np.cumsum(slots)[:-1]])
+    total_slots = int(slots.sum())
+    # One histogram over every (node, feature, bin) slot per level instead of one per feature
+    slot_keys = binned + offsets
+    position = np.zeros(len(residual), dtype=np.intp)  # node index within the current level
+    
+    for level in range(depth):
+        width = 2 ** level
+        keys = (position[:, None] * total_slots + slot_keys).ravel()
+        size = width * total_slots
+        counts = np.bincount(keys, minlength=size).reshape(width, total_slots)
+        sums = np.stack([
+            np.bincount(keys, weights=np.repeat(residual[:, target], len(edges)), minlength=size)
+            for target in range(residual.shape[1])
+        ], axis=-1).reshape(width, total_slots, -1)
+        
+        best_gain = np.zeros(width)
+        best_feature = np.full(width, -1)
+        best_bin = np.zeros(width, dtype=np.intp)
+        for column, edge in enumerate(edges):
+            if len(edge) == 0:
+                continue
+            window = slice(offsets[column], offsets[column] + slots[column])
+            column_counts, column_sums = counts[:, window], sums[:, window]
+            node_counts, node_sums = column_counts.sum(axis=1), column_sums.sum(axis=1)
+            # Left side takes bins <= b, i.e. values <= edge[b]
+            left_counts = np.cumsum(column_counts, axis=1)[:, :-1]
+            left_sums = np.cumsum(column_sums, axis=1)[:, :-1]
+            right_counts = node_counts[:, None] - left_counts
+            right_sums = node_sums[:, None] - left_sums
+            valid = (left_counts >= min_rows) & (right_counts >= min_rows)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                gain = ((left_sums ** 2).sum(axis=2) / left_counts + (right_sums ** 2).sum(axis=2) / right_counts
+                        - ((node_sums ** 2).sum(axis=1) / np.maximum(node_counts, 1))[:, None])
+            gain = np.where(valid, gain, 0.0)
+            candidate = gain.argmax(axis=1)
+            candidate_gain = gain[np.arange(width), candidate]
+            better = candidate_gain > best_gain
+            best_gain[better] = candidate_gain[better]
+            best_feature[better] = column
+            best_bin[better] = candidate[better]
+        
+        first = width - 1
+        split = best_feature >= 0
+        for offset in np.flatnonzero(split):
+            feature[first + offset] = best_feature[offset]
+            threshold[first + offset] = edges[best_feature[offset]][best_bin[offset]]
+        go_right = np.zeros(len(residual), dtype=bool)
+        rows = np.flatnonzero(split[position])
+        go_right[rows] = binned[rows, best_feature[position[rows]]] > best_bin[position[rows]]
+        position = 2 * position + go_right
+    return position
+
+
+MODEL_KINDS = {model.kind: model for model in (LinearEngagementModel, GradientBoostedEngagementModel)}
+
+
+def save_engagement_model(model: Any, path: str = ENGAGEMENT_MODEL_PATH):
+    """
+    Write the model into a fresh directory beside path, then atomically point
+    the path symlink at it; the previous version is kept for readers that
+    resolved the link before the swap, older ones are removed
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    prefix = f"{name}.version-"
+    os.makedirs(parent, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix=prefix, dir=parent)
+    for array_name, array in model.arrays().items():
+        np.save(os.path.join(directory, f"{array_name}.npy"), np.ascontiguousarray(array))
+    manifest = {"kind": model.kind, "features": FEATURE_NAMES, "targets": TARGETS,
+                "arrays": sorted(model.arrays()), "meta": model.meta}
+    with open(os.path.join(directory, "model.json"), "w") as handle:
+        json.dump(manifest, handle, indent=2)
+    
+    previous = None
+    if os.path.islink(path):
+        previous = os.readlink(path)
+    elif os.path.isdir(path):
+        # Saved before models were versioned: move it aside so the link can take its place
+        previous = os.path.basename(tempfile.mkdtemp(prefix=prefix, dir=parent))
+        os.replace(path, os.path.join(parent, previous))
+    link = os.path.join(parent, f".{name}.{os.getpid()}.link")
+    os.symlink(os.path.basename(directory), link)
+    os.replace(link, path)
+    
+    keep = {os.path.basename(directory), previous and os.path.basename(previous)}
+    for entry in os.listdir(parent):
+        if entry.startswith(prefix) and entry not in keep:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def load_engagement_model(path: str = ENGAGEMENT_MODEL_PATH) -> Any:
+    # Resolved once, so model.json and the arrays come from the same version
+    directory = os.path.realpath(path)
+    with open(os.path.join(directory, "model.json")) as handle:
+        manifest = json.load(handle)
+    if manifest["features"] != FEATURE_NAMES or manifest["targets"] != TARGETS:
+        raise ValueError(f"Model at {path} was trained on different features; retrain it")
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in manifest["arrays"]}
+    return MODEL_KINDS[manifest["kind"]](**arrays, meta=manifest["meta"])
+
+
+def load_post_history(db: Any, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Published posts with impressions, as model inputs and log1p targets"""
+    from sqlalchemy import select
+    from app.models import Post
+    from app.services.ai_services import extract_engagement_features
+    
+    query = (
+        select(Post.content, Post.platform, Post.content_type, Post.likes, Post.comments, Post.shares, Post.impressions)
+        .where(Post.status == "published", Post.impressions > 0)
+        .order_by(Post.id)
+        .limit(limit)
+    )
+    rows = db.execute(query).all()
+    if not rows:
+        return {"matrix": np.zeros((0, len(FEATURE_NAMES))), "targets": np.zeros((0, len(TARGETS)))}
+    contents, platforms, content_types, *counts = zip(*rows)
+    features = extract_engagement_features(list(contents))
+    return {
+        "matrix": engagement_feature_matrix(features, platforms, content_types),
+        "targets": np.log1p(np.array(counts, dtype=np.float64).T),
+    }
+
+
+def train_engagement_model(matrix: np.ndarray, targets: np.ndarray, kind: str = "gbm",
+                           holdout: float = 0.2, seed: int = 0, **params) -> Any:
+    """Fit on a random split, record validation R^2 and the typical engagement rate, then refit on everything"""
+    order = np.random.default_rng(seed).permutation(len(matrix))
+    cut = int(len(matrix) * (1 - holdout))
+    train, validation = order[:cut], order[cut:]
+    model_kind = MODEL_KINDS[kind]
+    
+    started = time.perf_counter()
+    model = model_kind.fit(matrix[train], targets[train], **params)
+    errors = targets[validation] - model.predict(matrix[validation])
+    spread = targets[validation] - targets[validation].mean(axis=0)
+    r2 = 1 - (errors ** 2).sum(axis=0) / np.maximum((spread ** 2).sum(axis=0), 1e-12)
+    
+    model = model_kind.fit(matrix, targets, **params)
+    counts = np.expm1(targets)
+    rates = counts[:, :3].sum(axis=1) / np.maximum(counts[:, 3], 1)
+    typical_rate = float(np.median(rates))
+    if not typical_rate > 0:
+        # Most posts got no engagement: compare against the ones that did, if any
+        engaged = rates[rates > 0]
+        typical_rate = float(np.median(engaged)) if len(engaged) else DEFAULT_ENGAGEMENT_RATE
+    model.meta.update({
+        "rows": len(matrix),
+        "validation_r2": {name: round(float(value), 4) for name, value in zip(TARGETS, r2)},
+        "median_engagement_rate": typical_rate,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "training_seconds": round(time.perf_counter() - started, 2),
+    })
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the engagement model from published post history")
+    parser.add_argument("--kind", choices=sorted(MODEL_KINDS), default="gbm")
+    parser.add_argument("--output", default=ENGAGEMENT_MODEL_PATH)
+    parser.add_argument("--limit", type=int, default=None, help="train on at most this many posts")
+    parser.add_argument("--trees", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--learning-rate", type=float, default=0.1)
+    parser.add_argument("--alpha", type=float, default=1.0, help="ridge penalty for --kind linear")
+    args = parser.parse_args()
+    
+    from app.database import SessionLocal
+    
+    with SessionLocal() as db:
+        history = load_post_history(db, args.limit)
+    if len(history["matrix"]) < 10:
+        parser.error("not enough published posts with impressions to train on")
+    model = train_engagement_model(history["matrix"], history["targets"], args.kind, trees=args.trees,
+                                   depth=args.depth, learning_rate=args.learning_rate, alpha=args.alpha)
+    save_engagement_model(model, args.output)
+    print(json.dumps(model.meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Append-only columnar store of post engagement history.
+
+One fixed-width NumPy column per file under ENGAGEMENT_HISTORY_PATH:
+    
+    hour.u1          hour of day the post was published (0-23)
+    content_type.u1  code into meta.json's content_types
+    platform.u1      code into meta.json's platforms
+    engagement.f8    engagement of the post (rows without one are not stored)
+    timestamp.i8     when it was published, Unix seconds
+
+An append writes every column, then meta.json (row count and the two
+dictionaries) by atomic rename; rows past the committed count, left by a
+crash mid-append, are cut off when the store is opened.
+
+Queries memory-map CHUNK_ROWS rows at a time and bincount a combined
+(platform, hour, content type) key built in one preallocated buffer, so a
+scan holds a few MB whatever the size of the history and never creates a
+Python object per row; each chunk's pages are unmapped before the next.
+Sums are plain float64, where pandas' groupby mean is compensated, so
+means can differ from extract_insights on a list in the last bits.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.tenancy import DEFAULT_TENANT
+
+ENGAGEMENT_HISTORY_PATH = os.getenv("ENGAGEMENT_HISTORY_PATH", "./engagement_history")
+
+# Rows mapped and aggregated per step of a scan
+CHUNK_ROWS = 1 << 18
+HOURS = 24
+# Codes are uint8
+MAX_DICTIONARY_SIZE = 256
+
+COLUMNS = {
+    "hour": np.uint8,
+    "content_type": np.uint8,
+    "platform": np.uint8,
+    "engagement": np.float64,
+    "timestamp": np.int64,
+}
+EXTENSIONS = {np.uint8: "u1", np.float64: "f8", np.int64: "i8"}
+
+
+class EngagementStore:
+    """Post engagement rows as memory-mapped columns, aggregated without per-row objects"""
+    
+    def __init__(self, path: str = ENGAGEMENT_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+        else:
+            meta = {"rows": 0, "content_types": [], "platforms": []}
+        self.rows: int = meta["rows"]
+        self.dictionaries: Dict[str, List[str]] = {
+            "content_type": meta["content_types"],
+            "platform": meta["platforms"],
+        }
+        self._codes = {column: {value: code for code, value in enumerate(values)}
+                       for column, values in self.dictionaries.items()}
+        for name, dtype in COLUMNS.items():
+            with open(self._column_path(name), "ab") as column_file:
+                column_file.truncate(self.rows * np.dtype(dtype).itemsize)
+    
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.{EXTENSIONS[COLUMNS[name]]}")
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    def _encode(self, column: str, values: Sequence[str]) -> np.ndarray:
+        """Dictionary codes of values, adding new ones to the column's dictionary"""
+        unique, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        codes = self._codes[column]
+        for value in unique.tolist():
+            if value not in codes:
+                if len(codes) >= MAX_DICTIONARY_SIZE:
+                    raise ValueError(f"More than {MAX_DICTIONARY_SIZE} distinct {column} values")
+                codes[value] = len(codes)
+                self.dictionaries[column].append(value)
+        return np.array([codes[value] for value in unique.tolist()], dtype=np.uint8)[inverse]
+    
+    def append(self, hours: Sequence[int], content_types: Sequence[str], platforms: Sequence[str],
+               engagements: Sequence[float], timestamps: Optional[Sequence[float]] = None) -> int:
+        """Add rows (one per published post); returns how many were stored"""
+        hours = np.asarray(hours)
+        engagements = np.asarray(engagements, dtype=np.float64)
+        if timestamps is None:
+            timestamps = np.full(len(hours), int(time.time()), dtype=np.int64)
+        timestamps = np.asarray(timestamps).astype(np.int64)
+        if not len(hours) == len(content_types) == len(platforms) == len(engagements) == len(timestamps):
+            raise ValueError("Columns must have the same length")
+        if len(hours) and (hours.min() < 0 or hours.max() >= HOURS):
+            raise ValueError("hour must be between 0 and 23")
+        
+        # As in InsightsAggregator.record, a post without engagement is not a sample
+        keep = ~np.isnan(engagements)
+        with self._lock:
+            columns = {
+                "hour": hours[keep].astype(np.uint8),
+                "content_type": self._encode("content_type", content_types)[keep],
+                "platform": self._encode("platform", platforms)[keep],
+                "engagement": engagements[keep],
+                "timestamp": timestamps[keep],
+            }
+            added = int(keep.sum())
+            if not added:
+                return 0
+            for name, values in columns.items():
+                with open(self._column_path(name), "ab") as column_file:
+                    column_file.write(values.tobytes())
+            self.rows += added
+            self._save_meta()
+        return added
+    
+    def append_posts(self, posts: Sequence[Dict[str, Any]]) -> int:
+        """append() from post dicts with hour, content_type, engagement and optionally platform and timestamp"""
+        now = time.time()
+        return self.append(
+            [post["hour"] for post in posts],
+            [post["content_type"] for post in posts],
+            [post.get("platform", "twitter") for post in posts],
+            [np.nan if post["engagement"] is None else post["engagement"] for post in posts],
+            [post.get("timestamp") or now for post in posts],
+        )
+    
+    def _save_meta(self):
+        meta = {
+            "rows": self.rows,
+            "content_types": self.dictionaries["content_type"],
+            "platforms": self.dictionaries["platform"],
+        }
+        temporary = os.path.join(self.path, "meta.json.tmp")
+        with open(temporary, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temporary, os.path.join(self.path, "meta.json"))
+    
+    def _chunk(self, name: str, start: int, stop: int) -> np.ndarray:
+        dtype = COLUMNS[name]
+        return np.memmap(self._column_path(name), dtype=dtype, mode="r",
+                         offset=start * np.dtype(dtype).itemsize, shape=(stop - start,))
+    
+    def aggregate(self, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Engagement sums and post counts of rows published in [start, end),
+        shaped (platform code, hour, content type code)
+        """
+        with self._lock:
+            rows = self.rows
+            platforms = len(self.dictionaries["platform"])
+            types = len(self.dictionaries["content_type"])
+        bins = platforms * HOURS * types
+        sums = np.zeros(bins + 1)
+        counts = np.zeros(bins + 1, dtype=np.int64)
+        key = np.empty(min(rows, CHUNK_ROWS), dtype=np.intp)
+        for chunk_start in range(0, rows, CHUNK_ROWS):
+            chunk_stop = min(rows, chunk_start + CHUNK_ROWS)
+            chunk_key = key[:chunk_stop - chunk_start]
+            np.multiply(self._chunk("platform", chunk_start, chunk_stop), HOURS, out=chunk_key, casting="unsafe")
+            chunk_key += self._chunk("hour", chunk_start, chunk_stop)
+            chunk_key *= types
+            chunk_key += self._chunk("content_type", chunk_start, chunk_stop)
+            if start is not None or end is not None:
+                timestamps = self._chunk("timestamp", chunk_start, chunk_stop)
+                outside = np.zeros(len(chunk_key), dtype=bool)
+                if start is not None:
+                    outside |= timestamps < start
+                if end is not None:
+                    outside |= timestamps >= end
+                # Rows outside the window land in a spare last bin
+                chunk_key[outside] = bins
+            sums += np.bincount(chunk_key, weights=self._chunk("engagement", chunk_start, chunk_stop),
+                                minlength=bins + 1)
+            counts += np.bincount(chunk_key, minlength=bins + 1)
+        shape = (platforms, HOURS, types)
+        return sums[:bins].reshape(shape), counts[:bins].reshape(shape)
+    
+    def insights(self, platform: Optional[str] = None, start: Optional[float] = None,
+                 end: Optional[float] = None) -> Dict[str, Any]:
+        """extract_insights over the stored rows, optionally for one platform and a publish window"""
+        sums, counts = self.aggregate(start, end)
+        if platform is not None:
+            code = self._codes["platform"].get(platform)
+            sums, counts = (sums[code:code + 1], counts[code:code + 1]) if code is not None else (sums[:0], counts[:0])
+        sums, counts = sums.sum(axis=0), counts.sum(axis=0)
+        
+        by_type = list(zip(self.dictionaries["content_type"], sums.sum(axis=0), counts.sum(axis=0)))
+        # Content types in name order, as pandas groups them, and first maximum as idxmax
+        by_type.sort()
+        best_type, best_mean = None, None
+        for name, total, count in by_type:
+            if count and (best_mean is None or total / count > best_mean):
+                best_type, best_mean = name, total / count
+        
+        hour_counts = counts.sum(axis=1)
+        best_hour = None
+        if hour_counts.any():
+            means = np.where(hour_counts > 0, sums.sum(axis=1) / np.maximum(hour_counts, 1), -np.inf)
+            best_hour = int(np.argmax(means))
+        return {
+            "best_posting_hour": best_hour,
+            "best_content_type": best_type,
+            "posts": int(hour_counts.sum()),
+        }
+
+
+_engagement_histories: Dict[str, EngagementStore] = {}
+_open_lock = threading.Lock()
+
+
+def get_engagement_history(tenant: str = DEFAULT_TENANT) -> EngagementStore:
+    """
+    A tenant's engagement history, opened on first use: the default tenant's
+    at ENGAGEMENT_HISTORY_PATH, others' under its tenants/ directory
+    """
+    with _open_lock:
+        store = _engagement_histories.get(tenant)
+        if store is None:
+            path = ENGAGEMENT_HISTORY_PATH
+            if tenant != DEFAULT_TENANT:
+                path = os.path.join(ENGAGEMENT_HISTORY_PATH, "tenants", tenant)
+            store = _engagement_histories[tenant] = EngagementStore(path)
+        return store
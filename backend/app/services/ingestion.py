@@ -0,0 +1,290 @@
+"""
+Engagement event ingestion.
+
+Webhook and poll events (likes, comments, shares of one post) are appended
+to a bounded in-process buffer; a flusher thread takes everything buffered
+every INGEST_FLUSH_INTERVAL seconds (sooner once INGEST_MAX_BATCH events are
+waiting), coalesces it to one change per post and writes the batch in one
+transaction: one SELECT of the posts' current counts and one executemany
+UPDATE, however many events touched them. A post liked a thousand times in
+a window is one row write.
+
+Events name the tenant that sent them and only change that tenant's posts
+(those of its account); events for other posts are counted and dropped.
+Events are either deltas (webhooks: +1 like, -1 like when it is withdrawn)
+or totals (polls: the platform's current count, replacing what came before
+it in the window; later deltas add to it). Fields left out are unchanged.
+Counts never go below zero.
+
+Committed changes go to the insights aggregator, so /insights/ follows real
+engagement: a post's engagement is likes + comments + shares, recorded as a
+sample while it has any and adjusted as it changes. load_insights() rebuilds
+the aggregator from the stored posts at startup; until there are any it is
+left alone (the sample posts), and the first batch written replaces it.
+
+When the buffer is full, submit() rejects the whole call (the route answers
+503 with Retry-After) or, for in-process producers, waits for room. While
+a batch is being written the next one builds up, so a slow database fills
+the buffer and producers are pushed back instead of memory growing.
+Configured through environment variables:
+    
+    INGEST_MAX_QUEUE       events buffered before submissions are rejected (default: 200000)
+    INGEST_MAX_BATCH       buffered events that trigger an early flush (default: 50000)
+    INGEST_FLUSH_INTERVAL  seconds between flushes (default: 0.5)
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, update
+
+from app.database import SessionLocal
+from app.models import Post
+from app.services.analytics import InsightsAggregator, insights_aggregator
+
+logger = logging.getLogger(__name__)
+
+INGEST_MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", "200000"))
+INGEST_MAX_BATCH = int(os.getenv("INGEST_MAX_BATCH", "50000"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "0.5"))
+
+# Post ids per SELECT, under SQLite's bound parameter limit
+SELECT_CHUNK = 500
+
+# (tenant, post_id, is_total, likes, comments, shares); None leaves a count unchanged
+Event = Tuple[str, int, bool, Optional[int], Optional[int], Optional[int]]
+PendingKey = Tuple[str, int]
+
+
+class IngestQueueFull(Exception):
+    """The buffer has no room for the submitted events"""
+
+
+def coalesce(events: Sequence[Event], pending: Dict[PendingKey, List[Any]]) -> Dict[PendingKey, List[Any]]:
+    """
+    Fold events into pending: (tenant, post_id) -> [likes total, likes delta,
+    comments total, comments delta, shares total, shares delta], totals None
+    when no total was seen
+    """
+    for tenant, post_id, is_total, likes, comments, shares in events:
+        entry = pending.get((tenant, post_id))
+        if entry is None:
+            entry = pending[tenant, post_id] = [None, 0, None, 0, None, 0]
+        if is_total:
+            if likes is not None:
+                entry[0], entry[1] = likes, 0
+            if comments is not None:
+                entry[2], entry[3] = comments, 0
+            if shares is not None:
+                entry[4], entry[5] = shares, 0
+        else:
+            if likes:
+                entry[1] += likes
+            if comments:
+                entry[3] += comments
+            if shares:
+                entry[5] += shares
+    return pending
+
+
+def apply_change(entry: List[Any], likes: int, comments: int, shares: int) -> Tuple[int, int, int]:
+    """New counts from the stored ones and a coalesced entry"""
+    return (
+        max((likes if entry[0] is None else entry[0]) + entry[1], 0),
+        max((comments if entry[2] is None else entry[2]) + entry[3], 0),
+        max((shares if entry[4] is None else entry[4]) + entry[5], 0),
+    )
+
+
+def post_hour(scheduled_time: Optional[datetime], created_at: datetime) -> int:
+    return (scheduled_time or created_at).hour
+
+
+class EngagementPipeline:
+    """Buffers engagement events and writes them to posts in coalesced batches"""
+    
+    def __init__(self, session_factory: Callable = SessionLocal,
+                 aggregator: Optional[InsightsAggregator] = insights_aggregator,
+                 max_queue: int = INGEST_MAX_QUEUE, max_batch: int = INGEST_MAX_BATCH,
+                 flush_interval: float = INGEST_FLUSH_INTERVAL):
+        self.session_factory = session_factory
+        self.aggregator = aggregator
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        
+        self._events: List[Event] = []
+        # Coalesced changes of a batch whose write failed, retried with the next one
+        self._retry: Dict[PendingKey, List[Any]] = {}
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Whether the aggregator holds stored engagement rather than the sample posts
+        self._loaded = False
+        self.counts = {"accepted": 0, "rejected": 0, "batches": 0, "posts_written": 0,
+                      "unknown_posts": 0, "failed_batches": 0}
+    
+    def _used(self) -> int:
+        return len(self._events) + len(self._retry)
+    
+    def submit(self, events: Sequence[Event], timeout: float = 0) -> int:
+        """
+        Buffer events, all or none; waits up to timeout seconds for room, then
+        raises IngestQueueFull. Returns how many were buffered.
+        """
+        if len(events) > self.max_queue:
+            raise ValueError(f"At most {self.max_queue} events per submission")
+        with self._room:
+            if self._used() + len(events) > self.max_queue and not (
+                    timeout and self._room.wait_for(lambda: self._used() + len(events) <= self.max_queue, timeout)):
+                self.counts["rejected"] += len(events)
+                raise IngestQueueFull(f"{self._used()} events already buffered")
+            self._events.extend(events)
+            self.counts["accepted"] += len(events)
+            if len(self._events) >= self.max_batch:
+                self._wake.set()
+        return len(events)
+    
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of posts updated"""
+        with self._flush_lock:
+            with self._room:
+                events, self._events = self._events, []
+                pending, self._retry = self._retry, {}
+                self._room.notify_all()
+            if not events and not pending:
+                return 0
+            coalesce(events, pending)
+            try:
+                changes, unknown = self._write(pending)
+            except Exception:
+                logger.exception("Writing %d posts' engagement failed, retrying with the next batch", len(pending))
+                with self._room:
+                    # Newer events are applied on top when the retry is folded into the next batch
+                    self._retry = pending
+                    self.counts["failed_batches"] += 1
+                return 0
+            with self._room:
+                self.counts["batches"] += 1
+                self.counts["posts_written"] += len(changes)
+                self.counts["unknown_posts"] += unknown
+            if self._loaded:
+                self._record(changes)
+            elif changes:
+                self.load_insights()
+            return len(changes)
+    
+    def _write(self, pending: Dict[PendingKey, List[Any]]) -> Tuple[List[Tuple[Any, ...]], int]:
+        """One transaction: read the posts' counts, update the changed ones"""
+        by_tenant: Dict[str, List[int]] = {}
+        for tenant, post_id in pending:
+            by_tenant.setdefault(tenant, []).append(post_id)
+        changes = []
+        rows = []
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            for tenant, ids in by_tenant.items():
+                for start in range(0, len(ids), SELECT_CHUNK):
+                    rows += db.execute(
+                        select(Post.id, Post.likes, Post.comments, Post.shares, Post.account, Post.platform,
+                               Post.content_type, Post.scheduled_time, Post.created_at)
+                        .where(Post.id.in_(ids[start:start + SELECT_CHUNK]), Post.account == tenant)
+                        .with_for_update()
+                    ).all()
+            updates = []
+            for row in rows:
+                entry = pending[row.account, row.id]
+                likes, comments, shares = apply_change(entry, row.likes, row.comments, row.shares)
+                if (likes, comments, shares) == (row.likes, row.comments, row.shares):
+                    continue
+                updates.append({"id": row.id, "likes": likes, "comments": comments, "shares": shares,
+                                "updated_at": now})
+                changes.append((post_hour(row.scheduled_time, row.created_at), row.content_type, row.account,
+                                row.platform, row.likes + row.comments + row.shares, likes + comments + shares))
+            if updates:
+                # ORM bulk UPDATE by primary key: one executemany
+                db.execute(update(Post), updates)
+            db.commit()
+        return changes, len(pending) - len(rows)
+    
+    def _record(self, changes: List[Tuple[Any, ...]]):
+        if self.aggregator is None:
+            return
+        for hour, content_type, account, platform, before, after in changes:
+            if before == 0:
+                self.aggregator.record(hour, content_type, after, account, platform)
+            elif after == 0:
+                self.aggregator.remove(hour, content_type, before, account, platform)
+            else:
+                self.aggregator.adjust(hour, content_type, after - before, account, platform)
+    
+    def load_insights(self) -> bool:
+        """Rebuild the aggregator from stored engagement; False, leaving it as it is, when there is none"""
+        if self.aggregator is None:
+            return False
+        posts = engaged_posts(self.session_factory)
+        if posts:
+            self.aggregator.rebuild(posts)
+            self._loaded = True
+        return self._loaded
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Engagement flush failed")
+    
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="engagement-ingest", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher after writing what is buffered"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._room:
+            return {
+                **self.counts,
+                "buffered": len(self._events),
+                "retrying_posts": len(self._retry),
+                "max_queue": self.max_queue,
+                "flush_interval": self.flush_interval,
+            }
+
+
+def engaged_posts(session_factory: Callable = SessionLocal) -> List[Dict[str, Any]]:
+    """Posts with any engagement, as insights samples (hour, content_type, engagement, account, platform)"""
+    engagement = Post.likes + Post.comments + Post.shares
+    with session_factory() as db:
+        rows = db.execute(
+            select(Post.scheduled_time, Post.created_at, Post.content_type, engagement, Post.account, Post.platform)
+            .where(engagement > 0)
+            .order_by(Post.id)
+        ).all()
+    return [
+        {"hour": post_hour(scheduled_time, created_at), "content_type": content_type,
+         "engagement": float(total), "account": account, "platform": platform}
+        for scheduled_time, created_at, content_type, total, account, platform in rows
+    ]
+
+
+engagement_pipeline = EngagementPipeline()
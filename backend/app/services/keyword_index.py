@@ -0,0 +1,154 @@
+"""
+Keyword index shared by the text scorers.
+
+All keyword lists live here. They are merged into one table at import time
+so a text is lowercased and split into words once, and each word is looked
+up in a dict, no matter how many scorers (and overlapping lists) read the
+result or how many keywords there are. A keyword matches a word it starts
+("thank" in "Thanks!", "love" in "loved"); keywords are stems without
+whitespace or punctuation, and words are runs of letters, digits and "_".
+
+A mask is a Python int with one bit per keyword. NumPy callers scoring
+many texts at once use mask columns instead: (rows, MASK_WORDS) uint64
+arrays holding 64 keywords per word, so the lexicon can outgrow one
+machine word.
+"""
+
+import re
+import string
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+KEYWORD_CATEGORIES: Dict[str, List[str]] = {
+    "positive": ["love", "amazing", "great", "helpful", "awesome", "fantastic", "excellent", "best", "perfect", "thank"],
+    "negative": ["bad", "worst", "hate", "terrible", "poor", "disappointed", "boring", "meh", "never"],
+    "emotional": ["amazing", "love", "exciting", "incredible", "powerful", "transform", "discover"],
+    "cta": ["click", "share", "comment", "follow", "subscribe", "learn", "discover", "get", "try"],
+    "engagement_cta": ["click", "share", "comment", "follow", "link", "subscribe"],
+    "recommendation_cta": ["click", "share", "comment", "follow"],
+}
+
+
+def _build_index(categories: Dict[str, List[str]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    word_categories: Dict[str, List[str]] = {}
+    for category, words in categories.items():
+        for word in words:
+            word_categories.setdefault(word, []).append(category)
+    return tuple((word, tuple(cats)) for word, cats in word_categories.items())
+
+
+# (keyword, categories it belongs to), one entry per distinct keyword
+_INDEX = _build_index(KEYWORD_CATEGORIES)
+
+# Bit i of a keyword mask stands for _INDEX[i]; a category's hits are the set bits under its mask
+CATEGORY_MASKS: Dict[str, int] = {
+    category: sum(1 << i for i, (_, categories) in enumerate(_INDEX) if category in categories)
+    for category in KEYWORD_CATEGORIES
+}
+
+
+def _build_heads(index: Tuple[Tuple[str, Tuple[str, ...]], ...], length: int) -> Dict[str, List[Tuple[str, int]]]:
+    heads: Dict[str, List[Tuple[str, int]]] = {}
+    for i, (word, _) in enumerate(index):
+        heads.setdefault(word[:length], []).append((word, 1 << i))
+    return heads
+
+
+# (keyword, bit) by the keywords' first HEAD_LENGTH characters, so most words of a text cost one dict lookup
+HEAD_LENGTH = min(len(word) for word, _ in _INDEX)
+_BY_HEAD = _build_heads(_INDEX, HEAD_LENGTH)
+WORD_PATTERN = re.compile(r"\w+")
+# Stripped from a token's ends before falling back to WORD_PATTERN ("#launch", "bio!", "(click");
+# "_" is a word character to WORD_PATTERN, so it stays
+EDGE_PUNCTUATION = string.punctuation.replace("_", "")
+# 64-bit words per row of a mask column
+MASK_WORDS = max(1, -(-len(_INDEX) // 64))
+
+
+def keyword_mask(text: str) -> int:
+    """Distinct keywords in text as a bitmask; the mask of a + b is mask(a) | mask(b)
+    when they meet at whitespace, since no keyword spans a word boundary."""
+    by_head = _BY_HEAD
+    mask = 0
+    words = set()
+    # str.split is much cheaper than a regex over the whole text; only tokens with inner punctuation use one
+    for token in set(text.lower().split()):
+        if not token.isalnum():
+            token = token.strip(EDGE_PUNCTUATION)
+            if not token.isalnum():
+                words.update(WORD_PATTERN.findall(token))
+                continue
+        words.add(token)
+    for word in words:
+        candidates = by_head.get(word[:HEAD_LENGTH])
+        if candidates:
+            for keyword, bit in candidates:
+                if word.startswith(keyword):
+                    mask |= bit
+    return mask
+
+
+def keyword_hits(text: str) -> Dict[str, int]:
+    """Count distinct keywords per category; cost grows with the text, not the keyword lists."""
+    mask = keyword_mask(text)
+    return {category: (mask & category_mask).bit_count() for category, category_mask in CATEGORY_MASKS.items()}
+
+
+def category_count(keywords: Any, category: str) -> Any:
+    """Distinct keywords of a category in a mask, or in each row of a mask column"""
+    if isinstance(keywords, int):
+        return (keywords & CATEGORY_MASKS[category]).bit_count()
+    import numpy as np
+    
+    return np.bitwise_count(keywords & _category_columns()[category]).sum(axis=-1)
+
+
+def mask_columns(masks: Sequence[int]) -> Any:
+    """Masks as a (len(masks), MASK_WORDS) uint64 mask column"""
+    import numpy as np
+    
+    shifts = range(0, 64 * MASK_WORDS, 64)
+    rows = [[(mask >> shift) & 0xFFFFFFFFFFFFFFFF for shift in shifts] for mask in masks]
+    return np.array(rows, dtype=np.uint64).reshape(len(masks), MASK_WORDS)
+
+
+_CATEGORY_COLUMNS: Optional[Dict[str, Any]] = None
+
+
+def _category_columns() -> Dict[str, Any]:
+    global _CATEGORY_COLUMNS
+    if _CATEGORY_COLUMNS is None:
+        _CATEGORY_COLUMNS = dict(zip(CATEGORY_MASKS, mask_columns(list(CATEGORY_MASKS.values()))))
+    return _CATEGORY_COLUMNS
+
+
+def _starts_word(text: str, keyword: str) -> bool:
+    """Whether keyword occurs in text at the start of a word"""
+    start = text.find(keyword)
+    while start > 0:
+        before = text[start - 1]
+        if not (before.isalnum() or before == "_"):
+            return True
+        start = text.find(keyword, start + 1)
+    return start == 0
+
+
+def keyword_mask_columns(texts: Sequence[str], categories: Sequence[str]) -> Any:
+    """
+    Mask column of texts, holding only the keywords of the given categories;
+    row i has the same bits as keyword_mask(texts[i]) & those categories.
+    Texts are probed per keyword with str.find, which beats a word split per
+    text when a batch reads a few small categories; cost grows with their
+    keyword count, so use keyword_mask for the whole lexicon.
+    """
+    import numpy as np
+    
+    columns = np.zeros((len(texts), MASK_WORDS), dtype=np.uint64)
+    lowered = [text.lower() for text in texts]
+    wanted = set(categories)
+    for i, (keyword, keyword_categories) in enumerate(_INDEX):
+        if wanted.isdisjoint(keyword_categories):
+            continue
+        # Substring probe first: only texts that contain the keyword anywhere check word starts
+        rows = [row for row, text in enumerate(lowered) if keyword in text and _starts_word(text, keyword)]
+        columns[rows, i // 64] |= np.uint64(1 << (i % 64))
+    return columns
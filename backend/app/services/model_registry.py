@@ -0,0 +1,38 @@
+"""
+Registry of trained models, loaded once per process.
+
+Kept free of NumPy so importing it costs nothing: the model module (and
+NumPy with it) is only imported once a trained model exists on disk.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional
+
+ENGAGEMENT_MODEL_PATH = os.getenv("ENGAGEMENT_MODEL_PATH", "./engagement_model")
+
+_models: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get_engagement_model(path: Optional[str] = None) -> Optional[Any]:
+    """The model saved at path (default ENGAGEMENT_MODEL_PATH), or None when nothing has been trained there"""
+    path = path or ENGAGEMENT_MODEL_PATH
+    if path in _models:
+        return _models[path]
+    with _lock:
+        if path not in _models:
+            model = None
+            if os.path.exists(os.path.join(path, "model.json")):
+                from app.services.engagement_model import load_engagement_model
+                model = load_engagement_model(path)
+            _models[path] = model
+        return _models[path]
+
+
+def reload_engagement_model(path: Optional[str] = None) -> Optional[Any]:
+    """Pick up a retrained model without restarting the process"""
+    path = path or ENGAGEMENT_MODEL_PATH
+    with _lock:
+        _models.pop(path, None)
+    return get_engagement_model(path)
@@ -0,0 +1,115 @@
+"""
+Post storage: creation, bulk inserts and keyset-paginated listings.
+
+Listings never use OFFSET; the client passes back the cursor of the last
+row it saw, so every page is an index range scan regardless of depth.
+Calendar views add a [start, end) window on scheduled_time, which narrows
+the same scan: posts are points in time, so a B-tree on (status, platform,
+scheduled_time) answers a month of one platform without touching the rest.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import Post
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+BULK_INSERT_BATCH_SIZE = 5000
+
+
+def create_posts(db: Session, rows: List[Dict[str, Any]]) -> List[Post]:
+    """Insert a few posts and return them with ids"""
+    posts = [Post(**row) for row in rows]
+    db.add_all(posts)
+    db.commit()
+    return posts
+
+
+def bulk_insert_posts(db: Session, rows: List[Dict[str, Any]], batch_size: int = BULK_INSERT_BATCH_SIZE) -> int:
+    """Insert many posts with executemany batches in one transaction"""
+    for start in range(0, len(rows), batch_size):
+        insert_post_rows(db, rows[start:start + batch_size])
+    db.commit()
+    return len(rows)
+
+
+def insert_post_rows(db: Session, rows: List[Dict[str, Any]]):
+    """One executemany batch, left uncommitted in the caller's transaction"""
+    now = datetime.utcnow()
+    db.execute(Post.__table__.insert(), [{"created_at": now, "updated_at": now, **row} for row in rows])
+
+
+def list_posts(db: Session, account: Optional[str] = None, cursor: Optional[str] = None,
+               limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Post], Optional[str]]:
+    """Posts newest first; cursor is the id of the last post on the previous page"""
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    query = select(Post).order_by(Post.id.desc()).limit(limit)
+    if account is not None:
+        query = query.where(Post.account == account)
+    if cursor:
+        query = query.where(Post.id < int(cursor))
+    
+    posts = list(db.scalars(query))
+    next_cursor = str(posts[-1].id) if len(posts) == limit else None
+    return posts, next_cursor
+
+
+def list_scheduled(db: Session, account: Optional[str] = None, cursor: Optional[str] = None,
+                   limit: int = DEFAULT_PAGE_SIZE, platform: Optional[str] = None,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None) -> Tuple[List[Post], Optional[str]]:
+    """
+    Scheduled posts in publish order, optionally within [start, end) and for
+    one platform; cursor is "<scheduled_time>|<id>" of the last row
+    """
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    query = (
+        select(Post)
+        .where(Post.status == "scheduled", Post.scheduled_time.isnot(None))
+        .order_by(Post.scheduled_time, Post.id)
+        .limit(limit)
+    )
+    if account is not None:
+        query = query.where(Post.account == account)
+    if platform is not None:
+        query = query.where(Post.platform == platform)
+    if start is not None:
+        query = query.where(Post.scheduled_time >= start)
+    if end is not None:
+        query = query.where(Post.scheduled_time < end)
+    if cursor:
+        after_time, after_id = decode_time_cursor(cursor)
+        query = query.where(tuple_(Post.scheduled_time, Post.id) > tuple_(after_time, after_id))
+    
+    posts = list(db.scalars(query))
+    next_cursor = encode_time_cursor(posts[-1]) if len(posts) == limit else None
+    return posts, next_cursor
+
+
+def encode_time_cursor(post: Post) -> str:
+    return f"{post.scheduled_time.isoformat()}|{post.id}"
+
+
+def decode_time_cursor(cursor: str) -> Tuple[datetime, int]:
+    after_time, after_id = cursor.rsplit("|", 1)
+    return datetime.fromisoformat(after_time), int(after_id)
+
+
+def post_to_dict(post: Post) -> Dict[str, Any]:
+    return {
+        "id": post.id,
+        "account": post.account,
+        "content": post.content,
+        "platform": post.platform,
+        "content_type": post.content_type,
+        "status": post.status,
+        "scheduled_time": post.scheduled_time.isoformat() if post.scheduled_time else None,
+        "created_at": post.created_at.isoformat() if post.created_at else None,
+        "likes": post.likes,
+        "comments": post.comments,
+        "shares": post.shares,
+        "impressions": post.impressions,
+    }
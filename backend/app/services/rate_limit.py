@@ -0,0 +1,86 @@
+"""
+Token-bucket rate limiting, one bucket per social platform.
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+# Sustained publish calls per second and burst size, per platform
+PLATFORM_RATE_LIMITS: Dict[str, Dict[str, float]] = {
+    "twitter": {"rate": 10, "burst": 20},
+    "instagram": {"rate": 10, "burst": 20},
+    "facebook": {"rate": 10, "burst": 20},
+    "linkedin": {"rate": 10, "burst": 20},
+}
+DEFAULT_RATE_LIMIT = {"rate": 5, "burst": 10}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+    
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+    
+    def try_acquire(self, tokens: float = 1) -> bool:
+        with self._lock:
+            now = self.clock()
+            if now < self.blocked_until:
+                return False
+            self._refill(now)
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+    
+    def charge(self, tokens: float):
+        """Take tokens for work already done, going into debt if there are not enough"""
+        with self._lock:
+            self._refill(self.clock())
+            self.tokens -= tokens
+    
+    def wait_time(self, tokens: float = 1) -> float:
+        """Seconds until `tokens` would be available"""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            missing = tokens - self.tokens
+            refill_wait = max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+            return max(refill_wait, self.blocked_until - now)
+    
+    def limit(self, remaining: float, reset_in: float):
+        """Apply a server-reported quota: `remaining` calls left, window resets in `reset_in` seconds"""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0:
+                self.blocked_until = max(self.blocked_until, now + reset_in)
+                # Start refilling from empty once the window resets
+                self.updated = self.blocked_until
+    
+    def pause(self, seconds: float):
+        """Block the bucket, e.g. for a 429 Retry-After"""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens = 0
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.updated = self.blocked_until
+
+
+def bucket_for(platform: str, limits: Dict[str, Dict[str, float]] = PLATFORM_RATE_LIMITS,
+               clock: Callable[[], float] = time.monotonic) -> TokenBucket:
+    config = limits.get(platform, DEFAULT_RATE_LIMIT)
+    return TokenBucket(config["rate"], config["burst"], clock)
@@ -0,0 +1,133 @@
+"""
+Bulk schedule import from CSV or NDJSON.
+
+Rows are read one at a time from the (spooled) upload, validated as
+PostCreate a chunk at a time and inserted with executemany batches, all in
+one transaction: an import either schedules every row or, if any row is
+invalid, nothing. Rows are deduplicated like POST /schedule/ (see
+services/dedup.py): a row already scheduled, by an earlier request or
+earlier in the file, is skipped and counted. Validation carries on past the first bad row, so one
+response lists the file's errors (up to MAX_REPORTED_ERRORS).
+
+CSV needs a header naming PostCreate fields (content, account, platform,
+platforms, content_type or contentType, scheduled_time or scheduledTime);
+platforms is comma-separated within its cell and empty cells take the
+field's default. NDJSON has one PostCreate object per line.
+"""
+
+import csv
+import io
+import itertools
+import json
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+
+from app.schemas import PostCreate
+from app.services.dedup import fingerprint_index, insert_posts_once
+
+IMPORT_FORMATS = ("csv", "ndjson")
+# Rows validated and inserted per batch
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+_posts_adapter = TypeAdapter(List[PostCreate])
+
+
+def iter_csv_records(body: IO[bytes]) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """(line number, record) per CSV row after the header"""
+    reader = csv.DictReader(io.TextIOWrapper(body, encoding="utf-8-sig", newline=""))
+    try:
+        for row in reader:
+            record = {key.strip(): value for key, value in row.items() if key and value}
+            if "platforms" in record:
+                record["platforms"] = [name.strip() for name in record["platforms"].split(",") if name.strip()]
+            yield reader.line_num, record
+    except csv.Error as error:
+        raise ValueError(f"line {reader.line_num}: {error}")
+
+
+def iter_ndjson_records(body: IO[bytes]) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """(line number, record) per non-empty line; the record is None when the line is not JSON"""
+    for number, line in enumerate(body, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def validate_chunk(chunk: List[Tuple[int, Optional[Dict[str, Any]]]],
+                   account: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Insertable rows and errors (in line order) of a chunk of (line number, record); account overrides the rows'"""
+    errors = [{"line": line, "field": None, "error": "Invalid JSON"} for line, record in chunk if record is None]
+    chunk = [(line, record) for line, record in chunk if record is not None]
+    try:
+        posts = _posts_adapter.validate_python([record for _, record in chunk])
+    except ValidationError as error:
+        failed = set()
+        for detail in error.errors(include_url=False):
+            index, *field = detail["loc"]
+            failed.add(index)
+            errors.append({"line": chunk[index][0], "field": ".".join(map(str, field)) or None, "error": detail["msg"]})
+        # The rest of the chunk still gets its own checks
+        posts = [None if index in failed else PostCreate.model_validate(record)
+                 for index, (_, record) in enumerate(chunk)]
+    
+    rows = []
+    for (line, _), post in zip(chunk, posts):
+        if post is None:
+            continue
+        if post.scheduled_time is None:
+            errors.append({"line": line, "field": "scheduled_time", "error": "scheduled_time is required"})
+            continue
+        post.status = "scheduled"
+        if account is not None:
+            post.account = account
+        rows.extend(post.rows())
+    errors.sort(key=lambda error: error["line"])
+    return rows, errors
+
+
+def import_scheduled_posts(db: Session, body: IO[bytes], format: str, chunk_size: int = IMPORT_CHUNK_SIZE,
+                           account: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Schedule every row of an upload in one transaction, all for account if
+    given. Returns the rows read, posts created (a row may target several
+    platforms), duplicates skipped and the errors; when there are any,
+    nothing is created.
+    """
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {format}")
+    records = iter_csv_records(body) if format == "csv" else iter_ndjson_records(body)
+    rows_read, created, duplicates, error_count, errors = 0, 0, 0, 0, []
+    keys: List[str] = []
+    try:
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            rows_read += len(chunk)
+            rows, chunk_errors = validate_chunk(chunk, account)
+            error_count += len(chunk_errors)
+            errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+            # Past the first error, rows are only validated
+            if not error_count and rows:
+                chunk_keys, chunk_duplicates = insert_posts_once(db, rows)
+                keys += chunk_keys
+                created += len(chunk_keys)
+                duplicates += chunk_duplicates
+        if error_count:
+            db.rollback()
+            created = duplicates = 0
+        else:
+            db.commit()
+            fingerprint_index.add(keys)
+    except Exception:
+        db.rollback()
+        raise
+    return {"rows": rows_read, "imported": created, "duplicates": duplicates, "error_count": error_count,
+            "errors": errors}
@@ -0,0 +1,250 @@
+"""
+Memoized and incremental content scoring.
+
+score_content_performance depends on nothing but (content, platform), so
+results are kept in an LRU keyed by the platform and the text's length and
+built-in hash (SipHash, keyed per process: about 1 us for 3,000 characters,
+several times faster than hashlib, and the memo never leaves the process).
+The text itself is not kept; a repeat costs one hash and a dict lookup.
+POST /ai/score-content looks up the memo in the serving process and only
+sends misses to the executor's pool, whose processes score without a memo
+of their own, so /ai/score-stats counts every lookup.
+
+Drafts being typed (POST /ai/score-content with a draft_id) keep their text
+as blocks of about BLOCK_CHARS characters, each ending in whitespace, next
+to each block's TextStats. No word or keyword spans whitespace, so the
+stats of the text are the blocks' stats combined. An edit is found as the
+common prefix and suffix of the old and new text; only the blocks that
+overlap the changed span are re-split and recounted, the rest are reused
+(shifted when the edit changed the length). A keystroke therefore recounts
+two or three blocks however long the draft is. Below INCREMENTAL_MIN_CHARS
+a draft is simply recounted, which is no slower.
+
+Drafts live in the serving process, so with several workers an edit that
+lands on another worker is scored from scratch there (correctly, just not
+incrementally).
+
+    SCORE_MEMO_SIZE    memoized (content, platform) results (default: 10000)
+    DRAFT_CACHE_SIZE   drafts tracked for incremental rescoring (default: 10000)
+"""
+
+import bisect
+import functools
+import operator
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+SCORE_MEMO_SIZE = int(os.getenv("SCORE_MEMO_SIZE", "10000"))
+DRAFT_CACHE_SIZE = int(os.getenv("DRAFT_CACHE_SIZE", "10000"))
+
+# Target block length; a block runs on to the next whitespace after it
+BLOCK_CHARS = 64
+# Shorter drafts are recounted whole, which is as fast as tracking their blocks
+INCREMENTAL_MIN_CHARS = 1000
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def memo_key(content: str, platform: str) -> Tuple[str, int, int]:
+    return platform, len(content), hash(content)
+
+
+class LRUMemo:
+    """Bounded key -> value memo, least recently used entries evicted first"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any) -> Any:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+    
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Length of the longest common prefix, by binary search over C-speed slice comparisons"""
+    low, high = 0, min(len(a), len(b))
+    if a[:high] == b[:high]:
+        return high
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix_length(a: str, b: str, limit: int) -> int:
+    """Length of the longest common suffix, at most limit"""
+    low, high = 0, limit
+    if high == 0 or a[len(a) - high:] == b[len(b) - high:]:
+        return high
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def split_blocks(text: str, start: int, end: int) -> List[int]:
+    """Block end offsets covering text[start:end]; every block but the last ends in whitespace"""
+    ends = []
+    position = start
+    while position < end:
+        match = WHITESPACE_PATTERN.search(text, min(position + BLOCK_CHARS, end), end)
+        position = match.end() if match else end
+        ends.append(position)
+    return ends
+
+
+class DraftStats:
+    """TextStats of one draft, kept per block so edits only recount what changed"""
+    
+    def __init__(self):
+        self.text = ""
+        # Parallel lists: block end offsets and the stats of each block
+        self.ends: List[int] = []
+        self.blocks: List[Any] = []
+        self.recounted_chars = 0
+    
+    def update(self, text: str):
+        """Stats of text, recounting only the blocks an edit from the previous text touched"""
+        from app.services.ai_services import TextStats, text_stats
+        
+        old = self.text
+        prefix = common_prefix_length(old, text)
+        suffix = common_suffix_length(old, text, min(len(old), len(text)) - prefix)
+        changed_end = len(old) - suffix
+        shift = len(text) - len(old)
+        
+        # Blocks ending within the unchanged prefix are kept as they are, except a last one that is
+        # short or does not end in whitespace (the end of the text): typing extends it instead
+        head = bisect.bisect_right(self.ends, prefix)
+        if head and (not old[self.ends[head - 1] - 1].isspace() or head == len(self.ends)
+                     and self.ends[head - 1] - (self.ends[head - 2] if head > 1 else 0) < BLOCK_CHARS):
+            head -= 1
+        # ...and so are blocks starting past the changed span, whose preceding whitespace is unchanged too
+        tail = min(bisect.bisect_right(self.ends, changed_end) + 1, len(self.ends))
+        
+        start = self.ends[head - 1] if head else 0
+        while True:
+            end = self.ends[tail - 1] + shift if tail < len(self.ends) else len(text)
+            middle_ends = split_blocks(text, start, end)
+            # Every block but the text's last is at least BLOCK_CHARS long: a short piece takes in the next block
+            last_start = middle_ends[-2] if len(middle_ends) > 1 else start
+            if tail == len(self.ends) or end - last_start >= BLOCK_CHARS:
+                break
+            tail += 1
+        middle_blocks = []
+        previous = start
+        for block_end in middle_ends:
+            middle_blocks.append(text_stats(text[previous:block_end]))
+            previous = block_end
+        self.recounted_chars += end - start
+        
+        self.ends = self.ends[:head] + middle_ends + [block_end + shift for block_end in self.ends[tail:]]
+        self.blocks = self.blocks[:head] + middle_blocks + self.blocks[tail:]
+        self.text = text
+        if not self.blocks:
+            return text_stats("")
+        # combine_text_stats field by field, in one pass per field however many blocks there are
+        lengths, words, word_chars, periods, hashtags, questions, emojis, keywords = zip(*self.blocks)
+        return TextStats(
+            length=sum(lengths),
+            words=sum(words),
+            word_chars=sum(word_chars),
+            periods=sum(periods),
+            hashtags=sum(hashtags),
+            has_question=any(questions),
+            has_emojis=any(emojis),
+            keywords=functools.reduce(operator.or_, keywords),
+        )
+
+
+class DraftCache:
+    """Drafts by id, least recently edited evicted first"""
+    
+    def __init__(self, max_drafts: int):
+        self._drafts = LRUMemo(max_drafts)
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.recounted_chars = 0
+        self.total_chars = 0
+    
+    def update(self, draft_id: str, text: str):
+        if len(text) < INCREMENTAL_MIN_CHARS:
+            from app.services.ai_services import text_stats
+            
+            with self._lock:
+                self.updates += 1
+                self.recounted_chars += len(text)
+                self.total_chars += len(text)
+            return text_stats(text)
+        draft = self._drafts.get(draft_id)
+        if draft is None:
+            draft = self._drafts.put(draft_id, DraftStats())
+        # An edit takes microseconds, so one lock serializes them for every draft
+        with self._lock:
+            recounted = draft.recounted_chars
+            stats = draft.update(text)
+            self.updates += 1
+            self.recounted_chars += draft.recounted_chars - recounted
+            self.total_chars += len(text)
+        return stats
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **{key: value for key, value in self._drafts.stats().items() if key in ("entries", "evictions")},
+                "updates": self.updates,
+                "recounted_fraction": round(self.recounted_chars / self.total_chars, 3) if self.total_chars else 0.0,
+            }
+
+
+score_memo = LRUMemo(SCORE_MEMO_SIZE)
+draft_stats = DraftCache(DRAFT_CACHE_SIZE)
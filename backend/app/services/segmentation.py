@@ -0,0 +1,422 @@
+"""
+Audience segmentation by mini-batch k-means.
+
+Each follower becomes a row of FEATURE_NAMES: engagement rate (scaled),
+active hour on the unit circle (so 11PM and 1AM are close), and affinity
+for each content type. Rows are clustered with mini-batch k-means, which
+only ever looks at `batch_size` rows at a time, so a follower file can be
+memory-mapped (.npy) or read in chunks (.jsonl) without fitting in RAM.
+
+New followers are folded in with update(): the centers take one more
+mini-batch step and the per-segment tallies grow, without touching the
+rows seen before. Tallies of older followers are only re-assigned by the
+next full fit(). An empty segmenter holds followers back until it has
+SEED_ROWS_PER_SEGMENT distinct rows per segment to seed from, and a center
+that ends up empty or on top of another is reseeded from the next batch.
+The fitted state is persisted to AUDIENCE_SEGMENTS_PATH so the API serves
+it without recomputing.
+
+    python -m app.services.segmentation followers.npy [--segments 4]
+
+NumPy is imported at module level; callers import this module lazily.
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+AUDIENCE_SEGMENTS_PATH = os.getenv("AUDIENCE_SEGMENTS_PATH", "./audience_segments.npz")
+
+CONTENT_TYPES = ["text", "image", "video", "carousel"]
+FEATURE_NAMES = ["engagement_rate", "hour_sin", "hour_cos"] + [f"affinity_{kind}" for kind in CONTENT_TYPES]
+
+# Engagement rates are fractions around 0.01-0.2; scale them to the same range as the other features
+ENGAGEMENT_SCALE = 10.0
+# Distinct followers per segment an empty segmenter waits for before seeding its centers
+SEED_ROWS_PER_SEGMENT = 25
+
+CONTENT_IDEAS = {
+    "text": ["Threads", "Polls", "Industry insights"],
+    "image": ["Infographics", "Behind-the-scenes photos", "Quote cards"],
+    "video": ["Short videos", "Stories", "Tutorials"],
+    "carousel": ["Carousel posts", "How-to guides", "Data-driven posts"],
+}
+
+
+def follower_features(records: Iterable[Dict[str, Any]]) -> np.ndarray:
+    """Feature matrix for follower records: engagement_rate, active_hour (0-23), content_affinity"""
+    records = list(records)
+    features = np.zeros((len(records), len(FEATURE_NAMES)), dtype=np.float32)
+    for row, record in zip(features, records):
+        hour = float(record.get("active_hour", 12)) % 24
+        angle = 2 * math.pi * hour / 24
+        row[0] = float(record.get("engagement_rate", 0.0)) * ENGAGEMENT_SCALE
+        row[1] = math.sin(angle)
+        row[2] = math.cos(angle)
+        affinity = record.get("content_affinity") or {}
+        weights = [max(float(affinity.get(kind, 0.0)), 0.0) for kind in CONTENT_TYPES]
+        total = sum(weights)
+        row[3:] = [weight / total for weight in weights] if total else 1 / len(CONTENT_TYPES)
+    return features
+
+
+def iter_feature_chunks(source: Any, chunk_size: int = 65536) -> Iterator[np.ndarray]:
+    """
+    Yield feature rows chunk by chunk from a .npy path (memory-mapped), a
+    .jsonl path of follower records, an array, or an iterable of records
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.endswith(".npy"):
+            source = np.load(path, mmap_mode="r")
+        else:
+            yield from _iter_jsonl_chunks(path, chunk_size)
+            return
+    
+    if isinstance(source, np.ndarray):
+        for start in range(0, len(source), chunk_size):
+            yield np.asarray(source[start:start + chunk_size], dtype=np.float32)
+        return
+    
+    batch = []
+    for record in source:
+        batch.append(record)
+        if len(batch) == chunk_size:
+            yield follower_features(batch)
+            batch = []
+    if batch:
+        yield follower_features(batch)
+
+
+def _iter_jsonl_chunks(path: str, chunk_size: int) -> Iterator[np.ndarray]:
+    with open(path, encoding="utf-8") as lines:
+        yield from iter_feature_chunks((json.loads(line) for line in lines if line.strip()), chunk_size)
+
+
+class MiniBatchKMeans:
+    """k-means trained one mini-batch at a time with per-center learning rates (Sculley, 2010)"""
+    
+    def __init__(self, n_clusters: int = 4, seed: int = 0, n_init: int = 3):
+        self.n_clusters = n_clusters
+        self.n_init = n_init
+        self.rng = np.random.default_rng(seed)
+        self.centers: Optional[np.ndarray] = None
+        self.counts = np.zeros(n_clusters, dtype=np.float64)
+    
+    def _init_centers(self, batch: np.ndarray):
+        # Best of n_init k-means++ seedings, each refined by a few Lloyd steps on the first batch
+        best_inertia = np.inf
+        for _ in range(self.n_init):
+            centers = self._seed(batch)
+            for _ in range(10):
+                labels = _nearest(batch, centers)
+                counts, sums = _cluster_sums(labels, batch, self.n_clusters)
+                filled = counts > 0
+                centers[filled] = sums[filled] / counts[filled, None]
+            inertia = ((batch - centers[_nearest(batch, centers)]) ** 2).sum()
+            if inertia < best_inertia:
+                best_inertia, self.centers = inertia, centers
+    
+    def _seed(self, batch: np.ndarray) -> np.ndarray:
+        centers = [batch[self.rng.integers(len(batch))]]
+        closest = ((batch - centers[0]) ** 2).sum(axis=1)
+        while len(centers) < self.n_clusters:
+            total = closest.sum()
+            if total > 0:
+                index = self.rng.choice(len(batch), p=closest / total)
+            else:
+                index = self.rng.integers(len(batch))
+            centers.append(batch[index])
+            closest = np.minimum(closest, ((batch - batch[index]) ** 2).sum(axis=1))
+        return np.array(centers, dtype=np.float64)
+    
+    def _reseed(self, batch: np.ndarray):
+        """Move centers that never won a row, or that sit on another center, to rows far from the rest"""
+        _, first = np.unique(self.centers, axis=0, return_index=True)
+        stale = np.ones(self.n_clusters, dtype=bool)
+        stale[first] = False
+        stale |= self.counts == 0
+        if not stale.any() or stale.all():
+            return
+        closest = ((batch[:, None, :] - self.centers[~stale]) ** 2).sum(axis=2).min(axis=1)
+        for index in np.flatnonzero(stale):
+            total = closest.sum()
+            if total <= 0:
+                return  # every row sits on a center already
+            row = self.rng.choice(len(batch), p=closest / total)
+            self.centers[index] = batch[row]
+            self.counts[index] = 0
+            closest = np.minimum(closest, ((batch - batch[row]) ** 2).sum(axis=1))
+    
+    def assign(self, batch: np.ndarray) -> np.ndarray:
+        """Index of the nearest center for every row"""
+        return _nearest(batch, self.centers)
+    
+    def partial_fit(self, batch: np.ndarray) -> np.ndarray:
+        """One mini-batch step; returns the batch's assignments"""
+        batch = np.asarray(batch, dtype=np.float64)
+        if self.centers is None:
+            self._init_centers(batch)
+        else:
+            self._reseed(batch)
+        labels = self.assign(batch)
+        batch_counts, sums = _cluster_sums(labels, batch, self.n_clusters)
+        self.counts += batch_counts
+        moved = batch_counts > 0
+        # Same result as per-row updates with rate 1/count, applied in aggregate
+        self.centers[moved] += (sums[moved] - batch_counts[moved, None] * self.centers[moved]) / self.counts[moved, None]
+        return labels
+
+
+def _nearest(batch: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    # |x - c|^2 without the |x|^2 term, which doesn't change the argmin
+    distances = (centers ** 2).sum(axis=1) - 2 * batch @ centers.T
+    return distances.argmin(axis=1)
+
+
+def _cluster_sums(labels: np.ndarray, batch: np.ndarray, n_clusters: int):
+    one_hot = np.zeros((len(labels), n_clusters), dtype=batch.dtype)
+    one_hot[np.arange(len(labels)), labels] = 1
+    return one_hot.sum(axis=0), one_hot.T @ batch
+
+
+class AudienceSegmenter:
+    """Mini-batch k-means model plus per-segment tallies that describe each segment"""
+    
+    def __init__(self, n_segments: int = 4, batch_size: int = 4096, epochs: int = 2, seed: int = 0):
+        self.n_segments = n_segments
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.seed = seed
+        self.model = MiniBatchKMeans(n_segments, seed)
+        # Followers held back until the model has enough distinct rows to seed its centers
+        self.pending = np.zeros((0, len(FEATURE_NAMES)), dtype=np.float64)
+        self._reset_tallies()
+        self._lock = threading.Lock()
+    
+    def _reset_tallies(self):
+        features = len(FEATURE_NAMES)
+        self.sizes = np.zeros(self.n_segments, dtype=np.int64)
+        self.sums = np.zeros((self.n_segments, features), dtype=np.float64)
+        self.square_sums = np.zeros(self.n_segments, dtype=np.float64)
+        # Sizes at the last full fit, for growth since then
+        self.fitted_sizes = np.zeros(self.n_segments, dtype=np.int64)
+    
+    @property
+    def total(self) -> int:
+        return int(self.sizes.sum())
+    
+    def _batches(self, source: Any) -> Iterator[np.ndarray]:
+        for chunk in iter_feature_chunks(source, max(self.batch_size, 65536)):
+            for start in range(0, len(chunk), self.batch_size):
+                yield np.asarray(chunk[start:start + self.batch_size], dtype=np.float64)
+    
+    def _tally(self, batch: np.ndarray, labels: np.ndarray):
+        counts, sums = _cluster_sums(labels, batch, self.n_segments)
+        self.sizes += counts.astype(np.int64)
+        self.sums += sums
+        self.square_sums += np.bincount(labels, weights=(batch ** 2).sum(axis=1), minlength=self.n_segments)
+    
+    def fit(self, source: Any) -> "AudienceSegmenter":
+        """
+        Cluster every follower in source: `epochs` passes of mini-batch
+        steps, then one pass to tally the final assignments
+        """
+        if iter(source) is source:
+            # A one-shot iterator would be empty after the first pass; keep its feature rows instead
+            chunks = list(iter_feature_chunks(source))
+            source = np.concatenate(chunks) if chunks else np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32)
+        with self._lock:
+            self.model = MiniBatchKMeans(self.n_segments, self.seed)
+            self.pending = self.pending[:0]
+            self._reset_tallies()
+            for _ in range(self.epochs):
+                for batch in self._batches(source):
+                    self.model.partial_fit(batch)
+            if self.model.centers is None:
+                return self
+            for batch in self._batches(source):
+                self._tally(batch, self.model.assign(batch))
+            self.fitted_sizes = self.sizes.copy()
+        return self
+    
+    def update(self, records: Any) -> int:
+        """Fold new followers into the model and the segment tallies; returns how many were added"""
+        added = 0
+        with self._lock:
+            for batch in self._batches(records):
+                added += len(batch)
+                if self.model.centers is None:
+                    # Seeding from a handful of rows (or fewer distinct rows than segments) leaves poor or duplicate centers
+                    self.pending = np.concatenate([self.pending, batch])
+                    if len(np.unique(self.pending, axis=0)) < SEED_ROWS_PER_SEGMENT * self.n_segments:
+                        continue
+                    batch, self.pending = self.pending, self.pending[:0]
+                self._tally(batch, self.model.partial_fit(batch))
+        return added
+    
+    def segments(self) -> List[Dict[str, Any]]:
+        total = max(self.total, 1)
+        overall_rate = self.sums[:, 0].sum() / total
+        segments = []
+        names = set()
+        for index in np.argsort(-self.sizes):
+            size = int(self.sizes[index])
+            if size == 0:
+                continue
+            mean = self.sums[index] / size
+            segment = describe_segment(mean, size / total * 100, overall_rate,
+                                       format_growth(size, int(self.fitted_sizes[index])))
+            # Two clusters can share a description; keep names unique
+            name, suffix = segment["name"], 2
+            while segment["name"] in names:
+                segment["name"] = f"{name} {suffix}"
+                suffix += 1
+            names.add(segment["name"])
+            segments.append(segment)
+        return segments
+    
+    def confidence(self) -> float:
+        """Share of feature variance explained by the segments (1 - within / total sum of squares)"""
+        total = self.total
+        if total == 0:
+            return 0.0
+        sizes = np.maximum(self.sizes, 1)
+        within = (self.square_sums - (self.sums ** 2).sum(axis=1) / sizes).sum()
+        overall = self.square_sums.sum() - (self.sums.sum(axis=0) ** 2).sum() / total
+        if overall <= 0:
+            return 1.0
+        return round(float(max(0.0, 1 - within / overall)), 2)
+    
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = self.segments()
+            return {
+                "segments": segments,
+                "total_audience": self.total,
+                "segmentation_confidence": self.confidence(),
+                "recommendations": [
+                    f"Create more {segment['best_content'][0].lower()} for {segment['name']}"
+                    for segment in segments[:3]
+                ],
+            }
+    
+    def save(self, path: str = AUDIENCE_SEGMENTS_PATH):
+        with self._lock:
+            if self.model.centers is None and not len(self.pending):
+                return
+            centers = self.model.centers
+            if centers is None:
+                centers = np.zeros((0, len(FEATURE_NAMES)))
+            temporary = path + ".tmp.npz"
+            np.savez(temporary, n_segments=self.n_segments, centers=centers, counts=self.model.counts,
+                     sizes=self.sizes, sums=self.sums, square_sums=self.square_sums,
+                     fitted_sizes=self.fitted_sizes, pending=self.pending)
+            os.replace(temporary, path)
+    
+    @classmethod
+    def load(cls, path: str = AUDIENCE_SEGMENTS_PATH, **kwargs) -> "AudienceSegmenter":
+        with np.load(path) as state:
+            n_segments = int(state["n_segments"]) if "n_segments" in state else len(state["centers"])
+            segmenter = cls(n_segments=n_segments, **kwargs)
+            if len(state["centers"]):
+                segmenter.model.centers = state["centers"].copy()
+            if "pending" in state:
+                segmenter.pending = state["pending"].copy()
+            segmenter.model.counts = state["counts"].copy()
+            segmenter.sizes = state["sizes"].copy()
+            segmenter.sums = state["sums"].copy()
+            segmenter.square_sums = state["square_sums"].copy()
+            segmenter.fitted_sizes = state["fitted_sizes"].copy()
+        return segmenter
+
+
+def describe_segment(mean: np.ndarray, share: float, overall_rate: float, growth: str) -> Dict[str, Any]:
+    """Turn a segment's mean feature row into the API's segment description"""
+    rate = mean[0] / ENGAGEMENT_SCALE
+    ratio = mean[0] / overall_rate if overall_rate else 1.0
+    hour = math.degrees(math.atan2(mean[1], mean[2])) / 15 % 24
+    affinity = mean[3:]
+    ranked = [CONTENT_TYPES[index] for index in np.argsort(-affinity)]
+    favourite = ranked[0]
+    
+    if ratio >= 1.5:
+        tier = "Highly Engaged"
+    elif ratio >= 0.75:
+        tier = "Engaged"
+    else:
+        tier = "Casual"
+    
+    return {
+        "name": f"{tier} {daypart(hour)} {favourite.title()} Fans",
+        "size": round(share, 1),
+        "characteristics": [
+            f"Engagement {ratio:.1f}x the audience average",
+            f"Most active around {format_hour(round(hour))}",
+            f"Prefers {favourite} content ({affinity.max() * 100:.0f}%)",
+        ],
+        "best_content": CONTENT_IDEAS[favourite][:2] + CONTENT_IDEAS[ranked[1]][:1],
+        "active_hours": f"{format_hour(round(hour - 1.5))}-{format_hour(round(hour + 1.5))}",
+        "avg_engagement": round(float(rate) * 100, 1),
+        "growth_trend": growth,
+    }
+
+
+def daypart(hour: float) -> str:
+    if 5 <= hour < 12:
+        return "Morning"
+    if 12 <= hour < 17:
+        return "Afternoon"
+    if 17 <= hour < 22:
+        return "Evening"
+    return "Night"
+
+
+def format_hour(hour: int) -> str:
+    hour %= 24
+    return f"{hour % 12 or 12}{'AM' if hour < 12 else 'PM'}"
+
+
+def format_growth(current: int, previous: int) -> str:
+    if previous == 0:
+        return "new"
+    return f"{(current - previous) / previous * 100:+.0f}%"
+
+
+_audience_segmenter: Optional[AudienceSegmenter] = None
+_load_lock = threading.Lock()
+
+
+def get_audience_segmenter() -> AudienceSegmenter:
+    """The persisted segmenter, loaded from AUDIENCE_SEGMENTS_PATH on first use (empty if none was saved)"""
+    global _audience_segmenter
+    with _load_lock:
+        if _audience_segmenter is None:
+            if os.path.exists(AUDIENCE_SEGMENTS_PATH):
+                _audience_segmenter = AudienceSegmenter.load(AUDIENCE_SEGMENTS_PATH)
+            else:
+                _audience_segmenter = AudienceSegmenter()
+        return _audience_segmenter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit audience segments and save them to AUDIENCE_SEGMENTS_PATH")
+    parser.add_argument("source", help=".npy feature matrix (memory-mapped) or .jsonl follower records")
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--output", default=AUDIENCE_SEGMENTS_PATH)
+    args = parser.parse_args()
+    
+    segmenter = AudienceSegmenter(args.segments, args.batch_size, args.epochs).fit(args.source)
+    segmenter.save(args.output)
+    print(json.dumps(segmenter.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Async client for the social platform APIs.
+
+- One pooled keep-alive httpx client per platform (HTTP/2 when the `h2`
+  package is installed).
+- Token-bucket rate limiting per platform, tightened from the platform's
+  rate-limit response headers and paused on 429 Retry-After.
+- Duplicate metric fetches that are in flight at the same time share one
+  request.
+- Metric fetches use the platform's batch lookup where it has one.
+
+Access tokens come from <PLATFORM>_ACCESS_TOKEN environment variables.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.services.rate_limit import TokenBucket, bucket_for
+
+logger = logging.getLogger(__name__)
+
+# Keys match the platforms in ai_services.predict_engagement
+PLATFORM_CONFIG: Dict[str, Dict[str, Any]] = {
+    "twitter": {
+        "base_url": "https://api.twitter.com/2",
+        "publish_path": "/tweets",
+        "metrics_path": "/tweets/{post_id}?tweet.fields=public_metrics",
+        "batch_metrics_path": "/tweets?ids={post_ids}&tweet.fields=public_metrics",
+        "batch_size": 100,
+        "metrics_fields": {
+            "likes": "public_metrics.like_count",
+            "comments": "public_metrics.reply_count",
+            "shares": "public_metrics.retweet_count",
+            "impressions": "public_metrics.impression_count",
+        },
+    },
+    "instagram": {
+        "base_url": "https://graph.facebook.com/v19.0",
+        "publish_path": "/me/media",
+        "metrics_path": "/{post_id}?fields=like_count,comments_count",
+        "batch_metrics_path": "/?ids={post_ids}&fields=like_count,comments_count",
+        "batch_size": 50,
+        "metrics_fields": {"likes": "like_count", "comments": "comments_count"},
+    },
+    "facebook": {
+        "base_url": "https://graph.facebook.com/v19.0",
+        "publish_path": "/me/feed",
+        "metrics_path": "/{post_id}?fields=reactions.summary(true),comments.summary(true),shares",
+        "batch_metrics_path": "/?ids={post_ids}&fields=reactions.summary(true),comments.summary(true),shares",
+        "batch_size": 50,
+        "metrics_fields": {
+            "likes": "reactions.summary.total_count",
+            "comments": "comments.summary.total_count",
+            "shares": "shares.count",
+        },
+    },
+    "linkedin": {
+        "base_url": "https://api.linkedin.com/v2",
+        "publish_path": "/ugcPosts",
+        "metrics_path": "/socialActions/{post_id}",
+        "batch_metrics_path": None,
+        "batch_size": 1,
+        "metrics_fields": {
+            "likes": "likesSummary.totalLikes",
+            "comments": "commentsSummary.aggregatedTotalComments",
+        },
+    },
+}
+
+# (remaining, reset) header pairs, first match wins; reset is epoch seconds
+RATE_LIMIT_HEADERS = [
+    ("x-rate-limit-remaining", "x-rate-limit-reset"),
+    ("x-ratelimit-remaining", "x-ratelimit-reset"),
+]
+
+
+class PlatformAPIError(Exception):
+    def __init__(self, platform: str, status_code: int, detail: str):
+        super().__init__(f"{platform} API returned {status_code}: {detail}")
+        self.platform = platform
+        self.status_code = status_code
+
+
+class SocialAPIClient:
+    """Pooled, rate-limited asyncio client for all platforms"""
+    
+    def __init__(self, config: Optional[Dict[str, Dict[str, Any]]] = None,
+                 tokens: Optional[Dict[str, str]] = None, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 max_connections: int = 20, timeout: float = 10.0, max_retries: int = 3):
+        self.config = config or PLATFORM_CONFIG
+        self.tokens = tokens if tokens is not None else {
+            platform: os.getenv(f"{platform.upper()}_ACCESS_TOKEN", "") for platform in self.config
+        }
+        self.transport = transport
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.http2 = transport is None and importlib.util.find_spec("h2") is not None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.stats = {"requests": 0, "coalesced": 0, "throttled": 0, "batched": 0}
+    
+    def _platform(self, platform: str) -> Dict[str, Any]:
+        if platform not in self.config:
+            raise ValueError(f"Unsupported platform: {platform}")
+        return self.config[platform]
+    
+    def _client(self, platform: str) -> httpx.AsyncClient:
+        if platform not in self._clients:
+            config = self._platform(platform)
+            headers = {"Authorization": f"Bearer {self.tokens.get(platform, '')}"}
+            self._clients[platform] = httpx.AsyncClient(
+                base_url=config["base_url"],
+                headers=headers,
+                http2=self.http2,
+                transport=self.transport,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+        return self._clients[platform]
+    
+    def _bucket(self, platform: str) -> TokenBucket:
+        if platform not in self._buckets:
+            self._buckets[platform] = bucket_for(platform)
+        return self._buckets[platform]
+    
+    async def _acquire(self, platform: str):
+        bucket = self._bucket(platform)
+        if bucket.try_acquire():
+            return
+        self.stats["throttled"] += 1
+        while not bucket.try_acquire():
+            await asyncio.sleep(max(bucket.wait_time(), 0.001))
+    
+    def _apply_rate_limit_headers(self, platform: str, response: httpx.Response):
+        for remaining_header, reset_header in RATE_LIMIT_HEADERS:
+            remaining = response.headers.get(remaining_header)
+            if remaining is None:
+                continue
+            reset_at = float(response.headers.get(reset_header, 0) or 0)
+            self._bucket(platform).limit(float(remaining), max(0.0, reset_at - time.time()))
+            return
+    
+    async def request(self, platform: str, method: str, path: str, **kwargs) -> Any:
+        """Rate-limited request with 429 / 5xx retries; returns the decoded JSON body"""
+        client = self._client(platform)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(platform)
+            self.stats["requests"] += 1
+            response = await client.request(method, path, **kwargs)
+            self._apply_rate_limit_headers(platform, response)
+            
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    break
+                retry_after = parse_retry_after(response.headers.get("retry-after")) or 2 ** attempt * 0.1
+                if response.status_code == 429:
+                    self._bucket(platform).pause(retry_after)
+                else:
+                    await asyncio.sleep(retry_after)
+                continue
+            break
+        
+        if response.status_code >= 400:
+            raise PlatformAPIError(platform, response.status_code, response.text[:200])
+        return response.json()
+    
+    async def publish(self, platform: str, post: Dict[str, Any]) -> Any:
+        config = self._platform(platform)
+        return await self.request(platform, "POST", config["publish_path"], json={"text": post["content"]})
+    
+    async def fetch_metrics(self, platform: str, post_id: str) -> Dict[str, int]:
+        """Metrics for one post; concurrent calls for the same post share a request"""
+        key = (platform, post_id)
+        if key in self._in_flight:
+            self.stats["coalesced"] += 1
+            shared = self._in_flight[key]
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                # The caller that owned the request was cancelled, not this one: fetch again
+                if shared.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.fetch_metrics(platform, post_id)
+                raise
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            config = self._platform(platform)
+            data = await self.request(platform, "GET", config["metrics_path"].format(post_id=post_id))
+            metrics = parse_metrics(config, data)
+            future.set_result(metrics)
+            return metrics
+        except Exception as exc:
+            future.set_exception(exc)
+            # Consume it here too, so a failure nobody else awaited is not logged as unretrieved
+            future.exception()
+            raise
+        finally:
+            # Cancelled (a BaseException): waiters must not be left on a future nobody resolves
+            if not future.done():
+                future.cancel()
+            del self._in_flight[key]
+    
+    async def fetch_metrics_many(self, platform: str, post_ids: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """Metrics for many posts, using the platform's batch lookup when it has one"""
+        config = self._platform(platform)
+        unique_ids = list(dict.fromkeys(post_ids))
+        if not config.get("batch_metrics_path") or config.get("batch_size", 1) <= 1:
+            results = await asyncio.gather(*(self.fetch_metrics(platform, post_id) for post_id in unique_ids))
+            return dict(zip(unique_ids, results))
+        
+        size = config["batch_size"]
+        chunks = [unique_ids[i:i + size] for i in range(0, len(unique_ids), size)]
+        merged: Dict[str, Dict[str, int]] = {}
+        for result in await asyncio.gather(*(self._fetch_batch(platform, chunk) for chunk in chunks)):
+            merged.update(result)
+        return merged
+    
+    async def _fetch_batch(self, platform: str, post_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        config = self._platform(platform)
+        self.stats["batched"] += 1
+        data = await self.request(platform, "GET", config["batch_metrics_path"].format(post_ids=",".join(post_ids)))
+        # Twitter answers {"data": [...]}, the Graph API answers {id: {...}}
+        items = data.get("data") if isinstance(data.get("data"), list) else [
+            {"id": post_id, **value} for post_id, value in data.items()
+        ]
+        return {str(item["id"]): parse_metrics(config, item) for item in items}
+    
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header, either delay-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def parse_metrics(config: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, int]:
+    """Map a platform payload to likes/comments/shares/impressions"""
+    data = data.get("data", data) if isinstance(data.get("data"), dict) else data
+    metrics = {"likes": 0, "comments": 0, "shares": 0, "impressions": 0}
+    for name, path in config["metrics_fields"].items():
+        value: Any = data
+        for part in path.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        metrics[name] = int(value or 0)
+    return metrics
@@ -0,0 +1,357 @@
+"""
+Columnar time-series store for competitor metrics.
+
+Every resolution (hour, day, week) keeps one 2-D NumPy array per column,
+rows are handles and columns are time buckets, so a query over N handles
+is a handful of slices rather than N lookups. Samples are rolled up into
+all three resolutions as they are recorded.
+
+    followers               gauge: hourly keeps the last sample, rollups keep
+                            the first and last sample of the bucket
+    likes, comments, posts  counters: summed per bucket
+
+A window query splits [start, end) into aligned pieces (leading hours,
+leading days, whole weeks, trailing days, trailing hours), so a year over
+500 handles reads ~52 weekly columns plus a few dozen finer ones.
+
+Samples for a handle are expected roughly in time order (an hourly
+sampler); a late sample in an already-filled bucket still adds to the
+counters but does not become the bucket's first gauge value.
+
+Each resolution keeps a retention window counted back from the clock
+(COMPETITOR_HOURLY_RETENTION_DAYS for hours, COMPETITOR_RETENTION_DAYS for
+days and weeks); older columns are dropped as new samples arrive, so memory
+stays bounded. Samples outside the longest window, or more than an hour
+ahead of the clock, are rejected rather than growing the arrays to reach
+them. A window edge older than the hourly retention is answered at day
+granularity.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+COMPETITOR_SERIES_PATH = os.getenv("COMPETITOR_SERIES_PATH", "./competitor_series.npz")
+# Days of samples kept: hourly columns, and the daily and weekly rollups
+HOURLY_RETENTION_DAYS = int(os.getenv("COMPETITOR_HOURLY_RETENTION_DAYS", "90"))
+RETENTION_DAYS = int(os.getenv("COMPETITOR_RETENTION_DAYS", "3660"))
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+# Monday 1970-01-05 00:00 UTC, so weekly buckets start on Mondays
+ORIGIN = 4 * DAY
+
+RESOLUTIONS = {"hour": HOUR, "day": DAY, "week": WEEK}
+# Seconds a sample may be stamped ahead of the clock
+MAX_AHEAD = HOUR
+GAUGES = ["followers"]
+COUNTERS = ["likes", "comments", "posts"]
+
+
+def hour_range(now: float, retention_days: int = RETENTION_DAYS) -> Tuple[int, int]:
+    """Absolute hours [oldest, newest] accepted at time now: within retention, at most MAX_AHEAD past now"""
+    hour = (now - ORIGIN) / HOUR
+    return int(hour) - retention_days * DAY // HOUR, int(hour + MAX_AHEAD / HOUR)
+
+
+def _columns(resolution: str) -> Dict[str, Any]:
+    """Column name -> (dtype, fill value) stored at a resolution"""
+    columns = {}
+    for gauge in GAUGES:
+        if resolution == "hour":
+            columns[gauge] = (np.float64, np.nan)
+        else:
+            columns[f"{gauge}_first"] = (np.float64, np.nan)
+            columns[f"{gauge}_last"] = (np.float64, np.nan)
+    for counter in COUNTERS:
+        # Hourly counts are small; rollups get the wider type
+        columns[counter] = (np.int32 if resolution == "hour" else np.int64, 0)
+    return columns
+
+
+class TimeSeriesStore:
+    """Per-handle metric series at hourly, daily and weekly resolution"""
+    
+    def __init__(self, initial_handles: int = 64, initial_hours: int = 24 * 7,
+                 retention_days: int = RETENTION_DAYS, hourly_retention_days: int = HOURLY_RETENTION_DAYS,
+                 clock: Callable[[], float] = time.time):
+        self.handles: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Days of samples kept at each resolution, counted back from the clock
+        self.retention_days = {"hour": hourly_retention_days, "day": retention_days, "week": retention_days}
+        self.clock = clock
+        # Absolute bucket index of column 0 at each resolution; set by the first sample that reaches it
+        self._first: Dict[str, Optional[int]] = {resolution: None for resolution in RESOLUTIONS}
+        self._rows = initial_handles
+        self._data = {
+            resolution: {
+                name: np.full((self._rows, -(-initial_hours * HOUR // RESOLUTIONS[resolution]) + 1), fill, dtype=dtype)
+                for name, (dtype, fill) in _columns(resolution).items()
+            }
+            for resolution in RESOLUTIONS
+        }
+    
+    def _width(self, resolution: str) -> int:
+        return next(iter(self._data[resolution].values())).shape[1]
+    
+    def hour_range(self) -> Tuple[int, int]:
+        """Absolute hours [oldest, newest] a sample may have now"""
+        return hour_range(self.clock(), max(self.retention_days.values()))
+    
+    def _cutoff(self, resolution: str) -> int:
+        """Oldest absolute bucket retained at a resolution"""
+        now_hour = int((self.clock() - ORIGIN) // HOUR)
+        return (now_hour - self.retention_days[resolution] * DAY // HOUR) * HOUR // RESOLUTIONS[resolution]
+    
+    def _grow(self, resolution: str, rows: int, first: int, last: int):
+        """Resize a resolution's arrays so rows handles and buckets [first, last] fit"""
+        start = self._first[resolution]
+        width = self._width(resolution)
+        if start is None:
+            start = self._first[resolution] = first
+        new_start = min(start, first)
+        needed = max(start + width, last + 1) - new_start
+        if rows <= self._rows and new_start == start and needed <= width:
+            return
+        
+        new_rows = max(rows, 2 * self._rows) if rows > self._rows else self._rows
+        new_width = max(needed, 2 * width) if needed > width else width
+        shift = start - new_start
+        columns = self._data[resolution]
+        for name, (dtype, fill) in _columns(resolution).items():
+            old = columns[name]
+            grown = np.full((new_rows, new_width), fill, dtype=dtype)
+            grown[:old.shape[0], shift:shift + old.shape[1]] = old
+            columns[name] = grown
+        self._first[resolution] = new_start
+        if new_rows != self._rows:
+            # Other resolutions only need more rows
+            self._rows = new_rows
+            for other, other_columns in self._data.items():
+                for name, (dtype, fill) in _columns(other).items():
+                    old = other_columns[name]
+                    if old.shape[0] < new_rows:
+                        grown = np.full((new_rows, old.shape[1]), fill, dtype=dtype)
+                        grown[:old.shape[0]] = old
+                        other_columns[name] = grown
+    
+    def _trim(self, resolution: str):
+        """Drop columns older than the retention window, once they are a quarter of the array"""
+        start = self._first[resolution]
+        if start is None:
+            return
+        cut = self._cutoff(resolution) - start
+        if cut <= 0 or cut < self._width(resolution) // 4:
+            return
+        columns = self._data[resolution]
+        for name in columns:
+            # Copied, so the dropped columns are freed rather than kept alive by a view
+            columns[name] = np.ascontiguousarray(columns[name][:, cut:])
+        self._first[resolution] = start + cut
+    
+    def _row(self, handle: str) -> int:
+        row = self.handles.get(handle)
+        if row is None:
+            row = self.handles[handle] = len(self.handles)
+        return row
+    
+    def record(self, handle: str, timestamp: float, followers: Optional[float] = None,
+               likes: int = 0, comments: int = 0, posts: int = 0):
+        """Record one sample"""
+        self.record_many(handle, [timestamp], followers=None if followers is None else [followers],
+                         likes=[likes], comments=[comments], posts=[posts])
+    
+    def record_many(self, handle: str, timestamps: Sequence[float], **metrics: Optional[Sequence[float]]):
+        """
+        Record a handle's samples in time order, e.g. a backfill; metrics are
+        followers, likes, comments and posts, each aligned with timestamps.
+        Raises ValueError for a timestamp outside hour_range(); samples older
+        than the hourly retention only reach the daily and weekly rollups
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(timestamps) == 0:
+            return
+        unknown = set(metrics) - set(GAUGES) - set(COUNTERS)
+        if unknown:
+            raise ValueError(f"Unknown metrics: {sorted(unknown)}")
+        oldest, newest = self.hour_range()
+        hours = (timestamps - ORIGIN) // HOUR
+        if not (np.all(hours >= oldest) and np.all(hours <= newest)):
+            raise ValueError("Timestamps must be epoch seconds within the retention window and not in the future")
+        hours = hours.astype(np.int64)
+        metrics = {name: np.asarray(values) for name, values in metrics.items() if values is not None}
+        
+        with self._lock:
+            row = self._row(handle)
+            for resolution, columns in self._data.items():
+                size = RESOLUTIONS[resolution]
+                buckets = hours * HOUR // size
+                kept = buckets >= self._cutoff(resolution)
+                if not kept.any():
+                    continue
+                values = metrics
+                if not kept.all():
+                    buckets = buckets[kept]
+                    values = {name: metric[kept] for name, metric in metrics.items()}
+                self._grow(resolution, len(self.handles), int(buckets.min()), int(buckets.max()))
+                buckets = buckets - self._first[resolution]
+                for counter in COUNTERS:
+                    if counter in values:
+                        target = columns[counter][row]
+                        np.add.at(target, buckets, values[counter].astype(target.dtype))
+                for gauge in GAUGES:
+                    if gauge in values:
+                        self._set_gauge(resolution, columns, gauge, row, buckets, values[gauge].astype(np.float64))
+                self._trim(resolution)
+    
+    @staticmethod
+    def _set_gauge(resolution: str, columns: Dict[str, np.ndarray], gauge: str, row: int,
+                   buckets: np.ndarray, values: np.ndarray):
+        present = ~np.isnan(values)
+        buckets, values = buckets[present], values[present]
+        if len(buckets) == 0:
+            return
+        # Latest sample per bucket: first occurrence in the reversed batch
+        unique, reversed_index = np.unique(buckets[::-1], return_index=True)
+        last = len(buckets) - 1 - reversed_index
+        if resolution == "hour":
+            columns[gauge][row, unique] = values[last]
+            return
+        columns[f"{gauge}_last"][row, unique] = values[last]
+        unique, first = np.unique(buckets, return_index=True)
+        first_column = columns[f"{gauge}_first"][row]
+        empty = np.isnan(first_column[unique])
+        first_column[unique[empty]] = values[first[empty]]
+    
+    def _pieces(self, start: float, end: float) -> List[Any]:
+        """
+        Aligned (resolution, first column, end column) pieces covering the hours
+        of [start, end); edges older than the hourly retention widen to whole days
+        """
+        first_hour = int((start - ORIGIN) // HOUR)
+        end_hour = int(-(-(end - ORIGIN) // HOUR))
+        per_day, per_week = DAY // HOUR, WEEK // HOUR
+        hourly_from = self._first["hour"]
+        if hourly_from is None or first_hour < hourly_from:
+            first_hour = first_hour // per_day * per_day
+        if hourly_from is None or end_hour <= hourly_from:
+            end_hour = -(-end_hour // per_day) * per_day
+        if first_hour >= end_hour:
+            return []
+        
+        def column(resolution: str, absolute_hour: int) -> int:
+            bucket = absolute_hour * HOUR // RESOLUTIONS[resolution] - self._first[resolution]
+            return min(max(bucket, 0), self._width(resolution))
+        
+        first_day, end_day = -(-first_hour // per_day) * per_day, end_hour // per_day * per_day
+        if first_day >= end_day:
+            spans = [("hour", first_hour, end_hour)]
+        else:
+            first_week, end_week = -(-first_day // per_week) * per_week, end_day // per_week * per_week
+            if first_week >= end_week:
+                middle = [("day", first_day, end_day)]
+            else:
+                middle = [("day", first_day, first_week), ("week", first_week, end_week), ("day", end_week, end_day)]
+            spans = [("hour", first_hour, first_day)] + middle + [("hour", end_day, end_hour)]
+        pieces = [(resolution, column(resolution, a), column(resolution, b))
+                  for resolution, a, b in spans if b > a and self._first[resolution] is not None]
+        return [piece for piece in pieces if piece[2] > piece[1]]
+    
+    def query(self, handles: Sequence[str], start: float, end: float) -> Dict[str, np.ndarray]:
+        """
+        Per-handle totals over [start, end) (hour granularity): counter sums and
+        the first and last gauge values; rows follow `handles`, unknown handles get NaN/0
+        """
+        result = {f"{gauge}_{edge}": np.full(len(handles), np.nan) for gauge in GAUGES for edge in ("first", "last")}
+        result.update({counter: np.zeros(len(handles), dtype=np.int64) for counter in COUNTERS})
+        with self._lock:
+            known = [position for position, handle in enumerate(handles) if handle in self.handles]
+            if self._first["day"] is None or not known:
+                return result
+            rows = np.array([self.handles[handles[position]] for position in known])
+            known = np.array(known)
+            for resolution, a, b in self._pieces(start, end):
+                columns = self._data[resolution]
+                for counter in COUNTERS:
+                    result[counter][known] += columns[counter][rows, a:b].sum(axis=1)
+                for gauge in GAUGES:
+                    first_name = gauge if resolution == "hour" else f"{gauge}_first"
+                    last_name = gauge if resolution == "hour" else f"{gauge}_last"
+                    first = _first_present(columns[first_name][rows, a:b])
+                    last = _first_present(columns[last_name][rows, a:b][:, ::-1])
+                    missing = np.isnan(result[f"{gauge}_first"][known])
+                    result[f"{gauge}_first"][known[missing]] = first[missing]
+                    present = ~np.isnan(last)
+                    result[f"{gauge}_last"][known[present]] = last[present]
+        return result
+    
+    def save(self, path: str = COMPETITOR_SERIES_PATH):
+        with self._lock:
+            if self._first["day"] is None:
+                return
+            arrays = {f"{resolution}/{name}": values[:len(self.handles)]
+                      for resolution, columns in self._data.items() for name, values in columns.items()}
+            temporary = path + ".tmp.npz"
+            first = {f"first/{resolution}": -1 if bucket is None else bucket
+                     for resolution, bucket in self._first.items()}
+            np.savez(temporary, handles=np.array(list(self.handles)), **first, **arrays)
+            os.replace(temporary, path)
+    
+    @classmethod
+    def load(cls, path: str = COMPETITOR_SERIES_PATH) -> "TimeSeriesStore":
+        store = cls()
+        with np.load(path) as saved:
+            handles = [str(handle) for handle in saved["handles"]]
+            store.handles = {handle: row for row, handle in enumerate(handles)}
+            for resolution, size in RESOLUTIONS.items():
+                if "start_hour" in saved:
+                    # Saved before each resolution kept its own start
+                    store._first[resolution] = int(saved["start_hour"]) * HOUR // size
+                elif int(saved[f"first/{resolution}"]) >= 0:
+                    store._first[resolution] = int(saved[f"first/{resolution}"])
+            store._rows = max(len(handles), 1)
+            store._data = {
+                resolution: {name: saved[f"{resolution}/{name}"].copy() for name in _columns(resolution)}
+                for resolution in RESOLUTIONS
+            }
+        return store
+
+
+def _first_present(block: np.ndarray) -> np.ndarray:
+    """First non-NaN value of each row (NaN when the row has none)"""
+    if block.shape[1] == 0:
+        return np.full(block.shape[0], np.nan)
+    present = ~np.isnan(block)
+    index = present.argmax(axis=1)
+    values = block[np.arange(block.shape[0]), index]
+    return np.where(present.any(axis=1), values, np.nan)
+
+
+_competitor_series: Optional[TimeSeriesStore] = None
+_load_lock = threading.Lock()
+_saved_at = 0.0
+
+
+def get_competitor_series() -> TimeSeriesStore:
+    """The competitor store, loaded from COMPETITOR_SERIES_PATH on first use (empty if none was saved)"""
+    global _competitor_series
+    with _load_lock:
+        if _competitor_series is None:
+            if os.path.exists(COMPETITOR_SERIES_PATH):
+                _competitor_series = TimeSeriesStore.load(COMPETITOR_SERIES_PATH)
+            else:
+                _competitor_series = TimeSeriesStore()
+        return _competitor_series
+
+
+def save_competitor_series(min_interval: float = 0.0):
+    """Persist the competitor store if it was loaded, at most once per min_interval seconds"""
+    global _saved_at
+    if _competitor_series is None or time.monotonic() - _saved_at < min_interval:
+        return
+    _saved_at = time.monotonic()
+    _competitor_series.save(COMPETITOR_SERIES_PATH)
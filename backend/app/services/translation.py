@@ -0,0 +1,209 @@
+"""
+Segment-level translation memory.
+
+Captions are split into sentences and hashtags. Each (language, segment)
+pair is addressed by a hash of its content and looked up in a local LRU,
+then in the translation_segments table; only what is still missing goes
+to the translation backend, in one batched call per request. New
+translations are written back to both tiers, so boilerplate (CTAs,
+signatures, recurring hashtags) is paid for once across all requests.
+
+A backend is any object with translate(items) -> translations, where items
+is a list of (segment, language) pairs. FakeTranslator stands in until a
+real service is configured.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.instrumentation import timed
+from app.models import TranslationSegment
+
+LANGUAGE_CODES = {
+    "spanish": "es",
+    "french": "fr",
+    "german": "de",
+    "portuguese": "pt",
+    "japanese": "ja",
+}
+
+# A hashtag, or a sentence: up to terminal punctuation, a line break, the next hashtag or the end
+SEGMENT_PATTERN = re.compile(r"#\w+|[^\s#](?:[^#\n]*?[.!?…](?=\s|$)|[^#\n]*?(?=\s*#|\s*\n|\s*$))")
+
+# Keys per IN (...) lookup, well under SQLite's bound-parameter limit
+LOOKUP_BATCH_SIZE = 500
+
+
+def split_segments(text: str) -> List[Tuple[int, int]]:
+    """(start, end) spans of the translatable segments; everything between them is kept verbatim"""
+    return [match.span() for match in SEGMENT_PATTERN.finditer(text)]
+
+
+def segment_key(segment: str, language: str) -> str:
+    return hashlib.blake2b(f"{language}\x00{segment}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FakeTranslator:
+    """Deterministic local backend: tags sentences with the language code and keeps hashtags"""
+    
+    def __init__(self, call_latency: float = 0.0, segment_latency: float = 0.0):
+        self.call_latency = call_latency
+        self.segment_latency = segment_latency
+        self.calls = 0
+        self.segments = 0
+    
+    def translate(self, items: List[Tuple[str, str]]) -> List[str]:
+        self.calls += 1
+        self.segments += len(items)
+        if self.call_latency or self.segment_latency:
+            time.sleep(self.call_latency + self.segment_latency * len(items))
+        return [
+            segment if segment.startswith("#") else f"[{LANGUAGE_CODES.get(language, language)}] {segment}"
+            for segment, language in items
+        ]
+
+
+class TranslationMemory:
+    """Content-addressed segment cache (LRU in front of the database) in front of a translation backend"""
+    
+    def __init__(self, backend: Any, session_factory: Callable = SessionLocal, cache_size: int = 50000):
+        self.backend = backend
+        self.session_factory = session_factory
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "segments": 0, "cache_hits": 0, "store_hits": 0, "misses": 0,
+                          "backend_calls": 0}
+        self._latency_ms = {"total": 0.0, "backend": 0.0}
+    
+    @timed
+    def translate(self, text: str, languages: List[str]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Translate text into each language; returns the translations and this request's stats"""
+        started = time.perf_counter()
+        spans = split_segments(text)
+        segments = list(dict.fromkeys(text[start:end] for start, end in spans))
+        keys = {(segment, language): segment_key(segment, language) for language in languages for segment in segments}
+        
+        found = self._from_cache(keys.values())
+        cache_hits = len(found)
+        missing = [pair for pair, key in keys.items() if key not in found]
+        stored = self._from_store([keys[pair] for pair in missing]) if missing else {}
+        found.update(stored)
+        missing = [pair for pair in missing if keys[pair] not in stored]
+        
+        backend_ms = 0.0
+        if missing:
+            backend_started = time.perf_counter()
+            translated = self.backend.translate(missing)
+            backend_ms = (time.perf_counter() - backend_started) * 1000
+            new_rows = [
+                {"key": keys[pair], "language": pair[1], "source": pair[0], "translation": translation}
+                for pair, translation in zip(missing, translated)
+            ]
+            self._save(new_rows)
+            found.update((row["key"], row["translation"]) for row in new_rows)
+        self._remember({key: found[key] for key in keys.values()})
+        
+        translations = {}
+        for language in languages:
+            pieces, position = [], 0
+            for start, end in spans:
+                pieces.append(text[position:start])
+                pieces.append(found[keys[(text[start:end], language)]])
+                position = end
+            pieces.append(text[position:])
+            translations[language] = "".join(pieces)
+        
+        total_ms = (time.perf_counter() - started) * 1000
+        request_stats = {
+            "segments": len(keys),
+            "cache_hits": cache_hits,
+            "store_hits": len(stored),
+            "misses": len(missing),
+            "hit_rate": round((len(keys) - len(missing)) / len(keys), 3) if keys else 1.0,
+            "backend_ms": round(backend_ms, 3),
+            "latency_ms": round(total_ms, 3),
+        }
+        with self._lock:
+            counters = self._counters
+            counters["requests"] += 1
+            counters["segments"] += len(keys)
+            counters["cache_hits"] += cache_hits
+            counters["store_hits"] += len(stored)
+            counters["misses"] += len(missing)
+            counters["backend_calls"] += bool(missing)
+            self._latency_ms["total"] += total_ms
+            self._latency_ms["backend"] += backend_ms
+        return translations, request_stats
+    
+    def _from_cache(self, keys) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                translation = self._cache.get(key)
+                if translation is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = translation
+        return found
+    
+    def _remember(self, entries: Dict[str, str]):
+        with self._lock:
+            for key, translation in entries.items():
+                self._cache[key] = translation
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _from_store(self, keys: List[str]) -> Dict[str, str]:
+        found = {}
+        with self.session_factory() as db:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                query = select(TranslationSegment.key, TranslationSegment.translation).where(
+                    TranslationSegment.key.in_(keys[start:start + LOOKUP_BATCH_SIZE])
+                )
+                found.update(db.execute(query).all())
+        return found
+    
+    def _save(self, rows: List[Dict[str, str]]):
+        with self.session_factory() as db:
+            try:
+                db.execute(TranslationSegment.__table__.insert(), rows)
+                db.commit()
+            except IntegrityError:
+                # Another request stored some of these first; keep whichever rows are new
+                db.rollback()
+                existing = set(self._from_store([row["key"] for row in rows]))
+                fresh = [row for row in rows if row["key"] not in existing]
+                if fresh:
+                    db.execute(TranslationSegment.__table__.insert(), fresh)
+                    db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            latency = dict(self._latency_ms)
+            cached = len(self._cache)
+        segments = counters["segments"]
+        requests = max(counters["requests"], 1)
+        return {
+            **counters,
+            "hit_rate": round((segments - counters["misses"]) / segments, 3) if segments else 0.0,
+            "avg_latency_ms": round(latency["total"] / requests, 3),
+            "avg_backend_ms": round(latency["backend"] / requests, 3),
+            "cached_segments": cached,
+        }
+    
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+translation_memory = TranslationMemory(FakeTranslator())
@@ -0,0 +1,239 @@
+"""
+Streaming hashtag trend detection.
+
+Time is cut into slices (default 10 minutes); a window is the last
+`slices` slices (default 1 hour). Each slice holds a count-min sketch for
+frequency estimates of any tag plus a Space-Saving summary of its heavy
+hitters, so memory is fixed no matter how many distinct tags appear. Only
+two windows of slices are retained: the current one and the previous one
+that growth is measured against.
+
+The current window ends at the clock's slice (or the newest event's, if
+later), so tags age out once events stop. Events stamped more than a slice
+ahead of the clock are dropped: one bad timestamp (milliseconds, say)
+would otherwise move the window past every real event. The top-K list is
+precomputed and only rebuilt when new events arrived and it is older than
+refresh_seconds, when the window moved on, or on an explicit refresh();
+serving it is O(K).
+"""
+
+import heapq
+import re
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.keyword_index import keyword_hits
+
+HASHTAG_PATTERN = re.compile(r"#\w+")
+
+
+class CountMinSketch:
+    """Frequency estimates that never undercount, in width x depth counters"""
+    
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("q", bytes(8 * width)) for _ in range(depth)]
+    
+    def _indexes(self, key: str):
+        # Double hashing: depth indexes from two hashes
+        h1 = hash(key)
+        h2 = hash((key, 0x9E3779B9)) | 1
+        width = self.width
+        return [(h1 + i * h2) % width for i in range(self.depth)]
+    
+    def add(self, key: str, count: int = 1):
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += count
+    
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+
+class SpaceSaving:
+    """Top-`capacity` heavy hitters; a new key replaces the current minimum and inherits its count"""
+    
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.sentiment: Dict[str, float] = {}
+        # Lazy min-heap of (count, key): counts only grow, so stale entries are refreshed on pop
+        self._heap: List[Tuple[int, str]] = []
+    
+    def add(self, key: str, count: int = 1, sentiment: float = 0.0):
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+            self.sentiment[key] += sentiment
+            return
+        if len(counts) < self.capacity:
+            counts[key] = count
+            self.sentiment[key] = sentiment
+            heapq.heappush(self._heap, (count, key))
+            return
+        
+        heap = self._heap
+        while True:
+            min_count, min_key = heap[0]
+            current = counts[min_key]
+            if current == min_count:
+                break
+            heapq.heapreplace(heap, (current, min_key))
+        heapq.heappop(heap)
+        del counts[min_key]
+        del self.sentiment[min_key]
+        counts[key] = min_count + count
+        self.sentiment[key] = sentiment
+        heapq.heappush(heap, (min_count + count, key))
+
+
+class _Slice:
+    __slots__ = ("index", "sketch", "heavy_hitters", "events")
+    
+    def __init__(self, index: int, width: int, depth: int, capacity: int):
+        self.index = index
+        self.sketch = CountMinSketch(width, depth)
+        self.heavy_hitters = SpaceSaving(capacity)
+        self.events = 0
+
+
+class TrendTracker:
+    """Sliding-window hashtag counts with bounded memory and O(K) top-K reads"""
+    
+    def __init__(self, window_seconds: int = 3600, slices: int = 6, top_k: int = 10, capacity: int = 200,
+                 sketch_width: int = 4096, sketch_depth: int = 4, refresh_seconds: float = 5.0,
+                 clock: Callable[[], float] = time.time):
+        self.slice_seconds = window_seconds / slices
+        self.slices_per_window = slices
+        self.top_k = top_k
+        self.capacity = capacity
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self._slices: Dict[int, _Slice] = {}
+        self._latest_index: Optional[int] = None
+        self._top: List[Dict[str, Any]] = []
+        self._refreshed_at = 0.0
+        # Slice the precomputed list's window ends at
+        self._refreshed_index: Optional[int] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.events = 0
+    
+    def _slice(self, index: int) -> Optional[_Slice]:
+        if self._latest_index is None or index > self._latest_index:
+            self._latest_index = index
+            oldest = index - 2 * self.slices_per_window + 1
+            for stale in [i for i in self._slices if i < oldest]:
+                del self._slices[stale]
+            self._slices[index] = _Slice(index, self.sketch_width, self.sketch_depth, self.capacity)
+            self._dirty = True
+            self._refreshed_at = 0.0
+        elif index <= self._latest_index - 2 * self.slices_per_window:
+            return None  # older than anything retained
+        elif index not in self._slices:
+            self._slices[index] = _Slice(index, self.sketch_width, self.sketch_depth, self.capacity)
+        return self._slices[index]
+    
+    def record(self, tag: str, timestamp: Optional[float] = None, sentiment: float = 0.0, count: int = 1) -> bool:
+        """Count one hashtag occurrence; sentiment is -1..1. Returns False if the timestamp is in the future"""
+        tag = tag.lower()
+        if not self.accepts(timestamp):
+            return False
+        index = int((self.clock() if timestamp is None else timestamp) // self.slice_seconds)
+        with self._lock:
+            current = self._slice(index)
+            if current is None:
+                return True  # older than the retained windows; nothing left to count it in
+            current.sketch.add(tag, count)
+            current.heavy_hitters.add(tag, count, sentiment * count)
+            current.events += count
+            self.events += count
+            self._dirty = True
+        return True
+    
+    def accepts(self, timestamp: Optional[float]) -> bool:
+        """Whether record() would take an event at this timestamp rather than drop it as from the future"""
+        return timestamp is None or timestamp <= self.clock() + self.slice_seconds
+    
+    def record_post(self, text: str, timestamp: Optional[float] = None) -> bool:
+        """Count every hashtag in a post, tagged with the post's keyword sentiment"""
+        if not self.accepts(timestamp):
+            return False
+        # Case folded before deduplicating, so "#AI #ai" counts once
+        tags = {tag.lower() for tag in HASHTAG_PATTERN.findall(text)}
+        if not tags:
+            return True
+        hits = keyword_hits(text)
+        sentiment = (hits["positive"] > hits["negative"]) - (hits["negative"] > hits["positive"])
+        for tag in tags:
+            self.record(tag, timestamp, sentiment)
+        return True
+    
+    def _window_index(self) -> int:
+        """Slice the current window ends at"""
+        index = int(self.clock() // self.slice_seconds)
+        return index if self._latest_index is None else max(index, self._latest_index)
+    
+    def refresh(self):
+        """Recompute the top-K list for the current window"""
+        with self._lock:
+            latest = self._window_index()
+            oldest = latest - 2 * self.slices_per_window + 1
+            for stale in [i for i in self._slices if i < oldest]:
+                del self._slices[stale]
+            current = [s for i, s in self._slices.items() if i > latest - self.slices_per_window]
+            previous = [s for i, s in self._slices.items() if i <= latest - self.slices_per_window]
+            
+            candidates = set()
+            for current_slice in current:
+                candidates.update(current_slice.heavy_hitters.counts)
+            
+            scored = []
+            for tag in candidates:
+                volume = sum(s.sketch.estimate(tag) for s in current)
+                scored.append((volume, tag))
+            top = heapq.nlargest(self.top_k, scored)
+            
+            self._top = []
+            for volume, tag in top:
+                previous_volume = sum(s.sketch.estimate(tag) for s in previous)
+                sentiment_sum = sum(s.heavy_hitters.sentiment.get(tag, 0.0) for s in current)
+                self._top.append({
+                    "tag": tag,
+                    "volume": volume,
+                    "growth": format_growth(volume, previous_volume),
+                    "sentiment": sentiment_label(sentiment_sum / volume if volume else 0.0),
+                })
+            self._dirty = False
+            self._refreshed_at = self.clock()
+            self._refreshed_index = latest
+    
+    def top(self, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Precomputed top-K; refreshed first if the window moved on, or new events arrived and it is stale"""
+        if self._window_index() != self._refreshed_index or (
+                self._dirty and self.clock() - self._refreshed_at >= self.refresh_seconds):
+            self.refresh()
+        return self._top[:k or self.top_k]
+
+
+def format_growth(current: int, previous: int) -> str:
+    if previous == 0:
+        return "new"
+    return f"{(current - previous) / previous * 100:+.0f}%"
+
+
+def sentiment_label(score: float) -> str:
+    if score > 0.2:
+        return "positive"
+    if score < -0.2:
+        return "negative"
+    if score != 0:
+        return "mixed"
+    return "neutral"
+
+
+trend_tracker = TrendTracker()
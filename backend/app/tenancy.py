@@ -0,0 +1,81 @@
+"""
+Tenants: the client workspaces sharing one deployment.
+
+A request's tenant is resolved once by routes.auth.current_tenant and kept
+in a context variable for the rest of the request (threadpool calls and
+tasks it starts inherit it). Data is partitioned by the posts' account:
+a tenant's posts, schedule, insights and engagement events are those of
+the account named after it, whatever account a request body names.
+
+Executor calls (app/executor.py) are queued per tenant and granted by fair
+share, within each tenant's quota:
+    
+    TENANT_API_KEYS          "key:tenant,key:tenant"; when set, every request needs
+                             Authorization: Bearer <key> and the key decides the tenant
+                             (otherwise the X-Tenant header does, default "default")
+    TENANT_MAX_CONCURRENCY   executor calls one tenant may run at once (default: half the workers, at least 1)
+    TENANT_MAX_QUEUE         requests one tenant may have waiting on the executor before a 429 (default: 16)
+    TENANT_CPU_QUOTA         executor seconds per second one tenant may use on average, 0 for none (default: 0)
+    TENANT_QUOTAS            JSON overrides per tenant, e.g. {"acme": {"weight": 2, "max_concurrency": 4}}
+"""
+
+import contextvars
+import json
+import os
+import re
+from typing import Dict, NamedTuple, Optional
+
+DEFAULT_TENANT = "default"
+# Tenant names become account names and directory names
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,99}$")
+# Seconds of TENANT_CPU_QUOTA a tenant can save up and spend at once
+CPU_QUOTA_BURST_SECONDS = 10
+
+
+class TenantQuota(NamedTuple):
+    # Share of contended executor time relative to other tenants
+    weight: float = 1.0
+    max_concurrency: int = 1
+    max_queue: int = 16
+    # Executor seconds per second; 0 is unlimited
+    cpu_quota: float = 0.0
+
+
+def parse_api_keys(value: str) -> Dict[str, str]:
+    """API key -> tenant from "key:tenant,key:tenant\""""
+    keys = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        key, _, tenant = entry.strip().partition(":")
+        if not key or not TENANT_PATTERN.match(tenant):
+            raise ValueError(f"Invalid TENANT_API_KEYS entry: {entry.strip()!r}")
+        keys[key] = tenant
+    return keys
+
+
+def default_quota(workers: Optional[int] = None) -> TenantQuota:
+    workers = workers or os.cpu_count() or 1
+    return TenantQuota(
+        max_concurrency=int(os.getenv("TENANT_MAX_CONCURRENCY", "0")) or max(1, workers // 2),
+        max_queue=int(os.getenv("TENANT_MAX_QUEUE", "16")),
+        cpu_quota=float(os.getenv("TENANT_CPU_QUOTA", "0")),
+    )
+
+
+def load_quotas(value: str, default: TenantQuota) -> Dict[str, TenantQuota]:
+    """Per-tenant overrides of the default quota from TENANT_QUOTAS"""
+    return {tenant: default._replace(**overrides) for tenant, overrides in json.loads(value or "{}").items()}
+
+
+TENANT_API_KEYS = parse_api_keys(os.getenv("TENANT_API_KEYS", ""))
+
+_current_tenant: contextvars.ContextVar[str] = contextvars.ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+
+def get_tenant() -> str:
+    return _current_tenant.get()
+
+
+def set_tenant(tenant: str) -> contextvars.Token:
+    return _current_tenant.set(tenant)
@@ -0,0 +1,25 @@
+"""
+Streamed request bodies.
+
+Large uploads (comment streams, schedule imports) are copied to a spooled
+temp file as they arrive: kept in memory up to SPOOL_MAX_MEMORY_BYTES,
+then on disk, so a handler can parse them line by line without holding
+the whole body.
+"""
+
+import tempfile
+from typing import IO
+
+from fastapi import Request
+
+# Request bodies above this size are spooled to disk instead of memory
+SPOOL_MAX_MEMORY_BYTES = 8 * 1024 * 1024
+
+
+async def spool_request_body(request: Request) -> IO[bytes]:
+    """Copy the request body to a spooled temp file (memory up to a limit, then disk)"""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY_BYTES)
+    async for data in request.stream():
+        body.write(data)
+    body.seek(0)
+    return body
@@ -0,0 +1,65 @@
+"""
+Startup warmup.
+
+Heavy dependencies are imported lazily so short-lived processes (CLI,
+workers, tests) never pay for them. A serving pod can instead pay once at
+startup: with WARMUP_ON_STARTUP=1 the lifespan runs warmup() before the
+app accepts traffic, and GET /ready reports 503 until it has finished.
+"""
+
+import importlib
+import logging
+import os
+import time
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+
+# Modules that are imported lazily on first use
+LAZY_MODULES = ["numpy", "pandas"]
+
+
+def _exercise_batch_prediction():
+    from app.services.ai_services import predict_engagement_batch
+    predict_engagement_batch([{"content": "Warmup #post?", "platform": "twitter", "content_type": "text"}])
+
+
+def _exercise_insights():
+    from app.services.analytics import extract_insights
+    extract_insights([{"hour": 9, "engagement": 1, "content_type": "text"}])
+
+
+def _load_engagement_model():
+    from app.services.model_registry import get_engagement_model
+    get_engagement_model()
+
+
+def _start_executor():
+    from app.executor import cpu_executor
+    cpu_executor.pool.submit(int).result()
+
+
+# Code paths to run once so first requests don't pay for lazy initialization
+WARMUP_STEPS: List[Callable[[], None]] = [
+    _load_engagement_model,
+    _exercise_batch_prediction,
+    _exercise_insights,
+    _start_executor,
+]
+
+
+def warmup() -> Dict[str, float]:
+    """Import lazy modules and run the warmup steps; returns seconds spent per step"""
+    timings = {}
+    for module in LAZY_MODULES:
+        started = time.perf_counter()
+        importlib.import_module(module)
+        timings[f"import {module}"] = time.perf_counter() - started
+    for step in WARMUP_STEPS:
+        started = time.perf_counter()
+        step()
+        timings[step.__name__.lstrip("_")] = time.perf_counter() - started
+    logger.info("Warmup finished in %.2fs", sum(timings.values()))
+    return timings
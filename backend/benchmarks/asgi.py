@@ -0,0 +1,37 @@
+"""
+Minimal ASGI driver shared by the in-process benchmarks.
+
+Requests go straight to the app callable: no server, socket or HTTP client,
+so what is measured is the app itself.
+"""
+
+from typing import Any, Callable, Sequence, Tuple
+
+
+async def request(app: Callable, method: str, path: str, body: bytes = b"", query: bytes = b"",
+                  content_type: bytes = b"application/json",
+                  headers: Sequence[Tuple[bytes, bytes]] = ()) -> Tuple[int, bytes]:
+    """Send one request; returns (status, response body)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query,
+        "headers": [(b"host", b"bench"), (b"content-type", content_type), (b"content-length", str(len(body)).encode()),
+                    *headers],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = 0
+    chunks = []
+
+    async def receive() -> Any:
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message: Any):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
@@ -0,0 +1,197 @@
+"""
+Benchmark: max RPS and tail latency under many concurrent clients
+
+Two tests per route, with the app driven in-process as in bench_load:
+
+    burst    --clients requests at once right after the data changed (a
+             cleared cache, a newly recorded post), as when every open
+             dashboard polls just after an update; reports how long the
+             burst took and how many times the work behind the route ran
+             (trends, audience segments, insights)
+    steady   --clients closed-loop clients sending back to back for
+             --duration seconds; throughput is the max RPS at that
+             concurrency, latencies are per request
+
+--ref runs the same benchmark against another git revision (checked out in
+a temporary worktree, same machine, same settings) and prints both:
+
+    python -m benchmarks.bench_concurrency --clients 200 --ref HEAD~1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.asgi import request
+from benchmarks.bench_load import PAYLOADS, configure_environment, encode, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ROUTES = [
+    "GET /ai/trends",
+    "GET /insights/",
+    "GET /ai/audience-segments",
+    "GET /schedule/",
+    "POST /ai/predict-engagement",
+]
+# Not covered by bench_load
+EXTRA_PAYLOADS = {"GET /posts/": lambda i: None}
+WARMUP_REQUESTS = 3
+
+
+def count_calls(owner: Any, name: str) -> Callable[[], int]:
+    """Wrap owner.name to count its calls; returns a function reading the count"""
+    original = getattr(owner, name)
+    calls = [0]
+
+    def counted(*args, **kwargs):
+        calls[0] += 1
+        return original(*args, **kwargs)
+
+    setattr(owner, name, counted)
+    return lambda: calls[0]
+
+
+async def send(app, name: str, i: int) -> int:
+    method, path = name.split(" ", 1)
+    body, content_type = encode({**PAYLOADS, **EXTRA_PAYLOADS}[name](i))
+    status, _ = await request(app, method, path, body, content_type=content_type)
+    return status
+
+
+async def burst(app, name: str, clients: int, computations: Callable[[], int]) -> Dict[str, Any]:
+    from app.cache import response_cache
+    from app.services.analytics import insights_aggregator
+
+    response_cache.clear()
+    insights_aggregator.record(18, "video", 200.0)
+    before = computations()
+    started = time.perf_counter()
+    statuses = await asyncio.gather(*(send(app, name, i) for i in range(clients)))
+    return {
+        "burst_ms": (time.perf_counter() - started) * 1000,
+        "computations": computations() - before,
+        "errors": sum(status >= 400 for status in statuses),
+    }
+
+
+async def steady(app, name: str, clients: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(first: int):
+        nonlocal errors
+        i = first
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = await send(app, name, i)
+            latencies.append(time.perf_counter() - started)
+            errors += status >= 400
+            i += clients
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": len(ordered) / elapsed,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def run_async(app, routes: List[str], clients: int, duration: float) -> Dict[str, Dict[str, Any]]:
+    from app.routes import ai
+    from app.services.analytics import insights_aggregator
+
+    # The work behind the burst routes, counted the same way in any revision
+    counters = {
+        "GET /ai/trends": count_calls(ai, "detect_trends"),
+        "GET /ai/audience-segments": count_calls(ai, "segment_audience"),
+        "GET /insights/": count_calls(insights_aggregator, "best_posting_hour"),
+    }
+    results = {}
+    async with app.router.lifespan_context(app):
+        for name in routes:
+            for i in range(WARMUP_REQUESTS):
+                await send(app, name, -1 - i)
+            results[name] = {}
+            if name in counters:
+                results[name].update(await burst(app, name, clients, counters[name]))
+            results[name].update(await steady(app, name, clients, duration))
+    return results
+
+
+def run(routes: List[str], clients: int, duration: float) -> Dict[str, Dict[str, Any]]:
+    with tempfile.TemporaryDirectory(prefix="bench-concurrency-") as directory:
+        configure_environment(directory)
+        from app.main import app
+
+        return asyncio.run(run_async(app, routes, clients, duration))
+
+
+def run_at_ref(ref: str, args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """This benchmark, in a separate process, against the app as of another revision"""
+    root = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=BACKEND_DIR, check=True,
+                          capture_output=True, text=True).stdout.strip()
+    with tempfile.TemporaryDirectory(prefix="bench-ref-") as directory:
+        worktree = os.path.join(directory, "tree")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, ref], cwd=root, check=True,
+                       capture_output=True)
+        try:
+            backend = os.path.join(worktree, os.path.relpath(BACKEND_DIR, root))
+            command = [sys.executable, os.path.abspath(__file__), "--json", "--clients", str(args.clients),
+                       "--duration", str(args.duration)]
+            for name in args.route or []:
+                command += ["--route", name]
+            output = subprocess.run(command, cwd=backend, env={**os.environ, "PYTHONPATH": backend},
+                                    check=True, capture_output=True, text=True).stdout
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=root, capture_output=True)
+    return json.loads(output)
+
+
+def print_table(results: Dict[str, Dict[str, Any]], before: Optional[Dict[str, Dict[str, Any]]], ref: str):
+    metrics = ["burst_ms", "computations", "throughput_rps", "p50_ms", "p99_ms", "errors"]
+    for name, current in results.items():
+        print(name)
+        for metric in metrics:
+            if metric not in current:
+                continue
+            line = f"  {metric:<16}{current[metric]:>12,.1f}"
+            previous = (before or {}).get(name, {}).get(metric)
+            if previous is not None:
+                line += f"   {ref}: {previous:,.1f}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--route", action="append", help='"METHOD path", repeatable (default: dashboard reads)')
+    parser.add_argument("--ref", help="also run against this git revision, e.g. HEAD~1")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    # The other revision first, while this process has not imported the app
+    before = run_at_ref(args.ref, args) if args.ref else None
+    results = run(args.route or DEFAULT_ROUTES, args.clients, args.duration)
+    if args.json:
+        print(json.dumps(results if before is None else {"current": results, args.ref: before}, indent=2))
+    else:
+        print_table(results, before, args.ref)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: duplicate checks with the Bloom filter vs an indexed lookup per post
+
+Stores --fingerprints post fingerprints in a throwaway SQLite file, times
+loading them into the filter (what startup pays, up to DEDUP_LOAD_BUDGET),
+then times FingerprintIndex.find for new posts and for duplicates, with the
+filter complete and with it still loading (every check goes to the table).
+
+    python -m benchmarks.bench_dedup --fingerprints 1000000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engine
+from app.models import PostFingerprint
+from app.services.dedup import FingerprintIndex, content_fingerprint
+
+
+def timed_us(fn, keys, repeat=3):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for key in keys:
+            fn([key])
+        samples.append((time.perf_counter() - started) / len(keys) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fingerprints", type=int, default=1000000)
+    parser.add_argument("--checks", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        stored = [content_fingerprint(f"acct{i % 1000}", "twitter", f"Post number {i}") for i in range(args.fingerprints)]
+        with Session() as db:
+            for start in range(0, len(stored), 50000):
+                db.execute(PostFingerprint.__table__.insert(),
+                           [{"key": key, "post_id": i} for i, key in enumerate(stored[start:start + 50000], start)])
+            db.commit()
+
+        index = FingerprintIndex(capacity=max(args.fingerprints, 1), session_factory=Session)
+        started = time.perf_counter()
+        index.load(budget=float("inf"))
+        load_elapsed = time.perf_counter() - started
+
+        fresh = [content_fingerprint("acct1", "twitter", f"New post {i}") for i in range(args.checks)]
+        duplicates = stored[::max(1, len(stored) // args.checks)][:args.checks]
+        with Session() as db:
+            def find(keys):
+                return index.find(db, keys)
+
+            new_filtered = timed_us(find, fresh)
+            duplicate_filtered = timed_us(find, duplicates)
+            index.complete = False
+            new_lookup = timed_us(find, fresh)
+            index.complete = True
+            stats = index.stats()
+
+        print(f"fingerprints:          {args.fingerprints:,}")
+        print(f"load into filter:      {load_elapsed:.2f} s ({args.fingerprints / load_elapsed:,.0f} keys/sec)")
+        print(f"new post, filter:      {new_filtered:.1f} us")
+        print(f"new post, lookup:      {new_lookup:.1f} us")
+        print(f"duplicate (lookup):    {duplicate_filtered:.1f} us")
+        print(f"lookups skipped:       {stats['skipped_lookups']:,} of {stats['checks']:,} checks")
+        print(f"filter size:           {stats['bloom_bytes'] / 2 ** 20:.1f} MB")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
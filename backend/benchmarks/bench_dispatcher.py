@@ -0,0 +1,110 @@
+"""
+Benchmark: publishing dispatcher jitter and throughput
+
+Schedules --posts posts uniformly over --hours of clock time, then runs
+the dispatcher against a fake publisher on a clock that runs
+--time-scale times faster than real time. Jitter is publish time minus
+scheduled_time, in clock seconds.
+
+    python -m benchmarks.bench_dispatcher --posts 100000 --hours 1 --time-scale 30
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engine
+from app.models import Post
+from app.services.post_store import bulk_insert_posts
+from worker.dispatcher import PublishDispatcher
+
+PLATFORMS = ["twitter", "instagram", "facebook", "linkedin"]
+
+
+class ScaledClock:
+    def __init__(self, start: datetime, scale: float):
+        self.start = start
+        self.scale = scale
+        self.real_start = time.perf_counter()
+
+    def __call__(self) -> datetime:
+        return self.start + timedelta(seconds=(time.perf_counter() - self.real_start) * self.scale)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--time-scale", type=float, default=30.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="fake publish latency, clock ms")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+        start = datetime(2026, 1, 1)
+        span = args.hours * 3600
+        rng = random.Random(3)
+        with session_factory() as db:
+            bulk_insert_posts(db, [
+                {
+                    "content": f"post {i}",
+                    "platform": rng.choice(PLATFORMS),
+                    "status": "scheduled",
+                    "scheduled_time": start + timedelta(seconds=rng.uniform(0, span)),
+                }
+                for i in range(args.posts)
+            ])
+
+        clock = ScaledClock(start, args.time_scale)
+        jitter = []
+        lock = threading.Lock()
+
+        def fake_publish(post):
+            time.sleep(args.latency_ms / 1000 / args.time_scale)
+            delay = (clock() - datetime.fromisoformat(post["scheduled_time"])).total_seconds()
+            with lock:
+                jitter.append(delay)
+
+        dispatcher = PublishDispatcher(
+            publish=fake_publish,
+            session_factory=session_factory,
+            clock=clock,
+            time_scale=args.time_scale,
+        )
+        thread = dispatcher.start()
+        while clock() < start + timedelta(seconds=span + 60):
+            time.sleep(0.5)
+        dispatcher.stop()
+        thread.join()
+        real_elapsed = time.perf_counter() - clock.real_start
+
+        with session_factory() as db:
+            published = db.scalar(select(func.count()).where(Post.status == "published"))
+
+        print(f"posts scheduled:     {args.posts:,} over {args.hours:g}h ({args.posts / args.hours:,.0f}/h)")
+        print(f"posts published:     {published:,} ({dispatcher.stats})")
+        print(f"real time:           {real_elapsed:.1f}s at {args.time_scale:g}x")
+        print(f"throughput:          {published / real_elapsed:,.0f} posts/real second")
+        print(f"jitter p50:          {percentile(jitter, 50):.3f}s")
+        print(f"jitter p99:          {percentile(jitter, 99):.3f}s")
+        print(f"jitter max:          {max(jitter):.3f}s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
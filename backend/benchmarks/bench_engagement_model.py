@@ -0,0 +1,100 @@
+"""
+Benchmark: train engagement models from post history and time inference
+
+Fills a throwaway SQLite file with --history published posts whose
+engagement follows a hidden rule plus noise, trains both model kinds
+through the same path as the training CLI, saves them, and times
+predict_engagement (per-post latency) and predict_engagement_batch
+(throughput) with each model loaded from its memory-mapped weights.
+
+    python -m benchmarks.bench_engagement_model --history 200000 --posts 100000
+"""
+
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engine
+from app.services import model_registry
+from app.services.ai_services import predict_engagement, predict_engagement_batch
+from app.services.engagement_model import load_post_history, save_engagement_model, train_engagement_model
+from app.services.post_store import bulk_insert_posts
+from benchmarks.bench_predict_engagement import make_requests
+
+PLATFORM_REACH = {"twitter": 2000, "instagram": 5000, "facebook": 3000, "linkedin": 1500}
+TYPE_LIFT = {"text": 1.0, "image": 1.4, "video": 1.8}
+
+
+def synthetic_history(count: int, seed: int = 3):
+    rng = random.Random(seed)
+    rows = []
+    for request in make_requests(count, seed):
+        content = request["content"]
+        reach = PLATFORM_REACH[request["platform"]] * math.exp(rng.gauss(0, 0.5))
+        rate = 0.02 * TYPE_LIFT[request["content_type"]]
+        rate *= 1.3 if "#" in content else 1.0
+        rate *= 1.4 if "?" in content else 1.0
+        rate *= 0.7 if len(content) < 50 else 1.0
+        engagements = reach * rate * math.exp(rng.gauss(0, 0.3))
+        rows.append({
+            **request,
+            "status": "published",
+            "impressions": int(reach),
+            "likes": int(engagements * 0.8),
+            "comments": int(engagements * 0.12),
+            "shares": int(engagements * 0.08),
+        })
+    return rows
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--history", type=int, default=200000)
+    parser.add_argument("--posts", type=int, default=100000)
+    args = parser.parse_args()
+
+    requests = make_requests(args.posts, seed=99)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'history.db')}")
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            bulk_insert_posts(db, synthetic_history(args.history))
+            started = time.perf_counter()
+            history = load_post_history(db)
+        print(f"history:  {args.history:,} posts loaded in {time.perf_counter() - started:.2f}s")
+
+        for kind in ("linear", "gbm"):
+            model = train_engagement_model(history["matrix"], history["targets"], kind)
+            path = os.path.join(tmp, kind)
+            save_engagement_model(model, path)
+            model_registry.ENGAGEMENT_MODEL_PATH = path
+            model_registry.reload_engagement_model()
+
+            latencies = []
+            for request in requests[:5000]:
+                started = time.perf_counter()
+                predict_engagement(request["content"], request["platform"], request["content_type"])
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            predict_engagement_batch(requests)
+            batch_seconds = time.perf_counter() - started
+
+            print(f"{kind}:")
+            print(f"  trained in {model.meta['training_seconds']}s, validation R^2 {model.meta['validation_r2']}")
+            print(f"  single post: p50 {percentile(latencies, 0.5):.3f} ms, p99 {percentile(latencies, 0.99):.3f} ms")
+            print(f"  batch of {args.posts:,}: {args.posts / batch_seconds:,.0f} posts/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: insights over the memory-mapped engagement history
+
+Fills a throwaway EngagementStore with --rows rows, then times
+extract_insights on it (best of --repeats) and reports how much the
+process grew while it ran: resident memory after the scan and the peak
+during it (Linux; the peak needs /proc/self/clear_refs). For comparison,
+--check-rows posts as a list of dicts are measured for memory and time
+with the pandas path, and both paths must agree on those posts.
+
+    python -m benchmarks.bench_engagement_store --rows 10000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.analytics import extract_insights
+from app.services.engagement_store import EngagementStore
+from benchmarks.bench_insights import CONTENT_TYPES, PLATFORMS, make_posts
+from benchmarks.bench_load import rss_mb
+
+BATCH_ROWS = 1000000
+
+
+def peak_rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return rss_mb()
+
+
+def reset_peak() -> bool:
+    """Restart VmHWM from the current RSS; False where that is not supported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def fill(store: EngagementStore, rows: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    content_types, platforms = np.array(CONTENT_TYPES), np.array(PLATFORMS)
+    for start in range(0, rows, BATCH_ROWS):
+        n = min(BATCH_ROWS, rows - start)
+        store.append(
+            rng.integers(0, 24, n),
+            content_types[rng.integers(0, len(CONTENT_TYPES), n)],
+            platforms[rng.integers(0, len(PLATFORMS), n)],
+            rng.integers(0, 5000, n).astype(np.float64),
+            1700000000 + np.arange(start, start + n) * 10,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--check-rows", type=int, default=1000000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-engagement-") as directory:
+        posts = make_posts(args.check_rows)
+        check_store = EngagementStore(os.path.join(directory, "check"))
+        check_store.append_posts(posts)
+        expected = extract_insights(posts)
+        actual = extract_insights(check_store)
+        if {key: actual[key] for key in expected} != expected:
+            raise SystemExit(f"Store and pandas disagree: {actual} != {expected}")
+        started = time.perf_counter()
+        extract_insights(posts)
+        pandas_ms = (time.perf_counter() - started) * 1000
+        del posts
+
+        store = EngagementStore(os.path.join(directory, "history"))
+        started = time.perf_counter()
+        fill(store, args.rows)
+        fill_s = time.perf_counter() - started
+
+        before = rss_mb()
+        has_peak = reset_peak()
+        times = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            result = extract_insights(store)
+            times.append(time.perf_counter() - started)
+        growth = rss_mb() - before
+        peak_growth = peak_rss_mb() - before
+
+        # A list of dicts of the same size, extrapolated from one of check-rows posts
+        before_list = rss_mb()
+        posts = make_posts(args.check_rows)
+        list_mb = (rss_mb() - before_list) * args.rows / args.check_rows
+        del posts
+
+    print(f"rows:                  {args.rows:,} ({fill_s:.1f} s to append)")
+    print(f"extract_insights:      {min(times) * 1000:.0f} ms ({result})")
+    print(f"RSS growth:            {growth:+.1f} MB after, "
+          + (f"{peak_growth:+.1f} MB peak" if has_peak else "peak not measurable here"))
+    print(f"pandas path:           {pandas_ms:.0f} ms for {args.check_rows:,} posts as dicts")
+    print(f"as a list of dicts:    ~{list_mb:,.0f} MB for {args.rows:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Load test: light-endpoint latency while heavy AI batches run
+
+Keeps --heavy concurrent /ai/analyze-sentiment requests of --comments
+comments each in flight and measures /ai/trends latency meanwhile.
+Run once per executor kind and compare:
+
+    AI_EXECUTOR=thread  python -m benchmarks.bench_executor
+    AI_EXECUTOR=process python -m benchmarks.bench_executor
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.executor import cpu_executor
+from app.main import app
+
+COMMENTS = ["Love this content! So helpful", "Meh, nothing new here", "Shared with my team!"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def heavy_worker(client, comments, stop, completed):
+    while not stop.is_set():
+        response = await client.post("/ai/analyze-sentiment", json={"comments": comments})
+        if response.status_code == 200:
+            completed.append(1)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--heavy", type=int, default=4)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    comments = (COMMENTS * (args.comments // len(COMMENTS) + 1))[:args.comments]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm the pool so worker start-up is not counted
+        await client.post("/ai/analyze-sentiment", json={"comments": comments[:10]})
+
+        stop = asyncio.Event()
+        completed = []
+        heavy = [asyncio.create_task(heavy_worker(client, comments, stop, completed)) for _ in range(args.heavy)]
+
+        latencies = []
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await client.get("/ai/trends")
+            latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.01)
+
+        stop.set()
+        await asyncio.gather(*heavy)
+
+    cpu_executor.shutdown()
+    print(f"executor:             {cpu_executor.kind} ({cpu_executor.workers} workers)")
+    print(f"heavy requests done:  {len(completed)} in {args.duration:.0f}s")
+    print(f"/ai/trends requests:  {len(latencies)}")
+    print(f"/ai/trends p50:       {statistics.median(latencies):.1f} ms")
+    print(f"/ai/trends p99:       {percentile(latencies, 99):.1f} ms")
+    print(f"/ai/trends max:       {max(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Benchmark: cold-start import time
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+reports the slowest imports by cumulative time. With --budget-ms the
+script exits non-zero when the total exceeds the budget, so CI can catch
+cold-start regressions.
+
+    python -m benchmarks.bench_import_time app.main --budget-ms 1500
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module: str):
+    """(self_us, cumulative_us, depth, name) for every module imported"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=["app.main"])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    over_budget = False
+    for module in args.modules:
+        rows = import_times(module)
+        total_ms = next(cumulative for _, cumulative, _, name in rows if name == module) / 1000
+        print(f"{module}: {total_ms:.0f} ms total, {len(rows)} modules")
+        print(f"  {'cumulative ms':>13} {'self ms':>8}  module")
+        for self_us, cumulative_us, depth, name in sorted(rows, key=lambda r: -r[1])[:args.top]:
+            print(f"  {cumulative_us / 1000:13.1f} {self_us / 1000:8.1f}  {name}")
+        lazy = [name for name in ("pandas", "numpy") if any(row[3] == name for row in rows)]
+        print(f"  eagerly imported heavy modules: {', '.join(lazy) or 'none'}")
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            print(f"  OVER BUDGET: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+            over_budget = True
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Benchmark: replaying an engagement event stream into POST /insights/events
+
+Creates --posts posts in a throwaway database, then replays a stream of
+events through the app in-process (as in bench_load): webhook deltas (a
+like, comment or share; now and then a like withdrawn) on posts picked
+with a skewed popularity, and every --poll-every events a poll total of a
+post. --senders clients post --request-size events per request back to
+back; a 503 (buffer full) is retried after a short pause, so the replay
+runs at whatever rate back-pressure allows. The clock stops when the last
+event is written to the database.
+
+Retried requests land after ones sent later, so the events are checked in
+the order the pipeline accepted them, which is what decides which poll
+total a later delta adds to.
+
+Reports the sustained events/sec, request latencies, rejected requests,
+batches written and how many events each row write absorbed, then checks
+every post's counts against the events applied one at a time.
+
+    python -m benchmarks.bench_ingest --events 1000000
+    python -m benchmarks.bench_ingest --write events.ndjson   # also save the stream
+    python -m benchmarks.bench_ingest --file events.ndjson    # replay a recorded stream
+
+--direct submits to the pipeline without HTTP, to separate its cost from
+request parsing.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app.tenancy import DEFAULT_TENANT
+from benchmarks.asgi import request
+from benchmarks.bench_load import configure_environment, percentile
+
+RETRY_PAUSE = 0.02
+# Likes are only withdrawn above this many, so requests landing out of order never take a count below zero
+UNLIKE_MIN_LIKES = 100
+
+
+def make_events(count: int, posts: int, poll_every: int, seed: int = 11) -> List[Dict[str, Any]]:
+    """A stream a platform could send"""
+    rng = random.Random(seed)
+    # Post ids start at 1; a few posts get most of the engagement
+    weights = [1 / (rank + 1) for rank in range(posts)]
+    picks = rng.choices(range(1, posts + 1), weights=weights, k=count)
+    likes = [0] * (posts + 1)
+    events = []
+    for n, post_id in enumerate(picks):
+        if poll_every and n % poll_every == poll_every - 1:
+            # The platform's count, a little ahead of what the webhooks delivered
+            likes[post_id] += rng.randrange(3)
+            events.append({"post_id": post_id, "kind": "total", "likes": likes[post_id]})
+            continue
+        roll = rng.random()
+        if roll < 0.05 and likes[post_id] > UNLIKE_MIN_LIKES:
+            likes[post_id] -= 1
+            events.append({"post_id": post_id, "likes": -1})
+        elif roll < 0.75:
+            likes[post_id] += 1
+            events.append({"post_id": post_id, "likes": 1})
+        elif roll < 0.92:
+            events.append({"post_id": post_id, "comments": 1})
+        else:
+            events.append({"post_id": post_id, "shares": 1})
+    return events
+
+
+def as_tuple(event: Dict[str, Any]) -> tuple:
+    """The pipeline's form of an event, sent by the default tenant as the HTTP replay is"""
+    return (DEFAULT_TENANT, event["post_id"], event.get("kind") == "total", event.get("likes"), event.get("comments"),
+            event.get("shares"))
+
+
+def expected_counts(accepted: List[tuple]) -> Dict[int, List[int]]:
+    """post_id -> [likes, comments, shares], applying events one at a time"""
+    counts: Dict[int, List[int]] = {}
+    for _tenant, post_id, is_total, *values in accepted:
+        entry = counts.setdefault(post_id, [0, 0, 0])
+        for index, value in enumerate(values):
+            if value is None:
+                continue
+            entry[index] = value if is_total else max(entry[index] + value, 0)
+    return counts
+
+
+def record_accepted(pipeline) -> List[tuple]:
+    """Wrap pipeline.submit to keep the events it accepts, in order"""
+    accepted: List[tuple] = []
+    original = pipeline.submit
+
+    def submit(events, *args, **kwargs):
+        count = original(events, *args, **kwargs)
+        accepted.extend(events)
+        return count
+
+    pipeline.submit = submit
+    return accepted
+
+
+def create_posts(count: int):
+    from app.database import SessionLocal, init_db
+    from app.services.post_store import bulk_insert_posts
+
+    init_db()
+    with SessionLocal() as db:
+        bulk_insert_posts(db, [
+            {"content": f"Replay post {n}", "platform": ("twitter", "instagram", "linkedin")[n % 3],
+             "content_type": ("text", "image", "video")[n % 3], "account": DEFAULT_TENANT}
+            for n in range(count)
+        ])
+
+
+async def replay_http(app, bodies: List[bytes], senders: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    rejected = 0
+    next_body = 0
+
+    async def sender():
+        nonlocal rejected, next_body
+        while next_body < len(bodies):
+            body = bodies[next_body]
+            next_body += 1
+            while True:
+                started = time.perf_counter()
+                status, _ = await request(app, "POST", "/insights/events", body)
+                latencies.append(time.perf_counter() - started)
+                if status == 202:
+                    break
+                if status != 503:
+                    raise SystemExit(f"POST /insights/events answered {status}")
+                rejected += 1
+                await asyncio.sleep(RETRY_PAUSE)
+
+    await asyncio.gather(*(sender() for _ in range(senders)))
+    ordered = sorted(latencies)
+    return {"requests": len(ordered), "rejected": rejected,
+            "p50_ms": percentile(ordered, 0.50) * 1000, "p99_ms": percentile(ordered, 0.99) * 1000}
+
+
+async def replay_direct(chunks: List[List[tuple]]) -> Dict[str, Any]:
+    from app.services.ingestion import IngestQueueFull, engagement_pipeline
+
+    rejected = 0
+    for chunk in chunks:
+        while True:
+            try:
+                engagement_pipeline.submit(chunk)
+                break
+            except IngestQueueFull:
+                rejected += 1
+                await asyncio.sleep(RETRY_PAUSE)
+        # Let the flusher thread have the GIL as it would between requests
+        await asyncio.sleep(0)
+    return {"requests": len(chunks), "rejected": rejected}
+
+
+async def run(app, events: List[Dict[str, Any]], args: argparse.Namespace) -> Dict[str, Any]:
+    from app.services.ingestion import engagement_pipeline
+
+    size = args.request_size
+    if args.direct:
+        tuples = [as_tuple(event) for event in events]
+        work = [tuples[start:start + size] for start in range(0, len(tuples), size)]
+    else:
+        work = [json.dumps(events[start:start + size]).encode() for start in range(0, len(events), size)]
+
+    accepted = record_accepted(engagement_pipeline)
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        result = await (replay_direct(work) if args.direct else replay_http(app, work, args.senders))
+        sent = time.perf_counter() - started
+        # Written: nothing buffered and the last batch committed
+        while engagement_pipeline.stats()["buffered"] or engagement_pipeline.flush():
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        stats = engagement_pipeline.stats()
+    return {**result, "sent_s": sent, "elapsed_s": elapsed, "stats": stats, "accepted": accepted}
+
+
+def check(accepted: List[tuple]) -> int:
+    """Posts whose stored counts differ from the accepted events'"""
+    from sqlalchemy import select
+
+    from app.database import SessionLocal
+    from app.models import Post
+
+    expected = expected_counts(accepted)
+    with SessionLocal() as db:
+        stored = {row.id: [row.likes, row.comments, row.shares]
+                  for row in db.execute(select(Post.id, Post.likes, Post.comments, Post.shares))}
+    return sum(stored.get(post_id) != counts for post_id, counts in expected.items() if post_id in stored)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--poll-every", type=int, default=20, help="every Nth event is a poll total (0: none)")
+    parser.add_argument("--request-size", type=int, default=1000, help="events per request")
+    parser.add_argument("--senders", type=int, default=4)
+    parser.add_argument("--direct", action="store_true", help="submit to the pipeline without HTTP")
+    parser.add_argument("--file", help="replay this NDJSON stream instead of a generated one")
+    parser.add_argument("--write", help="save the generated stream as NDJSON")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as stream:
+            events = [json.loads(line) for line in stream if line.strip()]
+        posts = max(event["post_id"] for event in events)
+    else:
+        events = make_events(args.events, args.posts, args.poll_every)
+        posts = args.posts
+    if args.write:
+        with open(args.write, "w") as stream:
+            stream.writelines(json.dumps(event) + "\n" for event in events)
+
+    with tempfile.TemporaryDirectory(prefix="bench-ingest-") as directory:
+        configure_environment(directory)
+        create_posts(posts)
+        from app.main import app
+
+        result = asyncio.run(run(app, events, args))
+        mismatched = check(result["accepted"])
+
+    stats = result["stats"]
+    print(f"events:                {len(events):,} on {posts:,} posts ({'direct' if args.direct else 'HTTP'})")
+    print(f"sustained:             {len(events) / result['elapsed_s']:,.0f} events/s "
+          f"({result['elapsed_s']:.2f} s until written, {result['sent_s']:.2f} s to send)")
+    if "p50_ms" in result:
+        print(f"request latency:       p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms "
+              f"({args.request_size} events per request)")
+    print(f"back-pressure:         {result['rejected']:,} of {result['requests']:,} submissions rejected and retried")
+    print(f"batches written:       {stats['batches']:,}, {stats['posts_written']:,} row writes "
+          f"({len(events) / max(stats['posts_written'], 1):,.1f} events per write)")
+    print(f"counts match events:   {'yes' if not mismatched else f'NO ({mismatched} posts differ)'}")
+    if mismatched or len(result["accepted"]) != len(events):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: incremental insights vs rebuilding a DataFrame per request
+
+    python -m benchmarks.bench_insights --posts 1000000
+"""
+
+import argparse
+import random
+import time
+
+from app.services.analytics import InsightsAggregator, extract_insights
+
+CONTENT_TYPES = ["image", "video", "text", "carousel"]
+PLATFORMS = ["twitter", "instagram", "facebook", "linkedin"]
+
+
+def make_posts(n: int, seed: int = 5):
+    rng = random.Random(seed)
+    return [
+        {
+            "hour": rng.randrange(24),
+            "content_type": rng.choice(CONTENT_TYPES),
+            "engagement": rng.randrange(5000),
+            "account": f"acct{rng.randrange(50)}",
+            "platform": rng.choice(PLATFORMS),
+        }
+        for _ in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1000000)
+    args = parser.parse_args()
+    posts = make_posts(args.posts)
+
+    started = time.perf_counter()
+    expected = extract_insights(posts)
+    pandas_ms = (time.perf_counter() - started) * 1000
+
+    aggregator = InsightsAggregator()
+    started = time.perf_counter()
+    aggregator.rebuild(posts)
+    rebuild_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        result = aggregator.insights()
+    query_us = (time.perf_counter() - started) * 1000
+
+    extra = make_posts(100000, seed=6)
+    started = time.perf_counter()
+    for post in extra:
+        aggregator.record_post(post)
+    update_us = (time.perf_counter() - started) / len(extra) * 1e6
+
+    print(f"posts:                 {args.posts:,}")
+    print(f"extract_insights:      {pandas_ms:.1f} ms per request")
+    print(f"aggregator query:      {query_us:.1f} us per request")
+    print(f"aggregator update:     {update_us:.2f} us per event")
+    print(f"full rebuild:          {rebuild_s:.2f} s")
+    print(f"matches pandas:        {result == expected}")
+
+
+if __name__ == "__main__":
+    main()
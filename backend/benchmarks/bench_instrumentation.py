@@ -0,0 +1,148 @@
+"""
+Benchmark: request overhead of INSTRUMENTATION=1 (and of the profiler)
+
+Each configuration runs in a fresh interpreter, since instrumentation is
+fixed at import. A child drives the ASGI app directly (no server, no HTTP
+client, so the measured base cost is as small as it gets) with a mix of
+light and heavier routes and reports the mean time per request. Children
+alternate between configurations for --repeats runs each.
+
+End-to-end differences of ~1% are below run-to-run noise on a shared
+machine, so the overhead is also computed from its parts: the middleware
+and a @timed call are timed in isolation, and the instrumented child
+counts @timed calls per request. With --budget the script exits non-zero
+when that estimate exceeds the given fraction of the uninstrumented
+request time.
+
+    python -m benchmarks.bench_instrumentation --requests 5000 --budget 0.02
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict
+
+from benchmarks.asgi import request
+
+CONFIGURATIONS = {
+    "off": {"INSTRUMENTATION": "0"},
+    "on": {"INSTRUMENTATION": "1"},
+    "profiler": {"INSTRUMENTATION": "1", "PROFILER": "1"},
+}
+
+# (method, path, body) per request, cycled
+MIX = [
+    ("GET", "/", None),
+    ("GET", "/insights/", None),
+    ("POST", "/ai/predict-engagement", {"content": "Launch day! Share this with your team #launch", "platform": "twitter"}),
+    ("POST", "/ai/rewrite-caption", {"content": "We shipped dark mode", "variants": 200}),
+    ("POST", "/ai/translate", {"content": "New feature is live. Link in bio! #launch", "languages": ["spanish"]}),
+    ("GET", "/ai/trends", None),
+]
+
+
+async def drive(count: int) -> Dict[str, float]:
+    from app.instrumentation import metrics
+    from app.main import app, lifespan
+
+    mix = [(method, path, json.dumps(body).encode() if body else b"") for method, path, body in MIX]
+    async with lifespan(app):
+        for i in range(len(mix) * 50):
+            assert (await request(app, *mix[i % len(mix)]))[0] == 200
+        metrics.reset()
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for i in range(count):
+                await request(app, *mix[i % len(mix)])
+            seconds = (time.perf_counter() - started) / count
+        finally:
+            gc.enable()
+    service_calls = sum(histogram.count for histogram in metrics.services.values())
+    return {"seconds": seconds, "service_calls": service_calls / count}
+
+
+async def component_costs(count: int = 100000):
+    """Seconds added per request by the middleware and per @timed call, measured in isolation"""
+    from app.instrumentation import InstrumentationMiddleware, metrics, timed
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    def service(value):
+        return value
+
+    scope = {"type": "http", "method": "GET", "path": "/"}
+    costs = {}
+    for name, app in (("bare", endpoint), ("middleware", InstrumentationMiddleware(endpoint))):
+        started = time.perf_counter()
+        for _ in range(count):
+            await app(scope, None, send)
+        costs[name] = (time.perf_counter() - started) / count
+    for name, fn in (("call", service), ("timed", timed(service))):
+        started = time.perf_counter()
+        for _ in range(count):
+            fn(1)
+        costs[name] = (time.perf_counter() - started) / count
+    return costs["middleware"] - costs["bare"], costs["timed"] - costs["call"]
+
+
+def run_child(configuration: str, count: int) -> Any:
+    env = {**os.environ, **CONFIGURATIONS[configuration], "AI_EXECUTOR": "thread",
+           "DATABASE_URL": os.getenv("DATABASE_URL", "sqlite://")}
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_instrumentation", "--child", str(count)],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None)
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        result = asyncio.run(component_costs()) if args.child == 0 else asyncio.run(drive(args.child))
+        print(json.dumps(result))
+        return
+
+    runs = {configuration: [] for configuration in CONFIGURATIONS}
+    for _ in range(args.repeats):
+        for configuration in CONFIGURATIONS:
+            runs[configuration].append(run_child(configuration, args.requests))
+    middleware, timed_call = run_child("on", 0)
+
+    base = statistics.median(run["seconds"] for run in runs["off"])
+    print(f"requests per run:   {args.requests:,} x {args.repeats} runs, {len(MIX)} routes")
+    for configuration, results in runs.items():
+        seconds = [run["seconds"] for run in results]
+        print(f"{configuration:<19} median {statistics.median(seconds) * 1e6:7.1f} us/request "
+              f"({statistics.median(seconds) / base - 1:+.2%}), fastest {min(seconds) * 1e6:.1f} us")
+
+    calls = statistics.median(run["service_calls"] for run in runs["on"])
+    estimate = middleware + calls * timed_call
+    print(f"middleware:         {middleware * 1e6:.2f} us/request")
+    print(f"@timed:             {timed_call * 1e6:.2f} us/call x {calls:.2f} calls/request")
+    print(f"overhead:           {estimate * 1e6:.2f} us/request = {estimate / base:.2%} of the median request")
+    if args.budget is not None and estimate / base > args.budget:
+        print(f"over the {args.budget:.0%} budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Load test: every route in routes/ai.py, /insights/ and /schedule/ at a target RPS
+
+Requests go straight into the ASGI app (benchmarks.asgi), with the app's
+lifespan running as under a server, so the CPU executor, database and
+caches behave as they do in production. The app uses a throwaway SQLite
+file and data paths, set before it is imported.
+
+Each route gets its own phase of --duration seconds. Arrivals are open
+loop: request i is sent at start + i / rps whether or not earlier ones have
+finished, and its latency is counted from that scheduled time. A route
+that cannot keep up therefore shows growing latency (and 503s once the
+executor queue is full) instead of quietly lowering the offered rate.
+Latencies include the load generator's own timer lag (send_lag_p99_ms;
+about a millisecond when the machine is idle).
+Memory is the process RSS after each phase and its growth over the phase;
+executor worker processes are not included.
+
+    python -m benchmarks.bench_load --rps 50 --duration 2
+    python -m benchmarks.bench_load --route "POST /ai/score-content"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.asgi import request
+
+CAPTIONS = [
+    "We just shipped dark mode for the dashboard. Love it? Click the link in bio! #launch #ai 🚀",
+    "5 tips to grow your audience this week. Save this for later 📌 #marketing #growth",
+    "Behind the scenes of our latest shoot. What do you think? #bts #photography",
+    "Big news: our summer sale starts tomorrow! Share with a friend who needs it. #sale",
+]
+HANDLES = ["@competitor1", "@competitor2", "@competitor3"]
+
+# "METHOD path" -> request i -> JSON body (None for no body, bytes sent as-is)
+PAYLOADS: Dict[str, Callable[[int], Any]] = {
+    "POST /ai/predict-engagement": lambda i: {"content": CAPTIONS[i % 4], "platform": "instagram"},
+    "POST /ai/predict-engagement/batch": lambda i: [{"content": CAPTIONS[(i + j) % 4]} for j in range(20)],
+    "POST /ai/score-content": lambda i: {"content": f"{CAPTIONS[i % 4]} #{i % 50}", "platform": "twitter"},
+    "GET /ai/trends": lambda i: None,
+    "POST /ai/trends/events": lambda i: {"posts": [{"text": CAPTIONS[(i + j) % 4]} for j in range(10)]},
+    "GET /ai/audience-segments": lambda i: None,
+    "POST /ai/audience-segments/followers": lambda i: {"followers": [
+        {"engagement_rate": (i * 7 + j) % 100 / 1000, "active_hour": (i + j) % 24,
+         "content_affinity": {"video": (i + j) % 10 / 10}}
+        for j in range(10)
+    ]},
+    "POST /ai/analyze-sentiment": lambda i: {"comments": [f"Love this, amazing #{j}" if (i + j) % 3 else
+                                                          "Meh, expected more" for j in range(50)]},
+    "POST /ai/analyze-sentiment/stream": lambda i: "".join(
+        json.dumps("Love this!" if (i + j) % 2 else "Not sure about this...") + "\n" for j in range(100)
+    ).encode(),
+    "GET /ai/sentiment-demo": lambda i: None,
+    "GET /ai/executor-stats": lambda i: None,
+    "GET /ai/translation-stats": lambda i: None,
+    "GET /ai/score-stats": lambda i: None,
+    "GET /ai/cache-stats": lambda i: None,
+    "POST /ai/competitors": lambda i: {"handles": HANDLES, "window_days": 7 + i % 30},
+    "POST /ai/competitors/samples": lambda i: {"samples": [
+        {"handle": handle, "timestamp": 1700000000 + i * 3600, "followers": 10000 + i, "likes": i % 50,
+         "comments": i % 7, "posts": i % 2}
+        for handle in HANDLES
+    ]},
+    "GET /ai/competitors-demo": lambda i: None,
+    "POST /ai/rewrite-caption": lambda i: {"content": CAPTIONS[i % 4], "style": "casual"},
+    "POST /ai/rewrite-caption/batch": lambda i: {"captions": CAPTIONS * 5, "variants": 100},
+    "POST /ai/translate": lambda i: {"content": f"{CAPTIONS[i % 4]} Post {i % 20}.",
+                                     "languages": ["spanish", "french"]},
+    "GET /insights/": lambda i: None,
+    "GET /insights/history": lambda i: None,
+    "POST /insights/events": lambda i: [
+        {"post_id": 1 + (i + n) % 50, "likes": 1, "comments": n % 2} for n in range(50)
+    ] + [{"post_id": 1 + i % 50, "kind": "total", "shares": i % 7}],
+    "GET /insights/events/stats": lambda i: None,
+    "POST /insights/history": lambda i: [
+        {"hour": (i + n) % 24, "content_type": ("image", "video", "text")[n % 3], "platform": "instagram",
+         "engagement": 100 + (i * 7 + n) % 400, "timestamp": 1700000000 + i * 60}
+        for n in range(20)
+    ],
+    "GET /schedule/": lambda i: None,
+    "POST /schedule/import": lambda i: "".join(
+        json.dumps({"content": CAPTIONS[j % 4], "account": f"acct{j % 5}",
+                    "scheduledTime": f"2030-02-{1 + j % 28:02d}T{(i + j) % 24:02d}:00:00"}) + "\n"
+        for j in range(20)
+    ).encode(),
+    "POST /schedule/": lambda i: {"content": f"{CAPTIONS[i % 4]} ({i})", "account": f"acct{i % 5}",
+                                  "scheduledTime": f"2030-01-{1 + i % 28:02d}T{i % 24:02d}:00:00"},
+}
+
+# Requests sent to each route before its phase: worker start-up, imports, first fits
+WARMUP_REQUESTS = 3
+
+
+def configure_environment(directory: str):
+    """Point the app's database and data files into directory; must run before app is imported"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ["AUDIENCE_SEGMENTS_PATH"] = os.path.join(directory, "audience_segments.npz")
+    os.environ["COMPETITOR_SERIES_PATH"] = os.path.join(directory, "competitor_series.npz")
+    os.environ["ENGAGEMENT_MODEL_PATH"] = os.path.join(directory, "engagement_model")
+    os.environ["ENGAGEMENT_HISTORY_PATH"] = os.path.join(directory, "engagement_history")
+
+
+def covered_routes() -> List[str]:
+    """"METHOD path" of every route in the ai, insights and schedule routers"""
+    from app.routes import ai, insights, scheduler
+
+    return [
+        f"{method} {route.path}"
+        for router in (ai.router, insights.router, scheduler.router)
+        for route in router.routes
+        for method in sorted(route.methods - {"HEAD"})
+    ]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def rss_mb() -> float:
+    """Current resident set size (the peak on systems without /proc)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def encode(payload: Any) -> Tuple[bytes, bytes]:
+    """(body, content type) of a payload"""
+    if payload is None:
+        return b"", b"application/json"
+    if isinstance(payload, bytes):
+        return payload, b"application/x-ndjson"
+    return json.dumps(payload).encode(), b"application/json"
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+async def load_route(app, name: str, rps: float, duration: float) -> Dict[str, Any]:
+    """Offer rps requests per second to one route for duration seconds"""
+    method, path = name.split(" ", 1)
+    make_payload = PAYLOADS[name]
+    count = max(1, int(rps * duration))
+    latencies: List[float] = []
+    lags: List[float] = []
+    errors: Dict[int, int] = {}
+
+    async def send(i: int, due: float):
+        body, content_type = encode(make_payload(i))
+        status, _ = await request(app, method, path, body, content_type=content_type)
+        latencies.append(time.perf_counter() - due)
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+
+    for i in range(WARMUP_REQUESTS):
+        await send(-1 - i, time.perf_counter())
+    latencies.clear()
+    errors.clear()
+
+    rss_before = rss_mb()
+    tasks = []
+    started = time.perf_counter()
+    for i in range(count):
+        due = started + i / rps
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lags.append(time.perf_counter() - due)
+        tasks.append(asyncio.create_task(send(i, due)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    rss_after = rss_mb()
+    return {
+        "requests": count,
+        "errors": sum(errors.values()),
+        "error_statuses": {str(status): n for status, n in sorted(errors.items())},
+        "throughput_rps": count / elapsed,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "send_lag_p99_ms": percentile(sorted(lags), 0.99) * 1000,
+        "rss_mb": rss_after,
+        "rss_growth_mb": rss_after - rss_before,
+    }
+
+
+async def run_async(app, names: List[str], rps: float, duration: float) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    async with app.router.lifespan_context(app):
+        for name in names:
+            results[name] = await load_route(app, name, rps, duration)
+    return results
+
+
+def run(rps: float = 50, duration: float = 2.0, routes: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Route ("METHOD path") -> load results; routes defaults to all of them"""
+    if "app.database" in sys.modules:
+        raise RuntimeError("The load test must run before the app is imported, to point it at a scratch database")
+    with tempfile.TemporaryDirectory(prefix="bench-load-") as directory:
+        configure_environment(directory)
+        from app.main import app
+
+        covered = covered_routes()
+        missing = [name for name in covered if name not in PAYLOADS]
+        if missing:
+            raise SystemExit(f"No load-test payload for: {', '.join(missing)}")
+        return asyncio.run(run_async(app, routes or covered, rps, duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--route", action="append", help='"METHOD path", repeatable (default: all)')
+    args = parser.parse_args()
+    results = run(args.rps, args.duration, args.route)
+    print(json.dumps({"routes": results, "peak_rss_mb": peak_rss_mb()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
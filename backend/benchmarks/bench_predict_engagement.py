@@ -0,0 +1,81 @@
+"""
+Benchmark: batch engagement prediction vs the single-post loop
+
+Both paths are warmed up first, as the startup warmup hook does for a
+serving pod; the batch path's cold first call (which imports pandas) is
+reported separately.
+
+Run from backend/:
+    python -m benchmarks.bench_predict_engagement --posts 10000
+"""
+
+import argparse
+import random
+import time
+
+from app.services.ai_services import predict_engagement, predict_engagement_batch
+from app.warmup import _exercise_batch_prediction
+
+SAMPLE_CONTENTS = [
+    "Just launched our new feature! Click the link to learn more #product #launch",
+    "What do you think about remote work? 🤔 Share your thoughts below",
+    "Short update.",
+    "We are hiring engineers who love building things. Follow us for more openings and subscribe "
+    "to our newsletter for weekly insights about the team, the product and the road ahead. #hiring",
+    "Nouvelle collection disponible dès aujourd'hui ✨",
+]
+PLATFORMS = ["twitter", "instagram", "facebook", "linkedin"]
+CONTENT_TYPES = ["text", "image", "video"]
+
+
+def make_requests(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        {
+            "content": rng.choice(SAMPLE_CONTENTS) + f" #{i}",
+            "platform": rng.choice(PLATFORMS),
+            "content_type": rng.choice(CONTENT_TYPES),
+        }
+        for i in range(n)
+    ]
+
+
+def run_single(requests):
+    return [
+        predict_engagement(r["content"], r["platform"], r["content_type"])
+        for r in requests
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=10000)
+    args = parser.parse_args()
+
+    requests = make_requests(args.posts)
+
+    started = time.perf_counter()
+    _exercise_batch_prediction()
+    cold_ms = (time.perf_counter() - started) * 1000
+    run_single(requests[:1])
+
+    random.seed(42)
+    started = time.perf_counter()
+    single = run_single(requests)
+    single_elapsed = time.perf_counter() - started
+
+    random.seed(42)
+    started = time.perf_counter()
+    batch = predict_engagement_batch(requests)
+    batch_elapsed = time.perf_counter() - started
+
+    print(f"posts:            {args.posts}")
+    print(f"single-post loop: {args.posts / single_elapsed:,.0f} posts/sec")
+    print(f"batch:            {args.posts / batch_elapsed:,.0f} posts/sec")
+    print(f"speedup:          {single_elapsed / batch_elapsed:.2f}x")
+    print(f"cold first batch: {cold_ms:.0f} ms (lazy imports)")
+    print(f"identical output: {single == batch}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: rescoring a draft on every keystroke
+
+Types a --length character caption one character at a time, then makes
+--edits single-character edits at random positions, scoring after every
+change three ways: from scratch (no draft_id), incrementally (draft_id)
+and again from the memo (the same texts a second time).
+
+    python -m benchmarks.bench_score_memo --length 3000
+"""
+
+import argparse
+import random
+import time
+
+from app.services.ai_services import score_content_performance
+from app.services.score_memo import draft_stats, score_memo
+
+SENTENCES = [
+    "Our team shipped something amazing today.",
+    "Click the link in bio to learn more!",
+    "What would you build with it?",
+    "Huge thanks to everyone who tried the beta.",
+    "#launch #AI #startup",
+]
+
+
+def keystrokes(length, edits, seed=7):
+    """The successive texts of typing a caption and then editing it"""
+    rng = random.Random(seed)
+    caption = ""
+    while len(caption) < length:
+        caption += rng.choice(SENTENCES) + " "
+    caption = caption[:length]
+    texts = [caption[:i] for i in range(1, length + 1)]
+    for _ in range(edits):
+        position = rng.randrange(len(caption))
+        if rng.random() < 0.5:
+            caption = caption[:position] + rng.choice("aeiou ") + caption[position:]
+        else:
+            caption = caption[:position] + caption[position + 1:]
+        texts.append(caption)
+    return texts
+
+
+def per_text_us(texts, **kwargs):
+    started = time.perf_counter()
+    for text in texts:
+        score_content_performance(text, "linkedin", **kwargs)
+    return (time.perf_counter() - started) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--length", type=int, default=3000)
+    parser.add_argument("--edits", type=int, default=2000)
+    args = parser.parse_args()
+
+    texts = keystrokes(args.length, args.edits)
+    # Every text is new to the memo in the first two runs
+    score_memo.max_entries = 0
+    full = per_text_us(texts)
+    incremental = per_text_us(texts, draft_id="bench")
+    score_memo.max_entries = len(texts)
+    per_text_us(texts)
+    memoized = per_text_us(texts)
+    drafts = draft_stats.stats()
+
+    print(f"texts scored:          {len(texts):,} (up to {args.length:,} chars)")
+    print(f"from scratch:          {full:.1f} us")
+    print(f"incremental (draft):   {incremental:.1f} us")
+    print(f"memo hit:              {memoized:.1f} us")
+    print(f"chars recounted:       {drafts['recounted_fraction']:.1%} of those scored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmarks for the scorers in ai_services and analytics
+
+Each case is timed with timeit in rounds of at least --min-time seconds,
+and the best per-call time over --repeats rounds is kept (the one least
+disturbed by the rest of the machine). The calculate_* scorers take precomputed TextStats,
+so text_stats and score_content_performance (stats plus every scorer) are
+timed alongside them; score_content_performance with its memo off, and
+separately as a memo hit.
+
+    python -m benchmarks.bench_scorers            # prints JSON
+    python -m benchmarks.bench_scorers --quick    # skip the 100k/1M sizes
+"""
+
+import argparse
+import json
+import random
+import timeit
+from typing import Any, Callable, Dict
+
+from app.services.ai_services import (
+    analyze_sentiment,
+    calculate_clarity,
+    calculate_readability,
+    score_content_performance,
+    text_stats,
+)
+from app.services.analytics import InsightsAggregator, extract_insights
+from app.services.score_memo import score_memo
+from benchmarks.bench_insights import make_posts
+
+CAPTION = ("We just shipped dark mode for the dashboard. Love it? Click the link in bio to learn more! "
+           "#launch #ai 🚀")
+COMMENT_WORDS = ("love this amazing great helpful not sure bad terrible meh the content was really "
+                 "expected more shared with my team changed perspective 🙌 nothing new").split()
+
+SENTIMENT_SIZES = [10, 1000, 100000]
+INSIGHTS_SIZES = [1000, 1000000]
+QUICK_LIMIT = 1000
+
+
+def make_comments(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(COMMENT_WORDS, k=rng.randint(3, 12))) for _ in range(n)]
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.2, repeats: int = 5) -> float:
+    """Best seconds per call over `repeats` rounds of at least min_time each"""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeats, number)) / number
+
+
+def run(quick: bool = False, min_time: float = 0.2, repeats: int = 5) -> Dict[str, Dict[str, float]]:
+    """Benchmark name -> {"seconds": per call, plus "items_per_second" for sized cases}"""
+    results = {}
+
+    def record(name: str, fn: Callable[[], Any], items: int = 0):
+        seconds = measure(fn, min_time, repeats)
+        results[name] = {"seconds": seconds}
+        if items:
+            results[name]["items_per_second"] = items / seconds
+
+    stats = text_stats(CAPTION)
+    record("text_stats", lambda: text_stats(CAPTION))
+    record("calculate_readability", lambda: calculate_readability(stats))
+    record("calculate_clarity", lambda: calculate_clarity(stats))
+    memo_entries = score_memo.max_entries
+    score_memo.max_entries = 0
+    record("score_content_performance", lambda: score_content_performance(CAPTION, "twitter"))
+    score_memo.max_entries = memo_entries
+    record("score_content_performance[memoized]", lambda: score_content_performance(CAPTION, "twitter"))
+
+    for size in SENTIMENT_SIZES:
+        if quick and size > QUICK_LIMIT:
+            continue
+        comments = make_comments(size)
+        record(f"analyze_sentiment[{size}]", lambda: analyze_sentiment(comments), size)
+
+    for size in INSIGHTS_SIZES:
+        if quick and size > QUICK_LIMIT:
+            continue
+        posts = make_posts(size)
+        record(f"extract_insights[{size}]", lambda: extract_insights(posts), size)
+        aggregator = InsightsAggregator()
+        aggregator.rebuild(posts)
+        record(f"insights_aggregator[{size}]", aggregator.insights)
+        del posts, aggregator
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.quick, args.min_time, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
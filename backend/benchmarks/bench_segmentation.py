@@ -0,0 +1,116 @@
+"""
+Benchmark: fit audience segments over a memory-mapped follower file
+
+Synthetic followers are drawn from four latent personas and written chunk
+by chunk to a .npy file, which AudienceSegmenter.fit() then reads through
+a memory map. Reports fit time, peak heap allocations (to show the matrix is
+never loaded whole), purity against the latent personas, and the cost of an
+incremental update and of serving the summary.
+
+    python -m benchmarks.bench_segmentation --followers 10000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from app.services.segmentation import FEATURE_NAMES, AudienceSegmenter
+
+# engagement_rate, active hour, favourite content type index
+PERSONAS = [
+    (0.085, 20, 2),
+    (0.021, 13, 1),
+    (0.123, 18, 3),
+    (0.057, 9, 0),
+]
+CHUNK = 1_000_000
+
+
+def make_followers(rng: np.random.Generator, count: int):
+    persona = rng.integers(len(PERSONAS), size=count)
+    params = np.array(PERSONAS, dtype=np.float64)[persona]
+    rate = np.clip(rng.normal(params[:, 0], params[:, 0] * 0.25), 0, None)
+    hour = (params[:, 1] + rng.normal(0, 1.5, size=count)) % 24
+    affinity = rng.dirichlet(np.ones(4), size=count) * 0.4
+    affinity[np.arange(count), params[:, 2].astype(int)] += 0.6
+
+    features = np.empty((count, len(FEATURE_NAMES)), dtype=np.float32)
+    features[:, 0] = rate * 10.0
+    features[:, 1] = np.sin(2 * np.pi * hour / 24)
+    features[:, 2] = np.cos(2 * np.pi * hour / 24)
+    features[:, 3:] = affinity
+    return features, persona
+
+
+def write_followers(path: str, count: int, seed: int = 12) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    matrix = open_memmap(path, mode="w+", dtype=np.float32, shape=(count, len(FEATURE_NAMES)))
+    personas = np.empty(count, dtype=np.int8)
+    for start in range(0, count, CHUNK):
+        size = min(CHUNK, count - start)
+        matrix[start:start + size], personas[start:start + size] = make_followers(rng, size)
+    matrix.flush()
+    del matrix
+    return personas
+
+
+def purity(segmenter: AudienceSegmenter, path: str, personas: np.ndarray) -> float:
+    matrix = np.load(path, mmap_mode="r")
+    table = np.zeros((segmenter.n_segments, len(PERSONAS)), dtype=np.int64)
+    for start in range(0, len(matrix), CHUNK):
+        labels = segmenter.model.assign(np.asarray(matrix[start:start + CHUNK], dtype=np.float64))
+        np.add.at(table, (labels, personas[start:start + CHUNK]), 1)
+    return table.max(axis=1).sum() / table.sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--followers", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--epochs", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.followers:
+            path = os.path.join(directory, f"followers_{count}.npy")
+            started = time.perf_counter()
+            personas = write_followers(path, count)
+            generated = time.perf_counter() - started
+
+            segmenter = AudienceSegmenter(batch_size=args.batch_size, epochs=args.epochs)
+            # Peak of heap allocations (NumPy included) during the fit; memory-mapped pages are file-backed
+            tracemalloc.start()
+            started = time.perf_counter()
+            segmenter.fit(path)
+            fit_seconds = time.perf_counter() - started
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+
+            new_followers, _ = make_followers(np.random.default_rng(1), 10_000)
+            started = time.perf_counter()
+            segmenter.update(new_followers)
+            update_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            summary = segmenter.summary()
+            summary_us = (time.perf_counter() - started) * 1e6
+
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{count:,} followers ({size_mb:,.0f} MB on disk, generated in {generated:.1f}s)")
+            print(f"  fit ({args.epochs} epochs + tally): {fit_seconds:.2f}s, {count * (args.epochs + 1) / fit_seconds:,.0f} rows/sec")
+            print(f"  peak heap during fit: {peak_mb:,.1f} MB")
+            print(f"  purity vs personas:  {purity(segmenter, path, personas):.1%}")
+            print(f"  confidence:          {summary['segmentation_confidence']}")
+            print(f"  update 10k:          {update_ms:.1f} ms")
+            print(f"  summary:             {summary_us:.0f} us")
+            print(f"  segments:            {[(s['name'], s['size']) for s in summary['segments']]}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
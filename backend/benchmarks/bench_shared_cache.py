@@ -0,0 +1,79 @@
+"""
+Benchmark: the response cache shared by several workers through Redis
+
+Plays --workers uvicorn workers as ResponseCache instances sharing one
+in-process FakeRedis, and checks that an invalidation in one worker is
+seen by all of them: their local copies, the shared entries, and a value
+another worker was still computing when the data changed. Then times
+cache reads with a --latency second round trip per Redis command, for a
+local hit (one generation check) and a shared hit.
+
+    python -m benchmarks.bench_shared_cache --workers 4 --latency 0.0002
+"""
+
+import argparse
+import time
+
+from app.cache import RedisBackend, ResponseCache
+from benchmarks.fake_redis import FakeRedis
+
+
+def check_invalidation(workers):
+    first, *others = workers
+    first.set("trends", None, {"version": 1})
+    for worker in others:
+        assert worker.get("trends") is not None, "shared entry not seen"
+        assert worker.get("trends") is not None, "local copy not kept"
+
+    first.invalidate("trends")
+    for worker in workers:
+        assert worker.get("trends") is None, "served an entry from before the invalidation"
+
+    # A value computed across an invalidation is filed under the old generation
+    slow = others[-1] if others else first
+    response = slow.get_or_compute("trends", None, lambda: first.invalidate("trends") or {"version": 1})
+    assert response.body == b'{"version":1}'
+    for worker in workers:
+        assert worker.get("trends") is None, "kept a value computed before the invalidation"
+
+    first.set("competitors", {}, {"version": 2})
+    first.invalidate_endpoint("competitors")
+    for worker in workers:
+        assert worker.get("competitors", {}) is None, "served an entry from before invalidate_endpoint"
+
+
+def time_reads(cache: ResponseCache, requests: int) -> float:
+    """Reads per second of one cached entry, after the first"""
+    cache.set("trends", None, {"trends": list(range(100))})
+    cache.get("trends")
+    started = time.perf_counter()
+    for _ in range(requests):
+        cache.get("trends")
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0002, help="seconds per Redis command")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    server = FakeRedis()
+    workers = [ResponseCache(backend=RedisBackend(client=server)) for _ in range(args.workers)]
+    check_invalidation(workers)
+    stale = sum(worker.stats()["endpoints"]["trends"]["stale"] for worker in workers)
+    print(f"invalidation:       seen by all {args.workers} workers ({stale} stale local copies dropped)")
+
+    server.latency = args.latency
+    local_only = time_reads(ResponseCache(), args.requests)
+    local_hits = time_reads(ResponseCache(backend=RedisBackend(client=server)), args.requests)
+    # A cache too small to keep the entry locally reads it from Redis every time
+    shared_hits = time_reads(ResponseCache(max_bytes=0, backend=RedisBackend(client=server)), args.requests)
+    print(f"local only:         {local_only:,.0f} reads/sec")
+    print(f"local hit + check:  {local_hits:,.0f} reads/sec ({args.latency * 1e6:.0f} us per Redis command)")
+    print(f"shared hit:         {shared_hits:,.0f} reads/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: SocialAPIClient against the local mock platform
+
+Fetches metrics for --posts posts spread over all platforms, with
+--duplicates concurrent requests per post, once one-by-one and once
+through the batch lookup. The mock adds latency and random 429s.
+
+    python -m benchmarks.bench_social_api --posts 2000 --duplicates 3
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.services import rate_limit
+from app.services.social_api import SocialAPIClient
+from benchmarks import mock_platform
+
+
+async def run(mode: str, post_ids, duplicates: int):
+    client = SocialAPIClient(config=mock_platform.mock_config(),
+                             transport=httpx.ASGITransport(app=mock_platform.app))
+    mock_platform.state.requests = mock_platform.state.throttled = 0
+    started = time.perf_counter()
+    if mode == "single":
+        await asyncio.gather(*(
+            client.fetch_metrics(platform, post_id)
+            for platform, ids in post_ids.items() for post_id in ids for _ in range(duplicates)
+        ))
+    else:
+        await asyncio.gather(*(client.fetch_metrics_many(platform, ids) for platform, ids in post_ids.items()))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    return elapsed, client.stats, mock_platform.state.requests, mock_platform.state.throttled
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--duplicates", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--throttle-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    mock_platform.state.latency = args.latency
+    mock_platform.state.throttle_rate = args.throttle_rate
+    # The mock's limits, not the production defaults
+    for limits in rate_limit.PLATFORM_RATE_LIMITS.values():
+        limits.update(rate=500, burst=100)
+
+    platforms = list(mock_platform.PLATFORM_CONFIG)
+    post_ids = {platform: [f"{platform}-{i}" for i in range(args.posts // len(platforms))] for platform in platforms}
+    for mode in ("single", "batch"):
+        elapsed, stats, served, throttled = await run(mode, post_ids, args.duplicates)
+        print(f"{mode:>6}: {args.posts / elapsed:8,.0f} posts/sec  upstream requests {served:5d} "
+              f"(429s {throttled})  client stats {stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
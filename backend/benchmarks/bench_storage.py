@@ -0,0 +1,96 @@
+"""
+Benchmark: post storage with a large scheduled backlog
+
+Bulk-inserts --posts scheduled posts into a throwaway SQLite file, then
+times single creates, keyset-paginated listings (first page, a page deep
+in the backlog, a per-account page), calendar range queries (a month, a
+month of one platform) and a CSV import through the bulk import path.
+
+    python -m benchmarks.bench_storage --posts 1000000
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engine
+from app.services.post_store import bulk_insert_posts, create_posts, list_scheduled
+from app.services.schedule_import import import_scheduled_posts
+
+PLATFORMS = ["twitter", "instagram", "facebook", "linkedin"]
+
+
+def timed_ms(fn, repeat=50):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--import-rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine, expire_on_commit=False)()
+
+        rng = random.Random(1)
+        start = datetime(2026, 1, 1)
+        rows = [
+            {
+                "account": f"acct{rng.randrange(args.accounts)}",
+                "content": f"Scheduled post {i} #launch",
+                "platform": rng.choice(PLATFORMS),
+                "status": "scheduled",
+                "scheduled_time": start + timedelta(seconds=rng.randrange(365 * 86400)),
+            }
+            for i in range(args.posts)
+        ]
+        started = time.perf_counter()
+        bulk_insert_posts(db, rows)
+        insert_elapsed = time.perf_counter() - started
+
+        middle = sorted(rows[:1000], key=lambda r: r["scheduled_time"])[500]["scheduled_time"]
+        deep_cursor = f"{middle.isoformat()}|0"
+
+        print(f"posts:               {args.posts:,}")
+        print(f"bulk insert:         {args.posts / insert_elapsed:,.0f} rows/sec")
+        print(f"create one post:     {timed_ms(lambda: create_posts(db, [{'content': 'x', 'status': 'scheduled', 'scheduled_time': start}])):.2f} ms")
+        print(f"list first page:     {timed_ms(lambda: list_scheduled(db, limit=50)):.2f} ms")
+        print(f"list deep page:      {timed_ms(lambda: list_scheduled(db, cursor=deep_cursor, limit=50)):.2f} ms")
+        print(f"list account page:   {timed_ms(lambda: list_scheduled(db, account='acct7', limit=50)):.2f} ms")
+
+        month = {"start": datetime(2026, 6, 1), "end": datetime(2026, 7, 1)}
+        print(f"month page (500):    {timed_ms(lambda: list_scheduled(db, limit=500, **month)):.2f} ms")
+        print(f"month platform page: {timed_ms(lambda: list_scheduled(db, limit=500, platform='linkedin', **month)):.2f} ms")
+        print(f"month account page:  {timed_ms(lambda: list_scheduled(db, limit=500, account='acct7', **month)):.2f} ms")
+
+        csv_rows = "".join(
+            f"Imported post {i},acct{i % 50},instagram,2026-08-{1 + i % 28:02d}T{i % 24:02d}:00:00\n"
+            for i in range(args.import_rows)
+        )
+        body = io.BytesIO(f"content,account,platform,scheduled_time\n{csv_rows}".encode())
+        started = time.perf_counter()
+        result = import_scheduled_posts(db, body, "csv")
+        import_elapsed = time.perf_counter() - started
+        print(f"csv import:          {result['imported'] / import_elapsed:,.0f} rows/sec ({result['imported']:,} rows)")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
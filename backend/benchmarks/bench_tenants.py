@@ -0,0 +1,175 @@
+"""
+Load test: interactive tenants sharing the CPU executor with a batch tenant
+
+Three interactive tenants send a steady open-loop stream (as in bench_load)
+of single-caption predict-engagement and score-content requests and small
+analyze-sentiment batches, --rps in all, spread evenly between them. The
+run has two phases of --duration seconds: the interactive tenants alone,
+then the same stream while a batch tenant keeps --batch-clients requests of
+--batch-comments comments each in flight on analyze-sentiment. The batch
+tenant's clients retry a 429 (its queue quota is full) after a short pause;
+the interactive tenants' errors are counted, not retried.
+
+Reports the interactive tenants' p50/p99 latency in each phase, the batch
+tenant's comments/sec and 429s, and each tenant's executor seconds. With
+fair share the interactive p99 in the mixed phase stays near the batch
+tenant's chunk time (SENTIMENT_CHUNK_SIZE comments) instead of growing with
+the batch queue.
+
+    python -m benchmarks.bench_tenants
+    python -m benchmarks.bench_tenants --rps 30 --batch-clients 32 --batch-comments 100000
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.asgi import request
+from benchmarks.bench_load import PAYLOADS, configure_environment, encode, percentile
+
+INTERACTIVE_TENANTS = ["acme", "globex", "initech"]
+BATCH_TENANT = "bulk"
+INTERACTIVE_ROUTES = ["POST /ai/predict-engagement", "POST /ai/score-content", "POST /ai/analyze-sentiment"]
+RETRY_PAUSE = 0.05
+
+
+def tenant_header(tenant: str) -> List[tuple]:
+    return [(b"x-tenant", tenant.encode())]
+
+
+def batch_body(comments: int) -> bytes:
+    texts = ["Love this, amazing!", "Meh, expected more", "Not sure about this...", "Great work team"]
+    return json.dumps({"comments": [f"{texts[n % 4]} #{n}" for n in range(comments)]}).encode()
+
+
+async def interactive_load(app, rps: float, duration: float) -> Dict[str, Dict[str, Any]]:
+    """Open-loop requests from the interactive tenants; tenant -> latency summary"""
+    count = max(1, int(rps * duration))
+    latencies: Dict[str, List[float]] = {tenant: [] for tenant in INTERACTIVE_TENANTS}
+    errors: Dict[str, Dict[int, int]] = {tenant: {} for tenant in INTERACTIVE_TENANTS}
+
+    async def send(i: int, due: float):
+        tenant = INTERACTIVE_TENANTS[i % len(INTERACTIVE_TENANTS)]
+        name = INTERACTIVE_ROUTES[i // len(INTERACTIVE_TENANTS) % len(INTERACTIVE_ROUTES)]
+        method, path = name.split(" ", 1)
+        body, content_type = encode(PAYLOADS[name](i))
+        status, _ = await request(app, method, path, body, content_type=content_type, headers=tenant_header(tenant))
+        latencies[tenant].append(time.perf_counter() - due)
+        if status >= 400:
+            errors[tenant][status] = errors[tenant].get(status, 0) + 1
+
+    tasks = []
+    started = time.perf_counter()
+    for i in range(count):
+        due = started + i / rps
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(i, due)))
+    await asyncio.gather(*tasks)
+
+    results = {}
+    for tenant, values in latencies.items():
+        ordered = sorted(values)
+        results[tenant] = {
+            "requests": len(ordered),
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": ordered[-1] * 1000,
+            "error_statuses": {str(status): n for status, n in sorted(errors[tenant].items())},
+        }
+    return results
+
+
+async def batch_load(app, clients: int, comments: int, stop: asyncio.Event) -> Dict[str, Any]:
+    """Closed-loop analyze-sentiment jobs from the batch tenant until stop is set"""
+    body = batch_body(comments)
+    counts = {"completed": 0, "rejected": 0, "errors": 0}
+
+    async def client():
+        while not stop.is_set():
+            status, _ = await request(app, "POST", "/ai/analyze-sentiment", body,
+                                      headers=tenant_header(BATCH_TENANT))
+            if status == 200:
+                counts["completed"] += 1
+            elif status == 429:
+                counts["rejected"] += 1
+                await asyncio.sleep(RETRY_PAUSE)
+            else:
+                counts["errors"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {**counts, "comments_per_s": counts["completed"] * comments / elapsed, "elapsed_s": elapsed}
+
+
+async def executor_seconds(app, tenant: str) -> float:
+    _, body = await request(app, "GET", "/ai/executor-stats", headers=tenant_header(tenant))
+    return json.loads(body)["tenant"]["executor_seconds"]
+
+
+async def run_async(app, args: argparse.Namespace) -> Dict[str, Any]:
+    async with app.router.lifespan_context(app):
+        # Warm up the worker and the models for every tenant
+        await interactive_load(app, len(INTERACTIVE_TENANTS) * len(INTERACTIVE_ROUTES), 1.0)
+        await request(app, "POST", "/ai/analyze-sentiment", batch_body(100), headers=tenant_header(BATCH_TENANT))
+
+        alone = await interactive_load(app, args.rps, args.duration)
+        stop = asyncio.Event()
+        batch = asyncio.create_task(batch_load(app, args.batch_clients, args.batch_comments, stop))
+        # Let the batch tenant's queue fill before measuring
+        await asyncio.sleep(1.0)
+        mixed = await interactive_load(app, args.rps, args.duration)
+        stop.set()
+        batch_result = await batch
+        used = {tenant: await executor_seconds(app, tenant) for tenant in INTERACTIVE_TENANTS + [BATCH_TENANT]}
+    return {"alone": alone, "mixed": mixed, "batch": batch_result, "executor_seconds": used}
+
+
+def summary(phase: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """Interactive tenants taken together"""
+    return {
+        "p50_ms": max(result["p50_ms"] for result in phase.values()),
+        "p99_ms": max(result["p99_ms"] for result in phase.values()),
+        "errors": sum(sum(result["error_statuses"].values()) for result in phase.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=15, help="interactive requests per second, all tenants")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    parser.add_argument("--batch-clients", type=int, default=24, help="batch requests kept in flight")
+    parser.add_argument("--batch-comments", type=int, default=20000, help="comments per batch request")
+    parser.add_argument("--json", action="store_true", help="print the raw results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-tenants-") as directory:
+        configure_environment(directory)
+        from app.main import app
+
+        results = asyncio.run(run_async(app, args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for phase, label in (("alone", "interactive alone"), ("mixed", "with batch tenant")):
+        print(label)
+        for tenant, result in results[phase].items():
+            print(f"  {tenant:<10} p50 {result['p50_ms']:8.1f} ms   p99 {result['p99_ms']:8.1f} ms   "
+                  f"max {result['max_ms']:8.1f} ms   errors {result['error_statuses'] or 0}")
+    alone, mixed = summary(results["alone"]), summary(results["mixed"])
+    print(f"interactive p99:       {alone['p99_ms']:.1f} ms alone, {mixed['p99_ms']:.1f} ms with the batch tenant")
+    batch = results["batch"]
+    print(f"batch tenant:          {batch['completed']} jobs, {batch['comments_per_s']:,.0f} comments/s, "
+          f"{batch['rejected']} answered 429, {batch['errors']} other errors")
+    print("executor seconds:      " + ", ".join(f"{tenant} {seconds:.2f}"
+                                                for tenant, seconds in results["executor_seconds"].items()))
+
+
+if __name__ == "__main__":
+    main()
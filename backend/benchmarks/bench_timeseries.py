@@ -0,0 +1,68 @@
+"""
+Benchmark: competitor time-series store over a year of hourly samples
+
+Backfills --handles handles with --days of hourly follower/likes/comments/
+posts samples, then times window queries across all handles (7, 30, 90
+and 365 days, unaligned to day boundaries) and the full
+analyze_competitors() call on top of them.
+
+    python -m benchmarks.bench_timeseries --handles 500 --days 365
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.services import timeseries
+from app.services.ai_services import analyze_competitors
+from app.services.timeseries import HOUR, TimeSeriesStore
+
+
+def timed_ms(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--handles", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(14)
+    hours = args.days * 24
+    end = time.time() // HOUR * HOUR
+    timestamps = end - (hours - np.arange(hours)) * HOUR
+    handles = [f"@competitor{i}" for i in range(args.handles)]
+
+    store = TimeSeriesStore()
+    started = time.perf_counter()
+    for handle in handles:
+        followers = rng.integers(1_000, 1_000_000) + np.cumsum(rng.integers(-5, 20, hours))
+        posts = (rng.random(hours) < rng.uniform(0.02, 0.2)).astype(np.int64)
+        likes = posts * rng.integers(10, 5000, hours)
+        store.record_many(handle, timestamps, followers=followers, likes=likes, comments=likes // 20, posts=posts)
+    backfill = time.perf_counter() - started
+    samples = args.handles * hours
+    memory_mb = sum(array.nbytes for columns in store._data.values() for array in columns.values()) / 1024 / 1024
+
+    print(f"backfill:  {samples:,} samples in {backfill:.2f}s ({samples / backfill:,.0f} samples/sec), {memory_mb:,.0f} MB")
+    for days in (7, 30, 90, 365):
+        window_end = end - 7.5 * HOUR
+        median, worst = timed_ms(lambda: store.query(handles, window_end - days * 86400, window_end))
+        print(f"query {days:>3}d x {args.handles} handles: median {median:.2f} ms, max {worst:.2f} ms")
+
+    timeseries._competitor_series = store
+    for days in (30, 365):
+        median, worst = timed_ms(lambda: analyze_competitors(window_days=days))
+        print(f"analyze_competitors({days}d): median {median:.2f} ms, max {worst:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
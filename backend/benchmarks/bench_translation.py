@@ -0,0 +1,87 @@
+"""
+Benchmark: translation memory vs translating every caption in full
+
+Captions mix one unique sentence with recurring boilerplate (CTAs,
+signatures, campaign hashtags). A FakeTranslator with per-call and
+per-segment latency stands in for a paid API. Reports hit rate, backend
+segments and calls, and per-request latency with and without the memory.
+
+    python -m benchmarks.bench_translation --captions 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engine
+from app.services.translation import FakeTranslator, TranslationMemory, split_segments
+
+CTAS = ["Follow us for more!", "Link in bio.", "Share with your team!", "Comment below 👇", "Subscribe for weekly tips."]
+SIGNATURES = ["— The Acme team", "Questions? DM us.", "Made with ❤️ in Berlin."]
+HASHTAGS = ["#Marketing", "#Growth", "#SocialMedia", "#Launch", "#AI", "#Tips", "#Startup", "#TechNews"]
+LANGUAGES = ["spanish", "french", "german", "portuguese", "japanese"]
+
+
+def make_captions(count: int, seed: int = 15):
+    rng = random.Random(seed)
+    captions = []
+    for i in range(count):
+        sentence = f"Update {i}: we shipped {rng.choice(['faster search', 'dark mode', 'new exports', 'team spaces'])}."
+        tags = " ".join(rng.sample(HASHTAGS, 3))
+        captions.append(f"{sentence} {rng.choice(CTAS)}\n{rng.choice(SIGNATURES)} {tags}")
+    return captions, rng
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--captions", type=int, default=2000)
+    parser.add_argument("--call-latency-ms", type=float, default=20.0)
+    parser.add_argument("--segment-latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    captions, rng = make_captions(args.captions)
+    requests = [(caption, rng.sample(LANGUAGES, rng.randint(1, 3))) for caption in captions]
+    latency = (args.call_latency_ms / 1000, args.segment_latency_ms / 1000)
+
+    direct = FakeTranslator(*latency)
+    direct_ms = []
+    for caption, languages in requests:
+        started = time.perf_counter()
+        segments = [caption[start:end] for start, end in split_segments(caption)]
+        direct.translate([(segment, language) for language in languages for segment in segments])
+        direct_ms.append((time.perf_counter() - started) * 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'tm.db')}")
+        Base.metadata.create_all(bind=engine)
+        backend = FakeTranslator(*latency)
+        memory = TranslationMemory(backend, session_factory=sessionmaker(bind=engine))
+        memory_ms = [memory.translate(caption, languages)[1]["latency_ms"] for caption, languages in requests]
+        stats = memory.stats()
+
+        # A fresh process: empty LRU, warm database
+        restarted = TranslationMemory(FakeTranslator(*latency), session_factory=sessionmaker(bind=engine))
+        restart_ms = [restarted.translate(caption, languages)[1]["latency_ms"] for caption, languages in requests[:200]]
+
+    print(f"requests:           {len(requests):,}")
+    print(f"without memory:     {direct.segments:,} segments in {direct.calls:,} calls, "
+          f"p50 {statistics.median(direct_ms):.1f} ms, p99 {percentile(direct_ms, 0.99):.1f} ms")
+    print(f"with memory:        {backend.segments:,} segments in {backend.calls:,} calls, "
+          f"p50 {statistics.median(memory_ms):.1f} ms, p99 {percentile(memory_ms, 0.99):.1f} ms")
+    print(f"hit rate:           {stats['hit_rate']:.1%} ({stats['cache_hits']:,} LRU, {stats['store_hits']:,} database)")
+    print(f"after restart:      p50 {statistics.median(restart_ms):.1f} ms on the first 200 requests "
+          f"(hit rate {restarted.stats()['hit_rate']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
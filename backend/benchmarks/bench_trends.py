@@ -0,0 +1,84 @@
+"""
+Benchmark: replay a synthetic hashtag stream through TrendTracker
+
+Events are Zipf-distributed over --tags distinct hashtags and spread over
+two windows; in the second window part of the ranking is shuffled so tags
+rise and fall. Reports ingest rate, top-K read latency, and accuracy of
+the current window's top-K against exact counts, and checks that an event
+stamped in milliseconds is dropped instead of moving the window past every
+later event.
+
+    python -m benchmarks.bench_trends --events 10000000
+"""
+
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.services.trends import TrendTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--tags", type=int, default=1000000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--window", type=int, default=3600)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    ranks = np.minimum(rng.zipf(1.3, size=args.events), args.tags) - 1
+    timestamps = np.sort(rng.uniform(0, 2 * args.window, size=args.events))
+    # Second window: reshuffle the 50 most popular ranks so growth varies
+    second = timestamps >= args.window
+    remap = np.arange(args.tags)
+    remap[:50] = rng.permutation(50)
+    ranks[second] = remap[ranks[second]]
+
+    names = [f"#tag{i}" for i in range(args.tags)]
+    events = [(names[r], t) for r, t in zip(ranks.tolist(), timestamps.tolist())]
+
+    # The clock stands at the end of the stream, inside its last slice
+    tracker = TrendTracker(window_seconds=args.window, top_k=args.top_k, clock=lambda: 2.0 * args.window - 1e-3)
+    started = time.perf_counter()
+    for tag, timestamp in events:
+        tracker.record(tag, timestamp)
+    elapsed = time.perf_counter() - started
+
+    tracker.refresh()
+    started = time.perf_counter()
+    for _ in range(10000):
+        top = tracker.top()
+    read_us = (time.perf_counter() - started) / 10000 * 1e6
+
+    # Exact counts over the tracker's current window (the last `slices` slices)
+    window_start = (tracker._latest_index - tracker.slices_per_window + 1) * tracker.slice_seconds
+    exact = Counter(tag for tag, timestamp in events if timestamp >= window_start)
+    exact_top = [tag for tag, _ in exact.most_common(args.top_k)]
+    estimated_top = [entry["tag"] for entry in top]
+    recall = len(set(exact_top) & set(estimated_top)) / args.top_k
+    errors = [abs(entry["volume"] - exact[entry["tag"]]) / exact[entry["tag"]] for entry in top]
+
+    # A millisecond timestamp must not push the window ahead of the clock
+    now = 2.0 * args.window - 1e-3
+    accepted = tracker.record("#future", now * 1000)
+    tracker.record("#afterwards", now)
+    tracker.refresh()
+    counted = tracker.top(tracker.capacity)
+    assert not accepted and tracker._latest_index == int(now // tracker.slice_seconds), "future event moved the window"
+    assert not any(entry["tag"] == "#future" for entry in counted), "future event was counted"
+    assert tracker._slices[tracker._latest_index].sketch.estimate("#afterwards") >= 1, "later event was dropped"
+
+    print(f"events:             {args.events:,} over {args.tags:,} possible tags")
+    print(f"ingest:             {args.events / elapsed:,.0f} events/sec")
+    print(f"top-K read:         {read_us:.2f} us")
+    print(f"top-{args.top_k} recall:       {recall:.0%}")
+    print(f"volume error:       mean {np.mean(errors):.4%}, max {np.max(errors):.4%}")
+    print(f"top entries:        {top[:3]}")
+    print("future timestamp:   dropped; later events still counted")
+
+
+if __name__ == "__main__":
+    main()
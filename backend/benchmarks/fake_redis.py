@@ -0,0 +1,68 @@
+"""
+In-process stand-in for a Redis server, for benchmarks of the shared
+response cache tier.
+
+Implements the commands RedisBackend uses (GET, SET with PX, DELETE, INCR,
+SCAN by pattern) on a dict with expiry. Give one FakeRedis to several
+RedisBackend(client=...) instances to play several uvicorn workers sharing
+a server; `latency` seconds are slept per command to stand for the round
+trip.
+"""
+
+import fnmatch
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class FakeRedis:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.commands = 0
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _command(self):
+        self.commands += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        self._command()
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: bytes, px: Optional[int] = None):
+        self._command()
+        with self._lock:
+            self._data[key] = (None if px is None else time.monotonic() + px / 1000, value)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        self._command()
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def incr(self, key: str) -> int:
+        self._command()
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            # Redis keeps counters as strings; the TTL of an existing key is kept
+            self._data[key] = (self._data[key][0] if key in self._data else None, str(value).encode())
+            return value
+
+    def scan_iter(self, match: str = "*") -> Iterator[str]:
+        self._command()
+        with self._lock:
+            keys = [key for key in self._data if fnmatch.fnmatchcase(key, match)]
+        return iter(keys)
@@ -0,0 +1,74 @@
+"""
+Local mock of the social platform APIs for SocialAPIClient benchmarks.
+
+Every platform lives under /<platform>/..., so point a client at it with
+mock_config(). Responses are delayed by `latency` seconds, and a
+`throttle_rate` fraction of requests get a 429 with Retry-After. Use it
+in-process through httpx.ASGITransport, or serve it with
+`uvicorn benchmarks.mock_platform:app`.
+"""
+
+import asyncio
+import copy
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.services.social_api import PLATFORM_CONFIG
+
+
+class MockPlatformState:
+    def __init__(self, latency: float = 0.02, throttle_rate: float = 0.02, retry_after: float = 0.05, seed: int = 0):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+
+
+state = MockPlatformState()
+app = FastAPI(title="Mock social platforms")
+
+
+def mock_config(base_url: str = "http://mock"):
+    config = copy.deepcopy(PLATFORM_CONFIG)
+    for platform, platform_config in config.items():
+        platform_config["base_url"] = f"{base_url}/{platform}"
+    return config
+
+
+def fake_metrics(platform: str, post_id: str):
+    seed = sum(map(ord, post_id))
+    likes, comments, shares = seed % 500, seed % 50, seed % 20
+    if platform == "twitter":
+        return {"id": post_id, "public_metrics": {"like_count": likes, "reply_count": comments,
+                                                  "retweet_count": shares, "impression_count": likes * 10}}
+    if platform == "instagram":
+        return {"id": post_id, "like_count": likes, "comments_count": comments}
+    if platform == "facebook":
+        return {"id": post_id, "reactions": {"summary": {"total_count": likes}},
+                "comments": {"summary": {"total_count": comments}}, "shares": {"count": shares}}
+    return {"id": post_id, "likesSummary": {"totalLikes": likes},
+            "commentsSummary": {"aggregatedTotalComments": comments}}
+
+
+@app.api_route("/{platform}/{path:path}", methods=["GET", "POST"])
+async def handle(platform: str, path: str, request: Request):
+    state.requests += 1
+    await asyncio.sleep(state.latency)
+    if state.rng.random() < state.throttle_rate:
+        state.throttled += 1
+        return JSONResponse({"error": "rate limited"}, status_code=429,
+                            headers={"Retry-After": str(state.retry_after)})
+
+    if request.method == "POST":
+        return {"id": str(state.requests)}
+    ids = request.query_params.get("ids")
+    if ids:
+        items = [fake_metrics(platform, post_id) for post_id in ids.split(",")]
+        if platform == "twitter":
+            return {"data": items}
+        return {item["id"]: item for item in items}
+    return fake_metrics(platform, path.rsplit("/", 1)[-1])
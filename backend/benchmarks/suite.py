@@ -0,0 +1,146 @@
+"""
+Benchmark suite: scorer micro-benchmarks and the route load test, as JSON,
+compared against a stored baseline
+
+    python -m benchmarks.suite                          # run all, compare with benchmarks/baseline.json
+    python -m benchmarks.suite --output results.json    # also write the results
+    python -m benchmarks.suite --only micro --quick     # a fast subset
+    python -m benchmarks.suite --update-baseline        # record a new baseline
+
+Result keys are "micro.<case>" and "load.<METHOD path>". A metric regresses
+when it is worse than the baseline by more than --tolerance (a fraction;
+--load-tolerance for the load test, whose tail latencies come from a
+hundred or so requests and move a lot between runs), and a latency also
+only when it is worse by more than MIN_LATENCY_CHANGE_MS. The script exits
+non-zero if any metric regresses. Cases missing on either side (e.g.
+with --quick) are skipped. Baselines are only comparable on the machine
+they were recorded on, so re-record after moving the suite to a new one.
+The default tolerances suit a busy shared machine, where sub-microsecond
+cases move by a third between runs; tighten them on a quiet one.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks import bench_load
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Metrics compared against the baseline: name -> True when lower is better
+COMPARED_METRICS = {
+    "seconds": True,
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "throughput_rps": False,
+    "peak_rss_mb": True,
+}
+
+# Smaller latency changes are timer and scheduling noise at any percentage
+MIN_LATENCY_CHANGE_MS = 10.0
+
+
+def run_suite(parts: List[str], quick: bool, rps: float, duration: float) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    # Load first: it has to configure the app before anything imports it
+    if "load" in parts:
+        for name, metrics in bench_load.run(rps=rps, duration=duration).items():
+            results[f"load.{name}"] = metrics
+        results["load.process"] = {"peak_rss_mb": bench_load.peak_rss_mb()}
+    if "micro" in parts:
+        from benchmarks import bench_scorers
+
+        for name, metrics in bench_scorers.run(quick=quick).items():
+            results[f"micro.{name}"] = metrics
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+            "rps": rps,
+            "duration": duration,
+        },
+        "results": results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+            load_tolerance: float) -> List[Dict[str, Any]]:
+    """One row per compared metric present in both runs"""
+    rows = []
+    for case, metrics in results["results"].items():
+        before = baseline["results"].get(case)
+        if before is None:
+            continue
+        limit = load_tolerance if case.startswith("load.") else tolerance
+        for metric, lower_is_better in COMPARED_METRICS.items():
+            if metric not in metrics or metric not in before or not before[metric]:
+                continue
+            change = metrics[metric] / before[metric] - 1
+            worse = change if lower_is_better else -change
+            ignored = metric.endswith("_ms") and metrics[metric] - before[metric] < MIN_LATENCY_CHANGE_MS
+            rows.append({
+                "case": case,
+                "metric": metric,
+                "baseline": before[metric],
+                "current": metrics[metric],
+                "change": change,
+                "regression": worse > limit and not ignored,
+            })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['case'] + ' ' + row['metric']:<60} {row['baseline']:>12.4g} -> {row['current']:<12.4g}"
+              f" {row['change']:+7.1%} {flag}", file=sys.stderr)
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{len(rows)} metrics compared, {regressions} regressed", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=["micro", "load"], action="append", help="default: both")
+    parser.add_argument("--quick", action="store_true", help="skip the 100k/1M micro-benchmark sizes")
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds of load per route")
+    parser.add_argument("--output", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--load-tolerance", type=float, default=1.0)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run_suite(args.only or ["micro", "load"], args.quick, args.rps, args.duration)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as output:
+            output.write(text + "\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with --update-baseline", file=sys.stderr)
+        return
+    with open(args.baseline) as saved:
+        rows = compare(results, json.load(saved), args.tolerance, args.load_tolerance)
+    print_comparison(rows)
+    if any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
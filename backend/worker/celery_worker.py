@@ -0,0 +1,71 @@
+"""
+Celery worker: runs the publishing dispatcher alongside the task queue.
+
+    celery -A worker.celery_worker worker --loglevel=info
+
+The dispatcher thread starts when the worker is ready. On shutdown it
+waits for publishes in flight (each bounded by PUBLISH_TIMEOUT seconds,
+default 60) and hands its claimed posts back to the schedule before the
+platform client closes. Run a single worker with the dispatcher enabled
+(PUBLISH_DISPATCHER=1, the default).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+
+from celery import Celery
+from celery.signals import worker_ready, worker_shutdown
+
+from app.database import init_db
+from app.services.social_api import SocialAPIClient
+from worker.dispatcher import PublishDispatcher
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_TIMEOUT = float(os.getenv("PUBLISH_TIMEOUT", "60"))
+
+celery_app = Celery(
+    "social_media_manager",
+    broker=os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/1"),
+)
+
+
+# The dispatcher publishes from worker threads; the async client lives on its own loop
+social_loop = asyncio.new_event_loop()
+social_client = SocialAPIClient()
+
+
+def publish_post(post: dict):
+    logger.info("Publishing post %s to %s", post["id"], post["platform"])
+    future = asyncio.run_coroutine_threadsafe(social_client.publish(post["platform"], post), social_loop)
+    try:
+        return future.result(timeout=PUBLISH_TIMEOUT)
+    except TimeoutError:
+        # Counted as a failed attempt; the dispatcher retries it later
+        future.cancel()
+        raise
+
+
+dispatcher = PublishDispatcher(publish=publish_post)
+
+
+@worker_ready.connect
+def start_dispatcher(**kwargs):
+    if os.getenv("PUBLISH_DISPATCHER", "1") == "1":
+        init_db()
+        threading.Thread(target=social_loop.run_forever, name="social-api", daemon=True).start()
+        dispatcher.start()
+
+
+@worker_shutdown.connect
+def stop_dispatcher(**kwargs):
+    # Publishes in flight finish and claims are released while the client is still open
+    stopped = dispatcher.stop(timeout=PUBLISH_TIMEOUT + 5)
+    if social_loop.is_running():
+        asyncio.run_coroutine_threadsafe(social_client.aclose(), social_loop).result(timeout=10)
+        # With the client closed, publishes still hanging fail and the dispatcher can release its claims
+        if not stopped and not dispatcher.stop(timeout=10):
+            logger.warning("Publishing dispatcher did not stop; its queued posts are recovered on the next start")
+        social_loop.call_soon_threadsafe(social_loop.stop)
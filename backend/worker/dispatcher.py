@@ -0,0 +1,238 @@
+"""
+Publishing dispatcher.
+
+Due posts are loaded from storage in batches into a min-heap ordered by
+scheduled_time. Loading claims them (status "scheduled" -> "queued"), so
+each refill is an index range scan over newly due rows only, never a scan
+of the whole table. Popped posts wait in a per-platform queue until that
+platform's token bucket allows a call, then publish on a thread pool.
+
+On start, posts a crashed worker left "queued" go back to "scheduled", so
+delivery is at-least-once.
+"""
+
+import heapq
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+
+from app.database import SessionLocal
+from app.models import Post
+from app.services.post_store import post_to_dict
+from app.services.rate_limit import PLATFORM_RATE_LIMITS, TokenBucket, bucket_for
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class PublishDispatcher:
+    """Publishes scheduled posts at their scheduled_time"""
+    
+    def __init__(self, publish: Callable[[Dict[str, Any]], Any], session_factory: Callable = SessionLocal,
+                 rate_limits: Dict[str, Dict[str, float]] = PLATFORM_RATE_LIMITS,
+                 lookahead: timedelta = timedelta(minutes=5), poll_interval: float = 1.0,
+                 load_batch_size: int = 1000, max_queued: int = 50000, max_workers: int = 16,
+                 max_attempts: int = 3, retry_delay: timedelta = timedelta(seconds=30),
+                 clock: Callable[[], datetime] = datetime.utcnow, time_scale: float = 1.0):
+        self.publish = publish
+        self.session_factory = session_factory
+        self.rate_limits = rate_limits
+        self.lookahead = lookahead
+        self.poll_interval = poll_interval
+        self.load_batch_size = load_batch_size
+        self.max_queued = max_queued
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.clock = clock
+        # Clock seconds per real second; only the benchmark runs faster than real time
+        self.time_scale = time_scale
+        
+        self._heap: List[Tuple[datetime, int, Dict[str, Any]]] = []
+        self._ready: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._attempts: Dict[int, int] = {}
+        self._results: Deque[Tuple[Dict[str, Any], Optional[Exception]]] = deque()
+        self._in_flight = 0
+        self._next_refill = EPOCH
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {"loaded": 0, "published": 0, "retried": 0, "failed": 0}
+    
+    def _seconds(self) -> float:
+        return (self.clock() - EPOCH).total_seconds()
+    
+    def _bucket(self, platform: str) -> TokenBucket:
+        if platform not in self._buckets:
+            self._buckets[platform] = bucket_for(platform, self.rate_limits, self._seconds)
+        return self._buckets[platform]
+    
+    def recover(self) -> int:
+        """Return posts claimed by a previous run to the schedule"""
+        with self.session_factory() as db:
+            result = db.execute(
+                update(Post).where(Post.status == "queued").values(status="scheduled")
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        if result.rowcount:
+            logger.info("Recovered %d queued posts", result.rowcount)
+        return result.rowcount
+    
+    def load_due(self, now: datetime) -> int:
+        """Claim posts due before now + lookahead and push them on the heap"""
+        horizon = now + self.lookahead
+        loaded = 0
+        with self.session_factory() as db:
+            while len(self._heap) < self.max_queued:
+                limit = min(self.load_batch_size, self.max_queued - len(self._heap))
+                posts = list(db.scalars(
+                    select(Post)
+                    .where(Post.status == "scheduled", Post.scheduled_time <= horizon)
+                    .order_by(Post.scheduled_time, Post.id)
+                    .limit(limit)
+                ))
+                if not posts:
+                    break
+                db.execute(
+                    update(Post).where(Post.id.in_([post.id for post in posts]), Post.status == "scheduled")
+                    .values(status="queued").execution_options(synchronize_session=False)
+                )
+                db.commit()
+                for post in posts:
+                    heapq.heappush(self._heap, (post.scheduled_time, post.id, post_to_dict(post)))
+                loaded += len(posts)
+                if len(posts) < limit:
+                    break
+        self.stats["loaded"] += loaded
+        return loaded
+    
+    def tick(self) -> float:
+        """Run one scheduling step; returns clock seconds until the next step is needed"""
+        now = self.clock()
+        if now >= self._next_refill:
+            self.load_due(now)
+            self._next_refill = now + timedelta(seconds=self.poll_interval)
+        
+        while self._heap and self._heap[0][0] <= now:
+            _, _, post = heapq.heappop(self._heap)
+            self._ready.setdefault(post["platform"], deque()).append(post)
+        
+        wait = (self._next_refill - now).total_seconds()
+        for platform, queue in self._ready.items():
+            bucket = self._bucket(platform)
+            while queue and bucket.try_acquire():
+                self._submit(queue.popleft())
+            if queue:
+                wait = min(wait, bucket.wait_time())
+        
+        self.flush_results()
+        if self._heap:
+            wait = min(wait, (self._heap[0][0] - now).total_seconds())
+        return max(wait, 0.0)
+    
+    def _submit(self, post: Dict[str, Any]):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="publisher")
+        self._in_flight += 1
+        self._pool.submit(self._publish_one, post)
+    
+    def _publish_one(self, post: Dict[str, Any]):
+        try:
+            self.publish(post)
+            self._results.append((post, None))
+        except Exception as exc:
+            self._results.append((post, exc))
+    
+    def flush_results(self):
+        """Write finished publishes back to storage in one transaction"""
+        if not self._results:
+            return
+        published, failed = [], []
+        now = self.clock()
+        while self._results:
+            post, error = self._results.popleft()
+            self._in_flight -= 1
+            if error is None:
+                published.append(post["id"])
+                self._attempts.pop(post["id"], None)
+                continue
+            attempts = self._attempts.get(post["id"], 0) + 1
+            if attempts < self.max_attempts:
+                logger.warning("Publishing post %s failed (attempt %d): %s", post["id"], attempts, error)
+                self._attempts[post["id"]] = attempts
+                heapq.heappush(self._heap, (now + self.retry_delay, post["id"], post))
+                self.stats["retried"] += 1
+            else:
+                logger.error("Giving up on post %s: %s", post["id"], error)
+                self._attempts.pop(post["id"], None)
+                failed.append(post["id"])
+        
+        with self.session_factory() as db:
+            for status, ids in (("published", published), ("failed", failed)):
+                if ids:
+                    db.execute(
+                        update(Post).where(Post.id.in_(ids)).values(status=status, updated_at=now)
+                        .execution_options(synchronize_session=False)
+                    )
+            db.commit()
+        self.stats["published"] += len(published)
+        self.stats["failed"] += len(failed)
+    
+    def release(self):
+        """Hand posts that were claimed but never published back to the schedule"""
+        ids = [post_id for _, post_id, _ in self._heap]
+        ids += [post["id"] for queue in self._ready.values() for post in queue]
+        self._heap.clear()
+        self._ready.clear()
+        if not ids:
+            return
+        with self.session_factory() as db:
+            for start in range(0, len(ids), self.load_batch_size):
+                db.execute(
+                    update(Post).where(Post.id.in_(ids[start:start + self.load_batch_size]), Post.status == "queued")
+                    .values(status="scheduled").execution_options(synchronize_session=False)
+                )
+            db.commit()
+    
+    def run(self):
+        """Dispatch until stop() is called"""
+        self.recover()
+        try:
+            while not self._stop.is_set():
+                wait = min(self.tick(), self.poll_interval)
+                self._stop.wait(wait / self.time_scale)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+            self.flush_results()
+            self.release()
+    
+    def start(self) -> threading.Thread:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="publish-dispatcher", daemon=True)
+        self._thread.start()
+        return self._thread
+    
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop dispatching and wait up to timeout seconds for publishes in
+        flight to finish and unpublished claims to be released. False if the
+        dispatcher thread is still running (it keeps going in the background).
+        """
+        self._stop.set()
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return False
+        self._thread = None
+        return True
@@ -14,6 +14,12 @@ export const getInsights = () => API.get("/insights/");
 // Schedule API
 export const getSchedule = () => API.get("/schedule/");
 export const schedulePost = (post) => API.post("/schedule/", post);
+// from/to are ISO times bounding a calendar view, e.g. one month
+export const getScheduleRange = (from, to, platform) =>
+  API.get("/schedule/", { params: { from, to, platform, limit: 500 } });
+// file is a CSV or NDJSON File; rejected as a whole (422 with line errors) if any row is invalid
+export const importSchedule = (file, format = /\.(ndjson|jsonl)$/i.test(file.name) ? "ndjson" : "csv") =>
+  API.post("/schedule/import", file, { params: { format } });
 
 // AI Features API
 export const predictEngagement = (data) => API.post("/ai/predict-engagement", data);
@@ -12,6 +12,8 @@ export default function PostForm({ onPostCreated }) {
   const [contentScore, setContentScore] = useState(null);
   const [suggestions, setSuggestions] = useState(null);
   const [aiLoading, setAiLoading] = useState(false);
+  // Lets the backend rescore only what changed since this draft was last scored
+  const [draftId] = useState(() => crypto.randomUUID());
 
   const handleChange = (e) => {
     const newFormData = {
@@ -40,7 +42,8 @@ export default function PostForm({ onPostCreated }) {
         }),
         scoreContent({
           content: formData.content,
-          platform: formData.platform
+          platform: formData.platform,
+          draft_id: draftId
         })
       ]);
       setPrediction(predRes.data);
@@ -108,12 +108,12 @@ export default function Schedule() {
           ) : (
             <ul className="scheduled-list">
               {scheduled.map((post, index) => (
-                <li key={index} className="scheduled-item">
+                <li key={post.id ?? index} className="scheduled-item">
                   <p>{post.content || post.text}</p>
                   <div className="scheduled-meta">
                     <span>{post.platform}</span>
-                    {post.scheduledTime && (
-                      <span>{new Date(post.scheduledTime).toLocaleString()}</span>
+                    {post.scheduled_time && (
+                      <span>{new Date(post.scheduled_time).toLocaleString()}</span>
                     )}
                   </div>
                 </li>